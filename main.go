@@ -6,6 +6,7 @@ import (
 	"context"
 	"encoding/json"
 	"fmt"
+	"io"
 	"net/http"
 	"os"
 	"os/signal"
@@ -70,7 +71,9 @@ func makeInsertHandler(log *zap.Logger) http.HandlerFunc {
 		}
 
 		// Log request details
-		log.Info("Processing insert request", zap.String("text_length", fmt.Sprintf("%d chars", len(req.Text))))
+		log.Info("Processing insert request",
+			zap.String("text_length", fmt.Sprintf("%d chars", len(req.Text))),
+			zap.String("collection", req.Collection))
 
 		// insert request into channel
 		req.UUID = uuid.New().String()
@@ -85,12 +88,12 @@ func makeInsertHandler(log *zap.Logger) http.HandlerFunc {
 			// response
 			if res.Error == "" {
 				log.Info("Insert request successful", zap.String("uuid", req.UUID))
-				writeJSON(w, http.StatusOK, apiserver.InsertResponse{Status: res.Status})
+				writeJSON(w, http.StatusOK, apiserver.InsertResponse{ID: res.ID, Duplicate: res.Duplicate, Status: res.Status})
 			} else {
 				log.Error("Insert request failed",
 					zap.String("uuid", req.UUID),
 					zap.String("error", res.Error))
-				writeJSON(w, http.StatusOK, apiserver.InsertResponse{Status: res.Status, Error: res.Error})
+				writeJSON(w, res.HTTPStatus, apiserver.InsertResponse{Status: res.Status, Error: res.Error})
 			}
 		case <-time.After(5 * time.Second):
 			log.Error("Insert request timed out", zap.String("uuid", req.UUID))
@@ -124,7 +127,9 @@ func makeFindSimilarHandler(log *zap.Logger) http.HandlerFunc {
 		// Log request details
 		log.Info("Processing find_similar request",
 			zap.String("text_length", fmt.Sprintf("%d chars", len(req.Text))),
-			zap.Int("top_k", int(req.TopK)))
+			zap.Int("top_k", int(req.TopK)),
+			zap.String("mode", req.Mode),
+			zap.String("collection", req.Collection))
 
 		// Create response channel if it doesn't exist
 		req.UUID = uuid.New().String()
@@ -149,7 +154,7 @@ func makeFindSimilarHandler(log *zap.Logger) http.HandlerFunc {
 				log.Error("Find similar request failed",
 					zap.String("uuid", req.UUID),
 					zap.String("error", res.Error))
-				writeJSON(w, http.StatusOK, apiserver.FindSimilarResponse{
+				writeJSON(w, res.HTTPStatus, apiserver.FindSimilarResponse{
 					Status: res.Status,
 					Error:  res.Error,
 				})
@@ -163,6 +168,145 @@ func makeFindSimilarHandler(log *zap.Logger) http.HandlerFunc {
 	}
 }
 
+func makeDeleteHandler(log *zap.Logger) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		// Log the request
+		log.Info("Received request", zap.String("method", r.Method), zap.String("url", r.URL.String()))
+
+		// parse request
+		var req apiserver.DeleteRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			log.Error("Failed to parse request", zap.Error(err), zap.String("endpoint", "/delete"))
+			writeJSON(w, http.StatusBadRequest, apiserver.DeleteResponse{Status: "error", Error: "invalid JSON"})
+			return
+		}
+
+		// Deletes are quick, answer on this goroutine
+		res := apiserver.Delete(req.ID, req.Collection)
+		if res.Error == "" {
+			log.Info("Delete request successful", zap.Int64("id", req.ID), zap.Bool("deleted", res.Deleted))
+			writeJSON(w, http.StatusOK, res)
+		} else {
+			log.Error("Delete request failed", zap.Int64("id", req.ID), zap.String("error", res.Error))
+			writeJSON(w, res.HTTPStatus, res)
+		}
+	}
+}
+
+func makeStatsHandler(log *zap.Logger) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		// Log the request
+		log.Info("Received request", zap.String("method", r.Method), zap.String("url", r.URL.String()))
+
+		// collection query parameter, the default collection if absent
+		res := apiserver.Stats(r.URL.Query().Get("collection"))
+		if res.Error != "" {
+			log.Error("Stats request failed", zap.String("error", res.Error))
+			writeJSON(w, res.HTTPStatus, res)
+			return
+		}
+		writeJSON(w, http.StatusOK, res)
+	}
+}
+
+func makeReloadHandler(log *zap.Logger) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		// Log the request
+		log.Info("Received request", zap.String("method", r.Method), zap.String("url", r.URL.String()))
+
+		// parse request, an empty body reloads the default matrix
+		var req apiserver.ReloadRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil && err != io.EOF {
+			log.Error("Failed to parse request", zap.Error(err), zap.String("endpoint", "/reload"))
+			writeJSON(w, http.StatusBadRequest, apiserver.ReloadResponse{Status: "error", Error: "invalid JSON"})
+			return
+		}
+
+		res := apiserver.Reload(req.Source)
+		if res.Error == "" {
+			log.Info("Reload request successful", zap.String("source", req.Source), zap.Int64("documents", res.Documents))
+			writeJSON(w, http.StatusOK, res)
+		} else {
+			log.Error("Reload request failed", zap.String("source", req.Source), zap.String("error", res.Error))
+			writeJSON(w, res.HTTPStatus, res)
+		}
+	}
+}
+
+// checkBatch rejects an empty or oversized batch, returning the error to report
+func checkBatch(asTexts []string) string {
+	if len(asTexts) == 0 {
+		return "missing required field: texts"
+	}
+	if len(asTexts) > apiserver.MaxBatchTexts {
+		return fmt.Sprintf("too many texts: %d (at most %d per batch)", len(asTexts), apiserver.MaxBatchTexts)
+	}
+	for _, sText := range asTexts {
+		if sText == "" {
+			return "empty text in texts"
+		}
+	}
+	return ""
+}
+
+func makeInsertBatchHandler(log *zap.Logger) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		// Log the request
+		log.Info("Received request", zap.String("method", r.Method), zap.String("url", r.URL.String()))
+
+		// parse request
+		var req apiserver.InsertBatchRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			log.Error("Failed to parse request", zap.Error(err), zap.String("endpoint", "/insert_batch"))
+			writeJSON(w, http.StatusBadRequest, apiserver.InsertBatchResponse{Status: "error", Error: "invalid JSON"})
+			return
+		}
+		if sError := checkBatch(req.Texts); sError != "" {
+			log.Error("Invalid batch", zap.String("error", sError), zap.String("endpoint", "/insert_batch"))
+			writeJSON(w, http.StatusBadRequest, apiserver.InsertBatchResponse{Status: "error", Error: sError})
+			return
+		}
+
+		// Every text is stored under its own UUID
+		asUUIDs := make([]string, len(req.Texts))
+		for iIndex := range asUUIDs {
+			asUUIDs[iIndex] = uuid.New().String()
+		}
+
+		res := apiserver.InsertBatch(req.Texts, asUUIDs, req.Collection)
+		log.Info("Insert batch request done", zap.Int("texts", len(req.Texts)), zap.String("collection", req.Collection))
+		writeJSON(w, http.StatusOK, res)
+	}
+}
+
+func makeFindSimilarBatchHandler(log *zap.Logger) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		// Log the request
+		log.Info("Received request", zap.String("method", r.Method), zap.String("url", r.URL.String()))
+
+		// parse request
+		var req apiserver.FindSimilarBatchRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			log.Error("Failed to parse request", zap.Error(err), zap.String("endpoint", "/find_similar_batch"))
+			writeJSON(w, http.StatusBadRequest, apiserver.FindSimilarBatchResponse{Status: "error", Error: "invalid JSON"})
+			return
+		}
+		if sError := checkBatch(req.Texts); sError != "" {
+			log.Error("Invalid batch", zap.String("error", sError), zap.String("endpoint", "/find_similar_batch"))
+			writeJSON(w, http.StatusBadRequest, apiserver.FindSimilarBatchResponse{Status: "error", Error: sError})
+			return
+		}
+
+		res := apiserver.FindSimilarBatch(req.Texts, req.TopK, req.Mode, req.Collection)
+		log.Info("Find similar batch request done",
+			zap.Int("texts", len(req.Texts)),
+			zap.Int("top_k", int(req.TopK)),
+			zap.String("mode", req.Mode),
+			zap.String("collection", req.Collection))
+		writeJSON(w, http.StatusOK, res)
+	}
+}
+
 // Orchestrate
 func main() {
 	// Display the PolyDB banner
@@ -181,6 +325,11 @@ func main() {
 
 	r.Post("/insert", makeInsertHandler(log))
 	r.Post("/find_similar", makeFindSimilarHandler(log))
+	r.Post("/insert_batch", makeInsertBatchHandler(log))
+	r.Post("/find_similar_batch", makeFindSimilarBatchHandler(log))
+	r.Post("/delete", makeDeleteHandler(log))
+	r.Get("/stats", makeStatsHandler(log))
+	r.Post("/reload", makeReloadHandler(log))
 
 	// Initialize API server
 	log.Info("Initializing API server")
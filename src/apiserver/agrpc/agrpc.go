@@ -10,11 +10,31 @@ import (
 	pb "embeddingspb"
 
 	"google.golang.org/grpc"
+	"google.golang.org/grpc/codes"
 	"google.golang.org/grpc/credentials/insecure"
 	"google.golang.org/grpc/metadata"
 	"google.golang.org/grpc/status"
 )
 
+// ServiceError is an error status the embeddings service answered with, its code tells overload and timeouts apart
+// from failed requests
+type ServiceError struct {
+	Code    codes.Code
+	Message string
+}
+
+func (e *ServiceError) Error() string {
+	return fmt.Sprintf("embeddings service error (%s): %s", e.Code, e.Message)
+}
+
+// callError keeps the status of a failed call, or wraps the error if the service never answered
+func callError(err error, sAction string) error {
+	if st, ok := status.FromError(err); ok {
+		return &ServiceError{Code: st.Code(), Message: st.Message()}
+	}
+	return fmt.Errorf("failed to %s: %w", sAction, err)
+}
+
 // Client represents a gRPC client for the embeddings service
 type Client struct {
 	conn   *grpc.ClientConn
@@ -54,8 +74,10 @@ func NewClient() (*Client, error) {
 	return &Client{conn: conn, client: client}, nil
 }
 
-// GenerateEmbeddings sends token IDs to the embeddings service and returns the embedding vectors
-func (c *Client) GenerateEmbeddings(sText string, tokenIDs []int64, sUUID string) error {
+// GenerateEmbeddings sends token IDs to the embeddings service to store the text, returning the index id of the stored
+// document and whether it was already stored (the id is then the existing document's). An empty collection stores it in
+// the default one
+func (c *Client) GenerateEmbeddings(sText string, tokenIDs []int64, sUUID string, collection string) (int64, bool, error) {
 	// Create a context with metadata containing text and UUID
 	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
 	defer cancel()
@@ -69,41 +91,39 @@ func (c *Client) GenerateEmbeddings(sText string, tokenIDs []int64, sUUID string
 
 	// call GRPC method
 	resp, err := c.client.GenerateEmbeddings(ctx, &pb.EmbeddingsRequest{
-		TokenIds: tokenIDs,
+		TokenIds:   tokenIDs,
+		Collection: collection,
 	})
 
 	if err != nil {
-		if st, ok := status.FromError(err); ok {
-			return fmt.Errorf("embeddings service error (%s): %s", st.Code(), st.Message())
-		}
-		return fmt.Errorf("failed to generate embeddings: %w", err)
+		return 0, false, callError(err, "generate embeddings")
 	}
 
 	// check for error
 	if !resp.Success {
-		return errors.New(resp.ErrorMessage)
+		return 0, false, errors.New(resp.ErrorMessage)
 	}
 
-	return nil
+	return resp.Id, resp.Duplicate, nil
 }
 
-// FindSimilarEmbeddings sends token IDs to find similar embeddings and returns a list of similar texts
-func (c *Client) FindSimilarEmbeddings(tokenIDs []int64, topK int32) ([]string, error) {
+// FindSimilarEmbeddings sends token IDs to find similar embeddings and returns a list of similar texts. The mode is
+// "vector", "hybrid" or "keyword" (empty for the server default), an empty collection searches the default one
+func (c *Client) FindSimilarEmbeddings(tokenIDs []int64, topK int32, mode string, collection string) ([]string, error) {
 	// Create a context with timeout
 	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
 	defer cancel()
 
 	// call grpc method
 	resp, err := c.client.FindSimilarEmbeddings(ctx, &pb.FindSimilarRequest{
-		TokenIds: tokenIDs,
-		TopK:     topK,
+		TokenIds:   tokenIDs,
+		TopK:       topK,
+		Mode:       mode,
+		Collection: collection,
 	})
 
 	if err != nil {
-		if st, ok := status.FromError(err); ok {
-			return nil, fmt.Errorf("embeddings service error (%s): %s", st.Code(), st.Message())
-		}
-		return nil, fmt.Errorf("failed to find similar embeddings: %w", err)
+		return nil, callError(err, "find similar embeddings")
 	}
 
 	// Check for error in response
@@ -114,6 +134,79 @@ func (c *Client) FindSimilarEmbeddings(tokenIDs []int64, topK int32) ([]string,
 	return resp.SimilarTexts, nil
 }
 
+// DeleteEmbedding removes the document stored under an index id (as returned by an insert) in a collection (empty for
+// the default one), returning whether there was one
+func (c *Client) DeleteEmbedding(id int64, collection string) (bool, error) {
+	// Create a context with timeout
+	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
+	defer cancel()
+
+	// call grpc method
+	resp, err := c.client.DeleteEmbedding(ctx, &pb.DeleteRequest{
+		Id:         id,
+		Collection: collection,
+	})
+
+	if err != nil {
+		return false, callError(err, "delete embedding")
+	}
+
+	// Check for error in response
+	if !resp.Success {
+		return false, errors.New(resp.ErrorMessage)
+	}
+
+	return resp.Deleted, nil
+}
+
+// GetStats returns the storage counters of a collection (empty for the default one) and the ingest, replication and
+// admission counters of the embeddings service
+func (c *Client) GetStats(collection string) (map[string]float64, error) {
+	// Create a context with timeout
+	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
+	defer cancel()
+
+	// call grpc method
+	resp, err := c.client.GetStats(ctx, &pb.StatsRequest{
+		Collection: collection,
+	})
+
+	if err != nil {
+		return nil, callError(err, "get stats")
+	}
+
+	// Check for error in response
+	if !resp.Success {
+		return nil, errors.New(resp.ErrorMessage)
+	}
+
+	return resp.Stats, nil
+}
+
+// ReloadModel swaps in a new embedding matrix (a key in sgns-artifacts or a local .pt path, empty for the default) and
+// returns the number of loaded documents being re-embedded in the background
+func (c *Client) ReloadModel(source string) (int64, error) {
+	// Create a context with timeout
+	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
+	defer cancel()
+
+	// call grpc method
+	resp, err := c.client.ReloadModel(ctx, &pb.ReloadRequest{
+		Source: source,
+	})
+
+	if err != nil {
+		return 0, callError(err, "reload model")
+	}
+
+	// Check for error in response
+	if !resp.Success {
+		return 0, errors.New(resp.ErrorMessage)
+	}
+
+	return resp.Documents, nil
+}
+
 // Close closes the client connection
 func (c *Client) Close() error {
 	if c.conn != nil {
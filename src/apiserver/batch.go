@@ -0,0 +1,72 @@
+package apiserver
+
+import (
+	"sync"
+)
+
+// Most texts one batch request may carry
+const MaxBatchTexts = 256
+
+// Texts of one batch handled at once, the rest wait for a free slot
+const BatchConcurrency = 8
+
+// structs for state maintenance
+type InsertBatchRequest struct {
+	Texts      []string `json:"texts"`
+	Collection string   `json:"collection,omitempty"` // Optional: created on first insert, defaults to "default"
+}
+
+type InsertBatchResponse struct {
+	Results []*InsertResponse `json:"results,omitempty"` // One per text, in request order
+	Status  string            `json:"status"`            // "ok" or "error" (per-text failures are in the results)
+	Error   string            `json:"error,omitempty"`
+}
+
+type FindSimilarBatchRequest struct {
+	Texts      []string `json:"texts"`
+	TopK       int32    `json:"top_k,omitempty"`      // Optional: defaults to 5 if not specified
+	Mode       string   `json:"mode,omitempty"`       // Optional: "vector" (default), "hybrid" or "keyword"
+	Collection string   `json:"collection,omitempty"` // Optional: defaults to "default"
+}
+
+type FindSimilarBatchResponse struct {
+	Results []*FindSimilarResponse `json:"results,omitempty"` // One per text, in request order
+	Status  string                 `json:"status"`            // "ok" or "error" (per-text failures are in the results)
+	Error   string                 `json:"error,omitempty"`
+}
+
+// runBatch calls call for every index below count, BatchConcurrency at a time
+func runBatch(count int, call func(int)) {
+	var wg sync.WaitGroup
+	slots := make(chan struct{}, BatchConcurrency)
+	for iIndex := 0; iIndex < count; iIndex++ {
+		wg.Add(1)
+		slots <- struct{}{}
+		go func(iIndex int) {
+			defer wg.Done()
+			defer func() { <-slots }()
+			call(iIndex)
+		}(iIndex)
+	}
+	wg.Wait()
+}
+
+// InsertBatch stores many texts in one request, each the way Insert does under its own UUID
+func InsertBatch(asTexts []string, asUUIDs []string, sCollection string) *InsertBatchResponse {
+	results := make([]*InsertResponse, len(asTexts))
+	runBatch(len(asTexts), func(iIndex int) {
+		results[iIndex] = Insert(asTexts[iIndex], sCollection, asUUIDs[iIndex])
+	})
+
+	return &InsertBatchResponse{Results: results, Status: "ok"}
+}
+
+// FindSimilarBatch runs many queries in one request, each the way FindSimilar does
+func FindSimilarBatch(asTexts []string, topK int32, sMode string, sCollection string) *FindSimilarBatchResponse {
+	results := make([]*FindSimilarResponse, len(asTexts))
+	runBatch(len(asTexts), func(iIndex int) {
+		results[iIndex] = FindSimilar(asTexts[iIndex], topK, sMode, sCollection, "")
+	})
+
+	return &FindSimilarBatchResponse{Results: results, Status: "ok"}
+}
@@ -0,0 +1,29 @@
+package apiserver
+
+import (
+	"fmt"
+)
+
+// structs for state maintenance
+type DeleteRequest struct {
+	ID         int64  `json:"id"`                   // Index id an insert returned
+	Collection string `json:"collection,omitempty"` // Optional: collection the insert went to, defaults to "default"
+}
+
+type DeleteResponse struct {
+	Deleted    bool   `json:"deleted"` // False if no document was stored under the id
+	Status     string `json:"status"`  // "ok" or "error"
+	Error      string `json:"error,omitempty"`
+	HTTPStatus int    `json:"-"` // Status to answer a failed delete with
+}
+
+// Delete removes a stored document by the id its insert returned
+func Delete(iID int64, sCollection string) *DeleteResponse {
+	bDeleted, err := embClient.DeleteEmbedding(iID, sCollection)
+	if err != nil {
+		return &DeleteResponse{Status: "error", Error: fmt.Sprintf("Failed to delete embedding: %v", err),
+			HTTPStatus: HTTPStatus(err)}
+	}
+
+	return &DeleteResponse{Deleted: bDeleted, Status: "ok"}
+}
@@ -5,6 +5,7 @@ import (
 	"bpe"
 	b64 "encoding/base64"
 	"fmt"
+	"net/http"
 )
 
 // global channel of requests
@@ -15,19 +16,22 @@ var MapChannelFindSimilarResponse = make(map[string](chan *FindSimilarResponse))
 
 // structs for state maintenance
 type FindSimilarRequest struct {
-	Text string `json:"text"`
-	TopK int32  `json:"top_k,omitempty"` // Optional: defaults to 5 if not specified
-	UUID string
+	Text       string `json:"text"`
+	TopK       int32  `json:"top_k,omitempty"`      // Optional: defaults to 5 if not specified
+	Mode       string `json:"mode,omitempty"`       // Optional: "vector" (default), "hybrid" or "keyword"
+	Collection string `json:"collection,omitempty"` // Optional: defaults to "default"
+	UUID       string
 }
 
 type FindSimilarResponse struct {
 	SimilarTexts []string `json:"similar_texts"`
 	Status       string   `json:"status"` // "ok" or "error"
 	Error        string   `json:"error,omitempty"`
+	HTTPStatus   int      `json:"-"` // Status to answer a failed search with
 }
 
 // FindSimilar finds similar texts to the provided text by using the embedding service
-func FindSimilar(sText string, topK int32, sUUID string) *FindSimilarResponse {
+func FindSimilar(sText string, topK int32, sMode string, sCollection string, sUUID string) *FindSimilarResponse {
 	// Default value for topK if not provided
 	if topK <= 0 {
 		topK = 5
@@ -37,20 +41,22 @@ func FindSimilar(sText string, topK int32, sUUID string) *FindSimilarResponse {
 	// This uses the same MapMerges variable from the insert.go file
 	alTokens, err := bpe.Encode(MapMerges, sText)
 	if err != nil {
-		return &FindSimilarResponse{Status: "error", Error: err.Error()}
+		return &FindSimilarResponse{Status: "error", Error: err.Error(), HTTPStatus: http.StatusOK}
 	}
 
 	// Connect to embeddings service
 	embClient, err := agrpc.NewClient()
 	if err != nil {
-		return &FindSimilarResponse{Status: "error", Error: fmt.Sprintf("Failed to connect to embeddings service: %v", err)}
+		return &FindSimilarResponse{Status: "error", Error: fmt.Sprintf("Failed to connect to embeddings service: %v", err),
+			HTTPStatus: http.StatusServiceUnavailable}
 	}
 	defer embClient.Close()
 
 	// Find similar embeddings using gRPC
-	similarTexts, err := embClient.FindSimilarEmbeddings(alTokens, topK)
+	similarTexts, err := embClient.FindSimilarEmbeddings(alTokens, topK, sMode, sCollection)
 	if err != nil {
-		return &FindSimilarResponse{Status: "error", Error: fmt.Sprintf("Failed to find similar embeddings: %v", err)}
+		return &FindSimilarResponse{Status: "error", Error: fmt.Sprintf("Failed to find similar embeddings: %v", err),
+			HTTPStatus: HTTPStatus(err)}
 	}
 
 	// base 64 decode every string
@@ -58,7 +64,8 @@ func FindSimilar(sText string, topK int32, sUUID string) *FindSimilarResponse {
 	for _, sEncodedText := range similarTexts {
 		abDecoded, err := b64.StdEncoding.DecodeString(sEncodedText)
 		if err != nil {
-			return &FindSimilarResponse{Status: "error", Error: fmt.Sprintf("Unable to decode string: %v", err)}
+			return &FindSimilarResponse{Status: "error", Error: fmt.Sprintf("Unable to decode string: %v", err),
+				HTTPStatus: http.StatusOK}
 		}
 		asSimilarTextsDecoded = append(asSimilarTextsDecoded, string(abDecoded))
 	}
@@ -74,7 +81,7 @@ func LaunchFindSimilarHandler() {
 	// continuously wait for requests
 	for job := range ChannelFindSimilarRequests {
 		// call function
-		response := FindSimilar(job.Text, job.TopK, job.UUID)
+		response := FindSimilar(job.Text, job.TopK, job.Mode, job.Collection, job.UUID)
 
 		// insert response into map where caller is expecting it
 		MapChannelFindSimilarResponse[job.UUID] <- response
@@ -6,6 +6,7 @@ import (
 	"encoding/base64"
 	"encoding/json"
 	"fmt"
+	"net/http"
 	"os"
 	"path/filepath"
 )
@@ -24,14 +25,17 @@ var embClient *agrpc.Client
 
 // structs for state maintenance
 type InsertRequest struct {
-	Text string `json:"text"`
-	UUID string
+	Text       string `json:"text"`
+	Collection string `json:"collection,omitempty"` // Optional: created on first insert, defaults to "default"
+	UUID       string
 }
 
 type InsertResponse struct {
-	ID     string `json:"id,omitempty"`
-	Status string `json:"status"` // "ok" or "error"
-	Error  string `json:"error,omitempty"`
+	ID         int64  `json:"id,omitempty"`        // Index id of the stored document
+	Duplicate  bool   `json:"duplicate,omitempty"` // True if the text was already stored (ID is the existing document's)
+	Status     string `json:"status"`              // "ok" or "error"
+	Error      string `json:"error,omitempty"`
+	HTTPStatus int    `json:"-"` // Status to answer a failed insert with
 }
 
 // Initialize
@@ -65,23 +69,24 @@ func Initialize() error {
 }
 
 // insert into database
-func Insert(sText string, sUUID string) *InsertResponse {
+func Insert(sText string, sCollection string, sUUID string) *InsertResponse {
 	// Convert to tokens
 	alTokens, err := bpe.Encode(MapMerges, sText)
 	if err != nil {
-		return &InsertResponse{Status: "error", Error: err.Error()}
+		return &InsertResponse{Status: "error", Error: err.Error(), HTTPStatus: http.StatusOK}
 	}
 
 	// base 64 encode the text
 	sEncodedText := base64.StdEncoding.EncodeToString([]byte(sText))
 
 	// Generate embeddings using gRPC
-	err = embClient.GenerateEmbeddings(sEncodedText, alTokens, sUUID)
+	iID, bDuplicate, err := embClient.GenerateEmbeddings(sEncodedText, alTokens, sUUID, sCollection)
 	if err != nil {
-		return &InsertResponse{Status: "error", Error: fmt.Sprintf("Failed to generate embeddings: %v", err)}
+		return &InsertResponse{Status: "error", Error: fmt.Sprintf("Failed to generate embeddings: %v", err),
+			HTTPStatus: HTTPStatus(err)}
 	}
 
-	return &InsertResponse{Status: "ok"}
+	return &InsertResponse{ID: iID, Duplicate: bDuplicate, Status: "ok"}
 }
 
 // process requests
@@ -89,7 +94,7 @@ func LaunchHandler() {
 	// continuously wait for requests
 	for job := range ChannelInsertRequests {
 		// call function
-		response := Insert(job.Text, job.UUID)
+		response := Insert(job.Text, job.Collection, job.UUID)
 
 		// insert response into map where caller is expecting it
 		MapChannelResponse[job.UUID] <- response
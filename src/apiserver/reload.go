@@ -0,0 +1,28 @@
+package apiserver
+
+import (
+	"fmt"
+)
+
+// structs for state maintenance
+type ReloadRequest struct {
+	Source string `json:"source,omitempty"` // Optional: key in sgns-artifacts or local .pt path
+}
+
+type ReloadResponse struct {
+	Documents  int64  `json:"documents"` // Documents of the loaded collections being re-embedded in the background
+	Status     string `json:"status"`    // "ok" or "error"
+	Error      string `json:"error,omitempty"`
+	HTTPStatus int    `json:"-"` // Status to answer a failed reload with
+}
+
+// Reload swaps in a new embedding matrix, stored documents are re-embedded in the background
+func Reload(sSource string) *ReloadResponse {
+	iDocuments, err := embClient.ReloadModel(sSource)
+	if err != nil {
+		return &ReloadResponse{Status: "error", Error: fmt.Sprintf("Failed to reload model: %v", err),
+			HTTPStatus: HTTPStatus(err)}
+	}
+
+	return &ReloadResponse{Documents: iDocuments, Status: "ok"}
+}
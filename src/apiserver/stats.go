@@ -0,0 +1,23 @@
+package apiserver
+
+import (
+	"fmt"
+)
+
+type StatsResponse struct {
+	Stats      map[string]float64 `json:"stats,omitempty"` // Storage, ingest, replication and admission counters
+	Status     string             `json:"status"`          // "ok" or "error"
+	Error      string             `json:"error,omitempty"`
+	HTTPStatus int                `json:"-"` // Status to answer a failed stats request with
+}
+
+// Stats reads the counters of the embeddings service, the storage ones of a collection (empty for "default")
+func Stats(sCollection string) *StatsResponse {
+	mapStats, err := embClient.GetStats(sCollection)
+	if err != nil {
+		return &StatsResponse{Status: "error", Error: fmt.Sprintf("Failed to get stats: %v", err),
+			HTTPStatus: HTTPStatus(err)}
+	}
+
+	return &StatsResponse{Stats: mapStats, Status: "ok"}
+}
@@ -0,0 +1,26 @@
+package apiserver
+
+import (
+	"agrpc"
+	"errors"
+	"net/http"
+
+	"google.golang.org/grpc/codes"
+)
+
+// HTTPStatus maps a failed call to the status the API answers with: 429 when the embeddings service turned the
+// request away, 503 when it is unavailable or gave up on the request in time, 200 for any other error (reported in
+// the body, as before)
+func HTTPStatus(err error) int {
+	var serviceError *agrpc.ServiceError
+	if !errors.As(err, &serviceError) {
+		return http.StatusOK
+	}
+	switch serviceError.Code {
+	case codes.ResourceExhausted:
+		return http.StatusTooManyRequests
+	case codes.Unavailable, codes.DeadlineExceeded, codes.Canceled:
+		return http.StatusServiceUnavailable
+	}
+	return http.StatusOK
+}
@@ -0,0 +1,2 @@
+from .client import PolyDBClient, PolyDBError
+from .async_client import AsyncPolyDBClient
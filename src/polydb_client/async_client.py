@@ -0,0 +1,153 @@
+import asyncio
+
+from .client import DEFAULT_URL, POOL_SIZE, TIMEOUT, RETRIES, BACKOFF, BATCH_SIZE, RETRY_STATUSES, backoff_delay, \
+    retryable, error_body, check, check_texts, optional_fields, distinct, chunks
+
+
+# asyncio client for the PolyDB HTTP API, for use from one event loop
+class AsyncPolyDBClient:
+    def __init__(self, base_url=DEFAULT_URL, pool_size=POOL_SIZE, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF,
+                 batch_size=BATCH_SIZE):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("The asyncio client requires aiohttp (pip install aiohttp)")
+        self.aiohttp = aiohttp
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+
+        # Bounds the requests in flight to the number of pooled connections
+        self.pool_size = pool_size
+        self.in_flight = asyncio.Semaphore(pool_size)
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # Keep-alive connection pool, opened on first use inside the running loop
+    def connection_pool(self):
+        if self.session is None:
+            connector = self.aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self.session = self.aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    # POST a JSON payload, retrying timeouts, dropped connections and overload with backoff
+    async def post(self, path, payload):
+        return await self.request("POST", path, json=payload)
+
+    # GET with query parameters, retried the same way
+    async def get(self, path, params):
+        return await self.request("GET", path, params=params)
+
+    async def request(self, method, path, **kwargs):
+        session = self.connection_pool()
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with self.in_flight:
+                    async with session.request(method, self.base_url + path, **kwargs) as response:
+                        status = response.status
+                        if status in RETRY_STATUSES:
+                            data = {"status": "error", "error": f"HTTP {status}"}
+                        else:
+                            try:
+                                data = await response.json(content_type=None)
+                            except ValueError:
+                                data = error_body(status, await response.text())
+            except (asyncio.TimeoutError, self.aiohttp.ClientConnectionError):
+                if last:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff))
+                continue
+
+            if (status in RETRY_STATUSES or retryable(data)) and not last:
+                await asyncio.sleep(backoff_delay(attempt, self.backoff))
+                continue
+            return check(data)
+
+    # POST a batch of texts, resending the ones that timed out or were turned away, one result per text
+    async def post_batch(self, path, texts, **fields):
+        results = [None] * len(texts)
+        pending = list(range(len(texts)))
+        for attempt in range(self.retries + 1):
+            data = await self.post(path, dict(fields, texts=[texts[position] for position in pending]))
+            retry = []
+            for position, result in zip(pending, data["results"]):
+                if retryable(result) and attempt < self.retries:
+                    retry.append(position)
+                else:
+                    results[position] = check(result)
+            if not retry:
+                break
+            pending = retry
+            await asyncio.sleep(backoff_delay(attempt, self.backoff))
+        return results
+
+    # Store a text (retrying an insert is safe, the server stores identical texts once)
+    async def insert(self, text, collection=None):
+        check_texts([text])
+        return await self.post("/insert", dict(optional_fields(collection=collection), text=text))
+
+    # Texts most similar to the query, mode is "vector" (the server's default), "hybrid" or "keyword"
+    async def find_similar(self, text, top_k=5, mode=None, collection=None):
+        check_texts([text])
+        payload = dict(optional_fields(mode=mode, collection=collection), text=text, top_k=top_k)
+        return (await self.post("/find_similar", payload)).get("similar_texts") or []
+
+    # Delete a document by the id its insert returned, False if there was none
+    async def delete(self, id, collection=None):
+        return (await self.post("/delete", dict(optional_fields(collection=collection), id=id)))["deleted"]
+
+    # Counters of the server and of a collection's storage
+    async def stats(self, collection=None):
+        return (await self.get("/stats", optional_fields(collection=collection)))["stats"]
+
+    # Apply a call to many items with pool_size requests in flight, results in input order
+    async def pipeline(self, call, items):
+        results = [None] * len(items)
+        pending = iter(enumerate(items))
+
+        # Workers share one iterator, so only pool_size calls exist at any time
+        async def worker():
+            for position, item in pending:
+                results[position] = await call(*item)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.pool_size, len(items)))))
+        return results
+
+    # Store a batch of texts in one request
+    async def insert_batch(self, texts, collection=None):
+        return await self.post_batch("/insert_batch", check_texts(texts), **optional_fields(collection=collection))
+
+    # Texts most similar to each query of a batch, in one request
+    async def find_similar_batch(self, texts, top_k=5, mode=None, collection=None):
+        results = await self.post_batch("/find_similar_batch", check_texts(texts), top_k=top_k,
+                                        **optional_fields(mode=mode, collection=collection))
+        return [result.get("similar_texts") or [] for result in results]
+
+    # Store many texts, each distinct text once and batch_size per request, returning one response per input text
+    async def insert_many(self, texts, collection=None):
+        unique, positions = distinct(check_texts(texts))
+        batches = await self.pipeline(self.insert_batch,
+                                      [(batch, collection) for batch in chunks(unique, self.batch_size)])
+        responses = [response for batch in batches for response in batch]
+        return [responses[position] for position in positions]
+
+    # Run many queries, each distinct query once and batch_size per request, returning one result list per input query
+    async def find_similar_many(self, texts, top_k=5, mode=None, collection=None):
+        unique, positions = distinct(check_texts(texts))
+        batches = await self.pipeline(self.find_similar_batch,
+                                      [(batch, top_k, mode, collection) for batch in chunks(unique, self.batch_size)])
+        results = [result for batch in batches for result in batch]
+        return [results[position] for position in positions]
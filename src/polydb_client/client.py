@@ -0,0 +1,212 @@
+import collections
+import concurrent.futures
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Address of the API server
+DEFAULT_URL = "http://localhost:9000"
+
+# Keep-alive connections to the API server, also the number of requests in flight at once
+POOL_SIZE = 16
+
+# Seconds to wait for a response (the server gives up on a request after 10 seconds)
+TIMEOUT = 15.0
+
+# Retries after a timeout, dropped connection or overloaded server, with jittered exponential backoff in seconds
+RETRIES = 3
+BACKOFF = 0.1
+BACKOFF_CAP = 2.0
+
+# HTTP statuses worth retrying
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Embeddings service errors worth retrying, as they appear in the error of a result (a batch answers 200 even when
+# some of its texts were turned away)
+RETRY_CODES = ("ResourceExhausted", "Unavailable", "DeadlineExceeded")
+
+# Texts per batch request (the server takes at most 256)
+BATCH_SIZE = 64
+
+
+# The server answered with an error
+class PolyDBError(Exception):
+    pass
+
+
+# Delay before a retry, full jitter so clients that failed together do not retry together
+def backoff_delay(attempt, backoff=BACKOFF):
+    return random.uniform(0, min(BACKOFF_CAP, backoff * 2 ** attempt))
+
+# The server reports its own handler timeouts as a 200 response with error "timeout", and an overloaded or
+# unavailable embeddings service in the error message
+def retryable(data):
+    error = data.get("error") or ""
+    return error == "timeout" or any(f"({code})" in error for code in RETRY_CODES)
+
+# Body of a response that is not JSON (a proxy's or a crashed server's error page) as an error result
+def error_body(status, text):
+    return {"status": "error", "error": f"HTTP {status}: {text[:200]}"}
+
+def check(data):
+    if data.get("status") != "ok":
+        raise PolyDBError(data.get("error") or "unknown error")
+    return data
+
+# The server turns a whole batch away for one empty text, so texts are checked before anything is sent
+def check_texts(texts):
+    for position, text in enumerate(texts):
+        if not isinstance(text, str) or not text:
+            raise ValueError(f"texts[{position}] must be a non-empty string, got {text!r}")
+    return texts
+
+# Optional request fields that were given (the server fills in its defaults for the rest)
+def optional_fields(**fields):
+    return {name: value for name, value in fields.items() if value is not None}
+
+# Distinct items in first-seen order, with the position of each input item among them
+def distinct(items):
+    positions = {}
+    for item in items:
+        positions.setdefault(item, len(positions))
+    return list(positions), [positions[item] for item in items]
+
+# Consecutive slices of at most size items
+def chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+# Client for the PolyDB HTTP API, safe to share between threads
+class PolyDBClient:
+    def __init__(self, base_url=DEFAULT_URL, pool_size=POOL_SIZE, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF,
+                 batch_size=BATCH_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        # One pool of keep-alive connections, callers block for a free connection instead of opening more
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Threads that keep pool_size requests in flight for the bulk calls
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    # POST a JSON payload, retrying timeouts, dropped connections and overload with backoff
+    def post(self, path, payload):
+        return self.request("POST", path, json=payload)
+
+    # GET with query parameters, retried the same way
+    def get(self, path, params):
+        return self.request("GET", path, params=params)
+
+    def request(self, method, path, **kwargs):
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                if last:
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff))
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                data = {"status": "error", "error": f"HTTP {response.status_code}"}
+            else:
+                try:
+                    data = response.json()
+                except ValueError:
+                    data = error_body(response.status_code, response.text)
+            if (response.status_code in RETRY_STATUSES or retryable(data)) and not last:
+                time.sleep(backoff_delay(attempt, self.backoff))
+                continue
+            return check(data)
+
+    # POST a batch of texts, resending the ones that timed out or were turned away, one result per text
+    def post_batch(self, path, texts, **fields):
+        results = [None] * len(texts)
+        pending = list(range(len(texts)))
+        for attempt in range(self.retries + 1):
+            data = self.post(path, dict(fields, texts=[texts[position] for position in pending]))
+            retry = []
+            for position, result in zip(pending, data["results"]):
+                if retryable(result) and attempt < self.retries:
+                    retry.append(position)
+                else:
+                    results[position] = check(result)
+            if not retry:
+                break
+            pending = retry
+            time.sleep(backoff_delay(attempt, self.backoff))
+        return results
+
+    # Store a text (retrying an insert is safe, the server stores identical texts once)
+    def insert(self, text, collection=None):
+        check_texts([text])
+        return self.post("/insert", dict(optional_fields(collection=collection), text=text))
+
+    # Texts most similar to the query, mode is "vector" (the server's default), "hybrid" or "keyword"
+    def find_similar(self, text, top_k=5, mode=None, collection=None):
+        check_texts([text])
+        payload = dict(optional_fields(mode=mode, collection=collection), text=text, top_k=top_k)
+        return self.post("/find_similar", payload).get("similar_texts") or []
+
+    # Delete a document by the id its insert returned, False if there was none
+    def delete(self, id, collection=None):
+        return self.post("/delete", dict(optional_fields(collection=collection), id=id))["deleted"]
+
+    # Counters of the server and of a collection's storage
+    def stats(self, collection=None):
+        return self.get("/stats", optional_fields(collection=collection))["stats"]
+
+    # Apply a call to many items with pool_size requests in flight, keeping a bounded window of pending ones
+    def pipeline(self, call, items):
+        results, window = [], collections.deque()
+        for item in items:
+            window.append(self.executor.submit(call, *item))
+            if len(window) >= 2 * self.pool_size:
+                results.append(window.popleft().result())
+        results.extend(future.result() for future in window)
+        return results
+
+    # Store a batch of texts in one request
+    def insert_batch(self, texts, collection=None):
+        return self.post_batch("/insert_batch", check_texts(texts), **optional_fields(collection=collection))
+
+    # Texts most similar to each query of a batch, in one request
+    def find_similar_batch(self, texts, top_k=5, mode=None, collection=None):
+        results = self.post_batch("/find_similar_batch", check_texts(texts), top_k=top_k,
+                                  **optional_fields(mode=mode, collection=collection))
+        return [result.get("similar_texts") or [] for result in results]
+
+    # Store many texts, each distinct text once and batch_size per request, returning one response per input text
+    def insert_many(self, texts, collection=None):
+        unique, positions = distinct(check_texts(texts))
+        batches = self.pipeline(self.insert_batch, [(batch, collection) for batch in chunks(unique, self.batch_size)])
+        responses = [response for batch in batches for response in batch]
+        return [responses[position] for position in positions]
+
+    # Run many queries, each distinct query once and batch_size per request, returning one result list per input query
+    def find_similar_many(self, texts, top_k=5, mode=None, collection=None):
+        unique, positions = distinct(check_texts(texts))
+        batches = self.pipeline(self.find_similar_batch,
+                                [(batch, top_k, mode, collection) for batch in chunks(unique, self.batch_size)])
+        results = [result for batch in batches for result in batch]
+        return [results[position] for position in positions]
@@ -117,6 +117,102 @@ func (x *EncodeResponse) GetTokenTexts() []string {
 	return nil
 }
 
+type EncodeBatchRequest struct {
+	state             protoimpl.MessageState `protogen:"open.v1"`
+	Texts             []string               `protobuf:"bytes,1,rep,name=texts,proto3" json:"texts,omitempty"`
+	IncludeTokenTexts bool                   `protobuf:"varint,2,opt,name=include_token_texts,json=includeTokenTexts,proto3" json:"include_token_texts,omitempty"`
+	unknownFields     protoimpl.UnknownFields
+	sizeCache         protoimpl.SizeCache
+}
+
+func (x *EncodeBatchRequest) Reset() {
+	*x = EncodeBatchRequest{}
+	mi := &file_tokenizer_proto_msgTypes[2]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *EncodeBatchRequest) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*EncodeBatchRequest) ProtoMessage() {}
+
+func (x *EncodeBatchRequest) ProtoReflect() protoreflect.Message {
+	mi := &file_tokenizer_proto_msgTypes[2]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use EncodeBatchRequest.ProtoReflect.Descriptor instead.
+func (*EncodeBatchRequest) Descriptor() ([]byte, []int) {
+	return file_tokenizer_proto_rawDescGZIP(), []int{2}
+}
+
+func (x *EncodeBatchRequest) GetTexts() []string {
+	if x != nil {
+		return x.Texts
+	}
+	return nil
+}
+
+func (x *EncodeBatchRequest) GetIncludeTokenTexts() bool {
+	if x != nil {
+		return x.IncludeTokenTexts
+	}
+	return false
+}
+
+type EncodeBatchResponse struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Results       []*EncodeResponse      `protobuf:"bytes,1,rep,name=results,proto3" json:"results,omitempty"`
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *EncodeBatchResponse) Reset() {
+	*x = EncodeBatchResponse{}
+	mi := &file_tokenizer_proto_msgTypes[3]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *EncodeBatchResponse) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*EncodeBatchResponse) ProtoMessage() {}
+
+func (x *EncodeBatchResponse) ProtoReflect() protoreflect.Message {
+	mi := &file_tokenizer_proto_msgTypes[3]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use EncodeBatchResponse.ProtoReflect.Descriptor instead.
+func (*EncodeBatchResponse) Descriptor() ([]byte, []int) {
+	return file_tokenizer_proto_rawDescGZIP(), []int{3}
+}
+
+func (x *EncodeBatchResponse) GetResults() []*EncodeResponse {
+	if x != nil {
+		return x.Results
+	}
+	return nil
+}
+
 var File_tokenizer_proto protoreflect.FileDescriptor
 
 const file_tokenizer_proto_rawDesc = "" +
@@ -127,9 +223,15 @@ const file_tokenizer_proto_rawDesc = "" +
 	"\x0eEncodeResponse\x12\x16\n" +
 	"\x06tokens\x18\x01 \x03(\x03R\x06tokens\x12\x1f\n" +
 	"\vtoken_texts\x18\x02 \x03(\tR\n" +
-	"tokenTexts2J\n" +
+	"tokenTexts\"Z\n" +
+	"\x12EncodeBatchRequest\x12\x14\n" +
+	"\x05texts\x18\x01 \x03(\tR\x05texts\x12.\n" +
+	"\x13include_token_texts\x18\x02 \x01(\bR\x11includeTokenTexts\"J\n" +
+	"\x13EncodeBatchResponse\x123\n" +
+	"\aresults\x18\x01 \x03(\v2\x19.tokenizer.EncodeResponseR\aresults2\x98\x01\n" +
 	"\tTokenizer\x12=\n" +
-	"\x06Encode\x12\x18.tokenizer.EncodeRequest\x1a\x19.tokenizer.EncodeResponseB\x0fZ\r./tokenizerpbb\x06proto3"
+	"\x06Encode\x12\x18.tokenizer.EncodeRequest\x1a\x19.tokenizer.EncodeResponse\x12L\n" +
+	"\vEncodeBatch\x12\x1d.tokenizer.EncodeBatchRequest\x1a\x1e.tokenizer.EncodeBatchResponseB\x0fZ\r./tokenizerpbb\x06proto3"
 
 var (
 	file_tokenizer_proto_rawDescOnce sync.Once
@@ -143,19 +245,24 @@ func file_tokenizer_proto_rawDescGZIP() []byte {
 	return file_tokenizer_proto_rawDescData
 }
 
-var file_tokenizer_proto_msgTypes = make([]protoimpl.MessageInfo, 2)
+var file_tokenizer_proto_msgTypes = make([]protoimpl.MessageInfo, 4)
 var file_tokenizer_proto_goTypes = []any{
-	(*EncodeRequest)(nil),  // 0: tokenizer.EncodeRequest
-	(*EncodeResponse)(nil), // 1: tokenizer.EncodeResponse
+	(*EncodeRequest)(nil),       // 0: tokenizer.EncodeRequest
+	(*EncodeResponse)(nil),      // 1: tokenizer.EncodeResponse
+	(*EncodeBatchRequest)(nil),  // 2: tokenizer.EncodeBatchRequest
+	(*EncodeBatchResponse)(nil), // 3: tokenizer.EncodeBatchResponse
 }
 var file_tokenizer_proto_depIdxs = []int32{
-	0, // 0: tokenizer.Tokenizer.Encode:input_type -> tokenizer.EncodeRequest
-	1, // 1: tokenizer.Tokenizer.Encode:output_type -> tokenizer.EncodeResponse
-	1, // [1:2] is the sub-list for method output_type
-	0, // [0:1] is the sub-list for method input_type
-	0, // [0:0] is the sub-list for extension type_name
-	0, // [0:0] is the sub-list for extension extendee
-	0, // [0:0] is the sub-list for field type_name
+	1, // 0: tokenizer.EncodeBatchResponse.results:type_name -> tokenizer.EncodeResponse
+	0, // 1: tokenizer.Tokenizer.Encode:input_type -> tokenizer.EncodeRequest
+	2, // 2: tokenizer.Tokenizer.EncodeBatch:input_type -> tokenizer.EncodeBatchRequest
+	1, // 3: tokenizer.Tokenizer.Encode:output_type -> tokenizer.EncodeResponse
+	3, // 4: tokenizer.Tokenizer.EncodeBatch:output_type -> tokenizer.EncodeBatchResponse
+	3, // [3:5] is the sub-list for method output_type
+	1, // [1:3] is the sub-list for method input_type
+	1, // [1:1] is the sub-list for extension type_name
+	1, // [1:1] is the sub-list for extension extendee
+	0, // [0:1] is the sub-list for field type_name
 }
 
 func init() { file_tokenizer_proto_init() }
@@ -169,7 +276,7 @@ func file_tokenizer_proto_init() {
 			GoPackagePath: reflect.TypeOf(x{}).PkgPath(),
 			RawDescriptor: unsafe.Slice(unsafe.StringData(file_tokenizer_proto_rawDesc), len(file_tokenizer_proto_rawDesc)),
 			NumEnums:      0,
-			NumMessages:   2,
+			NumMessages:   4,
 			NumExtensions: 0,
 			NumServices:   1,
 		},
@@ -19,7 +19,8 @@ import (
 const _ = grpc.SupportPackageIsVersion9
 
 const (
-	Tokenizer_Encode_FullMethodName = "/tokenizer.Tokenizer/Encode"
+	Tokenizer_Encode_FullMethodName      = "/tokenizer.Tokenizer/Encode"
+	Tokenizer_EncodeBatch_FullMethodName = "/tokenizer.Tokenizer/EncodeBatch"
 )
 
 // TokenizerClient is the client API for Tokenizer service.
@@ -27,6 +28,7 @@ const (
 // For semantics around ctx use and closing/ending streaming RPCs, please refer to https://pkg.go.dev/google.golang.org/grpc/?tab=doc#ClientConn.NewStream.
 type TokenizerClient interface {
 	Encode(ctx context.Context, in *EncodeRequest, opts ...grpc.CallOption) (*EncodeResponse, error)
+	EncodeBatch(ctx context.Context, in *EncodeBatchRequest, opts ...grpc.CallOption) (*EncodeBatchResponse, error)
 }
 
 type tokenizerClient struct {
@@ -47,11 +49,22 @@ func (c *tokenizerClient) Encode(ctx context.Context, in *EncodeRequest, opts ..
 	return out, nil
 }
 
+func (c *tokenizerClient) EncodeBatch(ctx context.Context, in *EncodeBatchRequest, opts ...grpc.CallOption) (*EncodeBatchResponse, error) {
+	cOpts := append([]grpc.CallOption{grpc.StaticMethod()}, opts...)
+	out := new(EncodeBatchResponse)
+	err := c.cc.Invoke(ctx, Tokenizer_EncodeBatch_FullMethodName, in, out, cOpts...)
+	if err != nil {
+		return nil, err
+	}
+	return out, nil
+}
+
 // TokenizerServer is the server API for Tokenizer service.
 // All implementations must embed UnimplementedTokenizerServer
 // for forward compatibility.
 type TokenizerServer interface {
 	Encode(context.Context, *EncodeRequest) (*EncodeResponse, error)
+	EncodeBatch(context.Context, *EncodeBatchRequest) (*EncodeBatchResponse, error)
 	mustEmbedUnimplementedTokenizerServer()
 }
 
@@ -65,6 +78,9 @@ type UnimplementedTokenizerServer struct{}
 func (UnimplementedTokenizerServer) Encode(context.Context, *EncodeRequest) (*EncodeResponse, error) {
 	return nil, status.Errorf(codes.Unimplemented, "method Encode not implemented")
 }
+func (UnimplementedTokenizerServer) EncodeBatch(context.Context, *EncodeBatchRequest) (*EncodeBatchResponse, error) {
+	return nil, status.Errorf(codes.Unimplemented, "method EncodeBatch not implemented")
+}
 func (UnimplementedTokenizerServer) mustEmbedUnimplementedTokenizerServer() {}
 func (UnimplementedTokenizerServer) testEmbeddedByValue()                   {}
 
@@ -104,6 +120,24 @@ func _Tokenizer_Encode_Handler(srv interface{}, ctx context.Context, dec func(in
 	return interceptor(ctx, in, info, handler)
 }
 
+func _Tokenizer_EncodeBatch_Handler(srv interface{}, ctx context.Context, dec func(interface{}) error, interceptor grpc.UnaryServerInterceptor) (interface{}, error) {
+	in := new(EncodeBatchRequest)
+	if err := dec(in); err != nil {
+		return nil, err
+	}
+	if interceptor == nil {
+		return srv.(TokenizerServer).EncodeBatch(ctx, in)
+	}
+	info := &grpc.UnaryServerInfo{
+		Server:     srv,
+		FullMethod: Tokenizer_EncodeBatch_FullMethodName,
+	}
+	handler := func(ctx context.Context, req interface{}) (interface{}, error) {
+		return srv.(TokenizerServer).EncodeBatch(ctx, req.(*EncodeBatchRequest))
+	}
+	return interceptor(ctx, in, info, handler)
+}
+
 // Tokenizer_ServiceDesc is the grpc.ServiceDesc for Tokenizer service.
 // It's only intended for direct use with grpc.RegisterService,
 // and not to be introspected or modified (even as a copy)
@@ -115,6 +149,10 @@ var Tokenizer_ServiceDesc = grpc.ServiceDesc{
 			MethodName: "Encode",
 			Handler:    _Tokenizer_Encode_Handler,
 		},
+		{
+			MethodName: "EncodeBatch",
+			Handler:    _Tokenizer_EncodeBatch_Handler,
+		},
 	},
 	Streams:  []grpc.StreamDesc{},
 	Metadata: "tokenizer.proto",
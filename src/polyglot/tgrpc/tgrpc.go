@@ -5,6 +5,8 @@ import (
 	"fmt"
 	"log"
 	"net"
+	"runtime"
+	"sync"
 
 	"bpe"
 	pb "proto/tokenizerpb"
@@ -40,6 +42,63 @@ func (s *Server) Encode(ctx context.Context, req *pb.EncodeRequest) (*pb.EncodeR
 	}, nil
 }
 
+// EncodeBatch implements the EncodeBatch RPC, encoding texts concurrently and returning results in request order
+func (s *Server) EncodeBatch(ctx context.Context, req *pb.EncodeBatchRequest) (*pb.EncodeBatchResponse, error) {
+	convertedMap, ok := s.vocab["merges"].(map[string]interface{})
+	if !ok {
+		return nil, fmt.Errorf("merges map not found or invalid")
+	}
+
+	texts := req.GetTexts()
+	results := make([]*pb.EncodeResponse, len(texts))
+	errs := make([]error, len(texts))
+
+	// Fan the batch out over one goroutine per core
+	var wg sync.WaitGroup
+	indices := make(chan int)
+	for w := 0; w < runtime.GOMAXPROCS(0); w++ {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			for i := range indices {
+				tokens, err := bpe.Encode(convertedMap, texts[i])
+				if err != nil {
+					errs[i] = err
+					continue
+				}
+
+				// Token texts are only resolved when asked for
+				result := &pb.EncodeResponse{Tokens: tokens}
+				if req.GetIncludeTokenTexts() {
+					result.TokenTexts, errs[i] = bpe.ListToTokens(tokens, convertedMap)
+				}
+				results[i] = result
+			}
+		}()
+	}
+
+	// Stop handing out work if the caller gave up
+	for i := range texts {
+		if ctx.Err() != nil {
+			break
+		}
+		indices <- i
+	}
+	close(indices)
+	wg.Wait()
+
+	if err := ctx.Err(); err != nil {
+		return nil, err
+	}
+	for i, err := range errs {
+		if err != nil {
+			return nil, fmt.Errorf("failed to encode text %d: %w", i, err)
+		}
+	}
+
+	return &pb.EncodeBatchResponse{Results: results}, nil
+}
+
 // StartServer starts the gRPC server
 func StartServer(vocab map[string]interface{}) error {
 	// Listen on Unix socket
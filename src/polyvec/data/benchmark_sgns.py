@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+# Sys path
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from sgns import generate_pairs, generate_pairs_reference
+
+# Zipf-distributed synthetic sentences, roughly shaped like BPE output
+def synthetic_chunk(num_sentences, vocab_size, seed):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(5, 40, size=num_sentences)
+    tokens = np.minimum(rng.zipf(1.2, size=int(lengths.sum())), vocab_size) - 1
+    return [sentence.tolist() for sentence in np.split(tokens, np.cumsum(lengths)[:-1])]
+
+# Unigram^0.75 distribution, as in generate_sgns_pairs
+def sampling_probs(chunk, vocab_size):
+    freq_array = np.zeros(vocab_size, dtype=np.float64)
+    for token_id, freq in Counter(token for sentence in chunk for token in sentence).items():
+        freq_array[token_id] = freq
+    probs = freq_array ** 0.75
+    return probs / probs.sum()
+
+# Both implementations must produce the same (center, context) multiset and only legal negatives
+def check_equivalence(chunk, vocab_size, probs, window_size, negative_sample_size):
+    reference = generate_pairs_reference(chunk, vocab_size, probs, window_size, negative_sample_size)
+    centers, contexts, negatives = generate_pairs(chunk, vocab_size, probs, window_size, negative_sample_size)
+    assert Counter((center, context) for center, context, _ in reference) == Counter(zip(centers.tolist(), contexts.tolist()))
+    assert negatives.shape == (len(reference), negative_sample_size)
+
+    # Negatives never hit the center's window or the center itself
+    each_side = window_size // 2
+    row = 0
+    for sentence in chunk:
+        for i, token in enumerate(sentence):
+            forbidden = set(sentence[max(0, i - each_side):i + each_side + 1])
+            count = len(set(sentence[max(0, i - each_side):i]) | set(sentence[i + 1:i + each_side + 1]))
+            assert not forbidden.intersection(negatives[row:row + count].ravel().tolist())
+            row += count
+
+    # Negative frequencies follow the sampling distribution equally closely
+    reference_counts = np.bincount([n for _, _, negs in reference for n in negs], minlength=vocab_size)
+    vectorized_counts = np.bincount(negatives.ravel(), minlength=vocab_size)
+    distance = 0.5 * np.abs(reference_counts / reference_counts.sum() - vectorized_counts / vectorized_counts.sum()).sum()
+    print(f"Equivalent pairs, total variation between negative distributions: {distance:.4f}")
+
+def benchmark(generate, chunk, vocab_size, probs, window_size, negative_sample_size):
+    start = time.perf_counter()
+    result = generate(chunk, vocab_size, probs, window_size, negative_sample_size)
+    elapsed = time.perf_counter() - start
+    pairs = len(result) if isinstance(result, list) else len(result[0])
+    return pairs, elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pairs per second of SGNS pair generation, before and after vectorization")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--window-size", type=int, default=5)
+    parser.add_argument("--negatives", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunk = synthetic_chunk(args.sentences, args.vocab_size, args.seed)
+    probs = sampling_probs(chunk, args.vocab_size)
+    check_equivalence(chunk[:200], args.vocab_size, probs, args.window_size, args.negatives)
+
+    for name, generate in (("reference", generate_pairs_reference), ("vectorized", generate_pairs)):
+        pairs, elapsed = benchmark(generate, chunk, args.vocab_size, probs, args.window_size, args.negatives)
+        print(f"{name:>10}: {pairs} pairs in {elapsed:.2f}s -> {pairs / elapsed:,.0f} pairs/sec")
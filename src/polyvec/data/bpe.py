@@ -0,0 +1,80 @@
+import json
+import os
+import re
+import unicodedata
+
+TOP_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+MERGES_PATH = TOP_DIRECTORY + "/artifacts/merges.json"
+
+# Same whitespace class as the Go tokenizer's \s (ASCII only)
+WHITESPACE = re.compile(r"[\t\n\f\r ]+")
+
+# Emoji ranges removed by polyglot/normalize
+EMOJI_RANGES = (
+    (0x1F600, 0x1F64F),
+    (0x1F300, 0x1F5FF),
+    (0x1F680, 0x1F6FF),
+    (0x2600, 0x26FF),
+    (0x2700, 0x27BF),
+    (0x1F900, 0x1F9FF),
+    (0x1FA70, 0x1FAFF),
+    (0x180B, 0x180D),
+    (0x180F, 0x180F),
+    (0xFE00, 0xFE0F),
+    (0xE0100, 0xE01EF),
+)
+
+# Load merges.json as a (left, right) -> minted token map
+def load_merges(merges_path=MERGES_PATH):
+    with open(merges_path, 'r') as f:
+        artifact_map = json.load(f)
+
+    merges = {}
+    for key, minted in artifact_map["merges"].items():
+        left, right = key.split(",")
+        merges[(int(left), int(right))] = int(minted)
+    return merges
+
+def is_emoji(char):
+    code = ord(char)
+    return any(low <= code <= high for low, high in EMOJI_RANGES)
+
+# Python port of polyglot/normalize.Normalize
+def normalize(text):
+    # Remove control characters and emoji
+    text = "".join(char for char in text if (char.isprintable() or char.isspace()) and not is_emoji(char))
+
+    # Normalize unicode
+    text = unicodedata.normalize("NFKC", text)
+
+    # Reduce whitespace to single spaces
+    text = WHITESPACE.sub(" ", text).strip()
+
+    return text.lower()
+
+# Python port of polyglot/bpe.Encode: repeatedly apply the earliest minted merge present in the sequence
+def encode(text, merges):
+    tokens = [ord(char) for char in normalize(text)]
+
+    while len(tokens) > 1:
+        # Pair whose minted token is the smallest
+        minted = [merges.get(pair) for pair in zip(tokens, tokens[1:])]
+        candidates = [token for token in minted if token is not None]
+        if not candidates:
+            break
+        best = min(candidates)
+        left, right = tokens[minted.index(best)], tokens[minted.index(best) + 1]
+
+        # Replace every non-overlapping occurrence from left to right
+        merged = []
+        i = 0
+        while i < len(tokens):
+            if i < len(tokens) - 1 and tokens[i] == left and tokens[i + 1] == right:
+                merged.append(best)
+                i += 2
+            else:
+                merged.append(tokens[i])
+                i += 1
+        tokens = merged
+
+    return tokens
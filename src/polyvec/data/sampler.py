@@ -0,0 +1,59 @@
+import numpy as np
+import torch
+
+# Unigram^power negative sampler with O(1) draws (Walker / Vose alias method)
+class UnigramSampler:
+    def __init__(self, token_freqs, power=0.75):
+        # Soft correction, as in generate_sgns_pairs
+        probs = np.asarray(token_freqs, dtype=np.float64) ** power
+        if probs.sum() == 0:
+            raise ValueError("Cannot build a sampler from all-zero frequencies")
+        probs /= probs.sum()
+        self.vocab_size = probs.size
+
+        # Scale so that the average bucket holds exactly 1
+        scaled = probs * self.vocab_size
+        accept = np.ones(self.vocab_size, dtype=np.float64)
+        alias = np.arange(self.vocab_size, dtype=np.int64)
+
+        # Pair every under-full bucket with an over-full one that tops it up
+        small = [int(i) for i in np.flatnonzero(scaled < 1.0)]
+        large = [int(i) for i in np.flatnonzero(scaled >= 1.0)]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            accept[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # Whatever is left is full up to rounding error
+        self.accept = accept
+        self.alias = alias
+        self.accept_tensor = torch.from_numpy(accept)
+        self.alias_tensor = torch.from_numpy(alias)
+
+    # NumPy draws of the given shape
+    def sample(self, shape, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        buckets = rng.integers(0, self.vocab_size, size=shape)
+        return np.where(rng.random(shape) < self.accept[buckets], buckets, self.alias[buckets])
+
+    # (B, K) torch draws that avoid each row's tokens in exclude (B, E), redrawing hits up to max_redraws times.
+    # Returns the draws and a mask that is False where a hit survived every redraw, so the loss can skip it
+    def sample_excluding(self, exclude, count, generator=None, max_redraws=3):
+        negatives = self.sample_torch((exclude.size(0), count), generator)
+        for redraw in range(max_redraws + 1):
+            hits = (negatives.unsqueeze(-1) == exclude.unsqueeze(1)).any(dim=-1)
+            if redraw == max_redraws or not hits.any():
+                break
+            negatives[hits] = self.sample_torch((int(hits.sum()),), generator)
+        return negatives, ~hits
+
+    # Torch draws of the given shape
+    def sample_torch(self, shape, generator=None):
+        buckets = torch.randint(0, self.vocab_size, shape, generator=generator)
+        coins = torch.rand(shape, generator=generator, dtype=torch.float64)
+        return torch.where(coins < self.accept_tensor[buckets], buckets, self.alias_tensor[buckets])
@@ -4,20 +4,27 @@ import numpy as np
 import json
 import random
 import torch
+import collections
 import concurrent.futures
+import multiprocessing
 import time
 import os
 import requests
 import time
 import grpc
 import sys
+import threading
+from multiprocessing import shared_memory
 from tqdm import tqdm
 from datetime import datetime
 
 # Sys path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'proto')))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from util import fetch_data_from_s3, upload_to_s3, get_vocab_size
+from token_cache import merges_version, cache_path, is_cached, open_tokens, save_tokens
+from shards import SHARD_EXTENSION, pack_pairs
+from util import list_data_keys, stream_files_from_s3, upload_bytes_to_s3, upload_tensor_to_s3, get_vocab_size
 import tokenizerpb.tokenizer_pb2 as tokenizer_pb2
 import tokenizerpb.tokenizer_pb2_grpc as tokenizer_pb2_grpc
 
@@ -31,9 +38,41 @@ class TokenizerClient:
         request = tokenizer_pb2.EncodeRequest(text=sentence)
         return self.stub.Encode(request)
 
+    # Tokenize sentences in batches with at most max_in_flight batches outstanding, yielding token lists in input order
+    def encode_batch(self, sentences, batch_size=256, max_in_flight=8, max_retries=3):
+        in_flight = collections.deque()
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            in_flight.append((batch, self.stub.EncodeBatch.future(tokenizer_pb2.EncodeBatchRequest(texts=batch))))
+
+            # Wait on the oldest batch once the window is full
+            if len(in_flight) >= max_in_flight:
+                yield from self._collect_batch(*in_flight.popleft(), max_retries)
+        while in_flight:
+            yield from self._collect_batch(*in_flight.popleft(), max_retries)
+
+    # Result of one batch, resent synchronously if the call failed
+    def _collect_batch(self, batch, future, max_retries):
+        for attempt in range(max_retries):
+            try:
+                response = future.result()
+                return [result.tokens for result in response.results]
+            except grpc.RpcError as e:
+                print(f"Attempt {attempt + 1}: gRPC batch call failed with exception: {e}")
+
+            if attempt + 1 < max_retries:
+                time.sleep(2 ** attempt)
+                future = self.stub.EncodeBatch.future(tokenizer_pb2.EncodeBatchRequest(texts=batch))
+
+        print("All retry attempts failed, dropping batch of", len(batch))
+        return [None] * len(batch)
+
 # Instantiate the GRPC client
 client = TokenizerClient()
 
+# Token frequency counts per source file, in the sgns-artifacts bucket
+TOKEN_FREQS_PREFIX = "token_freqs/files/"
+
 def sample_negatives(k, vocab_size, sampling_probs, forbidden):
     negatives = []
     while len(negatives) < k:
@@ -46,9 +85,10 @@ def sample_negatives(k, vocab_size, sampling_probs, forbidden):
     return negatives
 
 
-def process_chunk(chunk, file_name, vocab_size, neg_sampling_probs, window_size, negative_sample_size):
+# Reference (token-at-a-time) pair generation, kept for benchmarking and equivalence checks
+def generate_pairs_reference(chunk, vocab_size, neg_sampling_probs, window_size, negative_sample_size):
     token_pairs = []
-    for tokens in tqdm(chunk):
+    for tokens in chunk:
         # Build window
         each_side = window_size // 2
 
@@ -79,9 +119,163 @@ def process_chunk(chunk, file_name, vocab_size, neg_sampling_probs, window_size,
             for context_token in context:
                 negative_samples = [int(num) for num in sample_negatives(negative_sample_size, vocab_size, neg_sampling_probs, seen)]
                 token_pairs.append((token, context_token, negative_samples))
+    return token_pairs
+
+
+# Draw k negatives per row from a cumulative distribution, rejecting each row's forbidden tokens
+def sample_negatives_bulk(forbidden, k, cdf, rng):
+    negatives = np.empty((forbidden.shape[0], k), dtype=np.int64)
+    filled = np.zeros(forbidden.shape[0], dtype=np.int64)
 
-    # Upload to s3
-    upload_to_s3(token_pairs, file_name)
+    # Rows that still need negatives
+    todo = np.arange(forbidden.shape[0])
+    while todo.size:
+        # k candidates per row, as in sample_negatives
+        draws = np.searchsorted(cdf, rng.random((todo.size, k)), side='right')
+
+        # Reject candidates that appear in the row's window or are the center itself
+        accepted = ~(draws[:, :, None] == forbidden[todo][:, None, :]).any(axis=2)
+
+        # Accepted candidates fill the row's remaining slots in draw order
+        slot = np.cumsum(accepted, axis=1) - 1 + filled[todo][:, None]
+        place = accepted & (slot < k)
+        rows, cols = np.nonzero(place)
+        negatives[todo[rows], slot[rows, cols]] = draws[rows, cols]
+
+        filled[todo] = np.minimum(k, filled[todo] + accepted.sum(axis=1))
+        todo = todo[filled[todo] < k]
+    return negatives
+
+
+# Pairs whose negatives are drawn together, bounds the (pairs x k x window) rejection temporary
+NEGATIVE_BATCH = 1 << 16
+
+# Vectorized pair generation: every (center, context) pair of a chunk as flat arrays
+def generate_pairs(chunk, vocab_size, neg_sampling_probs, window_size, negative_sample_size, rng=None, keep_probs=None):
+    # Flatten the chunk into one token array
+    lengths = np.fromiter((len(tokens) for tokens in chunk), dtype=np.int64, count=len(chunk))
+    tokens = np.fromiter((token for sentence in chunk for token in sentence), dtype=np.int64, count=int(lengths.sum()))
+    return generate_pairs_flat(tokens, lengths, neg_sampling_probs, window_size, negative_sample_size, rng, keep_probs)
+
+
+# Per-token keep probabilities of Mikolov subsampling (word2vec form), None when disabled
+def subsampling_keep_probs(freq_array, threshold):
+    if not threshold:
+        return None
+    total = freq_array.sum()
+    ratio = np.divide(threshold * total, freq_array, out=np.full_like(freq_array, np.inf), where=freq_array > 0)
+    return np.minimum(1.0, np.sqrt(ratio) + ratio)
+
+
+# Pair generation over a flat token array and per-sentence lengths
+def generate_pairs_flat(tokens, lengths, neg_sampling_probs, window_size, negative_sample_size, rng=None, keep_probs=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    each_side = window_size // 2
+
+    # Sentence bounds per position
+    tokens = np.asarray(tokens, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+
+    # Drop frequent tokens before windowing, so the survivors' windows reach further
+    if keep_probs is not None:
+        kept = rng.random(tokens.size) < keep_probs[tokens]
+        sentence_ids = np.repeat(np.arange(lengths.size), lengths)
+        lengths = np.bincount(sentence_ids[kept], minlength=lengths.size)
+        tokens = tokens[kept]
+
+    sentence_end = np.repeat(np.cumsum(lengths), lengths)
+    sentence_start = sentence_end - np.repeat(lengths, lengths)
+    positions = np.arange(tokens.size)
+
+    # Window matrix: one column per offset, -1 outside the sentence
+    offsets = [offset for offset in range(-each_side, each_side + 1) if offset != 0]
+    window = np.full((tokens.size, len(offsets)), -1, dtype=np.int64)
+    for column, offset in enumerate(offsets):
+        inside = (positions + offset >= sentence_start) & (positions + offset < sentence_end)
+        window[inside, column] = tokens[positions[inside] + offset]
+
+    # Distinct context tokens per center, like the seen set
+    window.sort(axis=1)
+    distinct = window != -1
+    distinct[:, 1:] &= window[:, 1:] != window[:, :-1]
+    rows, columns = np.nonzero(distinct)
+    centers = tokens[rows]
+    contexts = window[rows, columns]
+
+    if negative_sample_size == 0:
+        return centers, contexts, np.empty((centers.size, 0), dtype=np.int64)
+
+    # Forbidden negatives are the center's window plus the center itself
+    cdf = np.cumsum(neg_sampling_probs)
+    cdf /= cdf[-1]
+    negatives = np.empty((centers.size, negative_sample_size), dtype=np.int64)
+    for start in range(0, centers.size, NEGATIVE_BATCH):
+        stop = start + NEGATIVE_BATCH
+        forbidden = np.concatenate((window[rows[start:stop]], centers[start:stop, None]), axis=1)
+        negatives[start:stop] = sample_negatives_bulk(forbidden, negative_sample_size, cdf, rng)
+
+    return centers, contexts, negatives
+
+
+def process_chunk(chunk, file_name, vocab_size, neg_sampling_probs, window_size, negative_sample_size, rng=None, keep_probs=None):
+    centers, contexts, negatives = generate_pairs(chunk, vocab_size, neg_sampling_probs, window_size, negative_sample_size, rng, keep_probs)
+    upload_pairs(centers, contexts, negatives, file_name)
+
+
+def upload_pairs(centers, contexts, negatives, file_name):
+    # Packed int32 columns, negatives are empty unless asked for here
+    upload_bytes_to_s3(pack_pairs(centers, contexts, negatives), file_name)
+
+
+# Copy an array into a new shared memory block, returning the block and what workers need to attach it
+def share_array(array):
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+# Pool worker state: shared memory block name -> (block, array view), attached on first use in each process. Blocks
+# are unique per generate_sgns_pairs call, so a later call (or thread pool in this process) never sees stale tables
+shared_arrays = {}
+shared_arrays_lock = threading.Lock()
+
+def attach_shared_array(spec):
+    if spec is None:
+        return None
+    name, shape, dtype = spec
+    with shared_arrays_lock:
+        if name not in shared_arrays:
+            block = shared_memory.SharedMemory(name=name)
+            shared_arrays[name] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        return shared_arrays[name][1]
+
+# Drop this process's views of blocks that are about to be unlinked
+def detach_shared_arrays(specs):
+    with shared_arrays_lock:
+        for name, _, _ in specs.values():
+            entry = shared_arrays.pop(name, None)
+            if entry is not None:
+                block = entry[0]
+                del entry
+                block.close()
+
+
+# Generate and upload the pairs of sentences [sentence_start, sentence_stop) of a cached token file
+def process_cached_chunk(token_path, sentence_start, sentence_stop, file_name, window_size, negative_sample_size, seed,
+                         specs):
+    neg_sampling_probs = attach_shared_array(specs["neg_sampling_probs"])
+    keep_probs = attach_shared_array(specs.get("keep_probs"))
+
+    # Workers read their sentences from local disk, nothing but the path is sent to them. The cache files are
+    # memory-mapped, so a chunk only pages in its own slice
+    all_tokens, all_offsets = open_tokens(token_path)
+    offsets = np.array(all_offsets[sentence_start:sentence_stop + 1])
+    tokens = np.array(all_tokens[offsets[0]:offsets[-1]])
+
+    rng = np.random.default_rng(seed)
+    centers, contexts, negatives = generate_pairs_flat(tokens, np.diff(offsets), neg_sampling_probs, window_size, negative_sample_size, rng,
+                                                       keep_probs)
+    upload_pairs(centers, contexts, negatives, file_name)
 
 
 def process_sentence(sentence):
@@ -99,76 +293,111 @@ def process_sentence(sentence):
     return None
 
 
-def generate_sgns_pairs(start_idx, end_idx):
-    # Grab data
-    start_time = time.time()
-    sentences = fetch_data_from_s3("tknzr", start_idx, end_idx)
-    print("Done grabbing data from S3", time.time() - start_time)
+# Pass 1: fetch -> tokenize -> spill to the token cache, a bounded number of files in memory at a time
+def tokenize_files(bucket_name, file_keys, version, use_cache=True):
+    missing = [file_key for file_key in file_keys if not (use_cache and is_cached(cache_path(bucket_name, file_key, version)))]
+    print(f"{len(file_keys) - len(missing)} of {len(file_keys)} files already tokenized")
 
-    # Process sentences in parallel
-    cpu_cores = os.cpu_count()
-    max_workers = max(1, int(cpu_cores * 0.75))
-    token_freqs = Counter()
-    token_list = []
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = {executor.submit(process_sentence, sentence): sentence for sentence in sentences}
-        with tqdm(total=len(futures), desc="Processing sentences") as pbar:
-            for future in concurrent.futures.as_completed(futures):
-                tokens = future.result()
-                if tokens:
-                    token_list.append(tokens)
-                pbar.update(1)
+    for file_key, data in stream_files_from_s3(bucket_name, missing):
+        sentences = [sentence for language_sentences in data.values() for sentence in language_sentences]
+        token_lists = list(tqdm(client.encode_batch(sentences), total=len(sentences), desc=f"Tokenizing {file_key}"))
 
-    print("Done getting tokens", time.time() - start_time)
+        # Only complete files are cached, failed batches are retried on the next run
+        if any(tokens is None for tokens in token_lists):
+            print(f"Skipping {file_key}, some sentences failed to tokenize")
+            continue
+        save_tokens(bucket_name, file_key, version, token_lists)
 
-    # Get frequencies
-    token_freqs = Counter()
-    for sentence in token_list:
-        token_freqs.update(sentence)
+    # Files that made it into the cache
+    return [cache_path(bucket_name, file_key, version) for file_key in file_keys
+            if is_cached(cache_path(bucket_name, file_key, version))]
 
-    # Get vocab size
-    vocab_size = get_vocab_size()
 
-    # Initialize an array for probabilities
+# Token counts over every cached file, streamed one file at a time. With upload, each file's counts also go to S3 as
+# (token ids, counts) under the file's own key, so regenerating a range overwrites them instead of counting it twice
+def count_tokens(token_paths, vocab_size, upload=False):
     freq_array = np.zeros(vocab_size, dtype=np.float64)
+    for token_path in token_paths:
+        tokens, _ = open_tokens(token_path)
+        counts = np.bincount(tokens, minlength=vocab_size)[:vocab_size]
+        freq_array += counts
+        if upload:
+            token_ids = np.flatnonzero(counts)
+            name = os.path.basename(token_path)
+            upload_tensor_to_s3(torch.from_numpy(np.stack((token_ids, counts[token_ids]))), f"{TOKEN_FREQS_PREFIX}{name}.pt")
+    return freq_array
+
+
+# Pass 2 work units: (token file, first sentence, last sentence) of at most chunk_size sentences
+def plan_chunks(token_paths, chunk_size):
+    for token_path in token_paths:
+        num_sentences = open_tokens(token_path)[1].size - 1
+        for sentence_start in range(0, num_sentences, chunk_size):
+            yield token_path, sentence_start, min(sentence_start + chunk_size, num_sentences)
+
+
+def generate_sgns_pairs(start_idx, end_idx, negative_sample_size=0, window_size=5, use_cache=True, parallel="process", seed=None,
+                        chunk_size=10000, subsample_threshold=1e-4):
+    # Pass 1: tokenize every file missing from the cache
+    start_time = time.time()
+    version = merges_version()
+    token_paths = tokenize_files("tknzr", list_data_keys("tknzr", start_idx, end_idx), version, use_cache)
+    print("Done getting tokens", time.time() - start_time)
 
-    # Fill in frequencies
-    for token_id, freq in token_freqs.items():
-        freq_array[token_id] = freq
+    # Get vocab size
+    vocab_size = get_vocab_size()
+
+    # Get frequencies
+    freq_array = count_tokens(token_paths, vocab_size, upload=True)
 
     # Soft correction
     neg_sampling_probs = freq_array ** 0.75
     neg_sampling_probs /= neg_sampling_probs.sum()
 
-    # Iterate through sentences in chunks
-    window_size = 5
-    negative_sample_size = 15
-    chunk_size = 10000
+    # Subsampling of frequent tokens, from the same counts
+    keep_probs = subsampling_keep_probs(freq_array, subsample_threshold)
 
-    # Use ThreadPoolExecutor for parallel processing
     print("Ready to start processing chunks", time.time() - start_time)
-    print("Total token list size", len(token_list))
-    print("Batch size", len(token_list) // chunk_size)
-
-    # Process chunks in parallel
+    print("Total token count", int(freq_array.sum()))
+    if keep_probs is not None:
+        print("Expected tokens kept after subsampling", int((freq_array * keep_probs).sum()))
+
+    # The sampling tables are the only shared state, workers read their tokens from the cache
+    blocks, specs = {}, {}
+    for key, array in (("neg_sampling_probs", neg_sampling_probs), ("keep_probs", keep_probs)):
+        if array is not None:
+            blocks[key], specs[key] = share_array(array)
     cpu_cores = os.cpu_count()
-    max_workers = max(1, int(cpu_cores * 0.75))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-        for chunk_index in range(0, len(token_list), chunk_size):
-            # Get a single chunk
-            chunk = token_list[chunk_index:chunk_index + chunk_size]
-
-            # Inside your function where you define the file_name
-            current_time = datetime.now().strftime("%Y%m%d%H%M%S")
-            # print("Chunk number", chunk_index // chunk_size)
-            file_name = f"{start_idx}_{chunk_index // chunk_size}_{current_time}.pt"
-            futures.append(executor.submit(process_chunk, chunk, file_name, vocab_size, neg_sampling_probs, window_size, negative_sample_size))
-
-        # Wait for all futures to complete with progress tracking
-        with tqdm(total=len(futures), desc="Processing chunks") as pbar:
-            for future in concurrent.futures.as_completed(futures):
-                future.result()  # Get the result to catch any exceptions
+    if parallel == "thread":
+        max_workers = max(1, int(cpu_cores * 0.75))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        max_workers = cpu_cores
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # Pass 2: a bounded number of chunks in flight, one child seed per chunk for reproducible output
+    seed_sequence = np.random.SeedSequence(seed)
+    current_time = datetime.now().strftime("%Y%m%d%H%M%S")
+    max_in_flight = 2 * max_workers
+    try:
+        with executor, tqdm(desc="Processing chunks") as pbar:
+            in_flight = set()
+            for chunk_number, (token_path, sentence_start, sentence_stop) in enumerate(plan_chunks(token_paths, chunk_size)):
+                file_name = f"{start_idx}_{chunk_number}_{current_time}{SHARD_EXTENSION}"
+                in_flight.add(executor.submit(process_cached_chunk, token_path, sentence_start, sentence_stop, file_name,
+                                              window_size, negative_sample_size, seed_sequence.spawn(1)[0], specs))
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()  # Get the result to catch any exceptions
+                    pbar.update(len(done))
+            for future in concurrent.futures.as_completed(in_flight):
+                future.result()
                 pbar.update(1)
-    
+    finally:
+        detach_shared_arrays(specs)
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
     print("Done processing chunks", time.time() - start_time)
@@ -0,0 +1,52 @@
+import struct
+
+import numpy as np
+
+# Packed SGNS shard: header, then int32 columns centers[n], contexts[n] and negatives[n * k]
+MAGIC = b"SGNS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQI")
+SHARD_EXTENSION = ".pairs"
+
+# Serialize pair columns into one packed shard
+def pack_pairs(centers, contexts, negatives=None):
+    centers = np.ascontiguousarray(centers, dtype=np.int32)
+    contexts = np.ascontiguousarray(contexts, dtype=np.int32)
+    if negatives is None:
+        negatives = np.empty((centers.size, 0), dtype=np.int32)
+    negatives = np.ascontiguousarray(negatives, dtype=np.int32)
+    if contexts.size != centers.size or negatives.shape[0] != centers.size:
+        raise ValueError("Pair columns must have the same number of rows")
+
+    header = HEADER.pack(MAGIC, VERSION, 0, centers.size, negatives.shape[1])
+    return b"".join((header, centers.tobytes(), contexts.tobytes(), negatives.tobytes()))
+
+# Zero-copy (centers, contexts, negatives) views of a packed shard held in a buffer or memory map
+def unpack_pairs(data):
+    buffer = memoryview(data)
+    magic, version, _, num_pairs, num_negatives = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} SGNS shard")
+
+    # Columns follow the header back to back
+    offset = HEADER.size
+    centers = np.frombuffer(buffer, dtype=np.int32, count=num_pairs, offset=offset)
+    offset += centers.nbytes
+    contexts = np.frombuffer(buffer, dtype=np.int32, count=num_pairs, offset=offset)
+    offset += contexts.nbytes
+    negatives = np.frombuffer(buffer, dtype=np.int32, count=num_pairs * num_negatives, offset=offset)
+    return centers, contexts, negatives.reshape(num_pairs, num_negatives)
+
+# Memory-mapped shard on local disk
+def read_shard(path):
+    return unpack_pairs(np.memmap(path, dtype=np.uint8, mode='r'))
+
+# Columns of a legacy torch.save shard of (center, context[, negatives]) tuples
+def columns_from_tuples(pairs):
+    centers = np.fromiter((pair[0] for pair in pairs), dtype=np.int32, count=len(pairs))
+    contexts = np.fromiter((pair[1] for pair in pairs), dtype=np.int32, count=len(pairs))
+    if pairs and len(pairs[0]) > 2:
+        negatives = np.asarray([pair[2] for pair in pairs], dtype=np.int32)
+    else:
+        negatives = np.empty((len(pairs), 0), dtype=np.int32)
+    return centers, contexts, negatives
@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+import numpy as np
+
+TOP_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+MERGES_PATH = TOP_DIRECTORY + "/artifacts/merges.json"
+
+# Tokenized sentences per source file, one directory per tokenizer version
+CACHE_DIRECTORY = os.getenv("POLYDB_TOKEN_CACHE", TOP_DIRECTORY + "/artifacts/token_cache")
+
+# Short content hash of merges.json, any retrained tokenizer gets a fresh cache
+def merges_version(merges_path=MERGES_PATH):
+    digest = hashlib.sha256()
+    with open(merges_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+# Cache entry of one source object: path + ".tokens.npy" and path + ".offsets.npy", uncompressed so readers can
+# memory-map them and read only the sentences they need
+def cache_path(bucket_name, file_key, version):
+    name = file_key.replace("/", "__")
+    return os.path.join(CACHE_DIRECTORY, version, bucket_name, name)
+
+# The offsets are written last, so they mark a complete entry
+def is_cached(path):
+    return os.path.exists(path + ".offsets.npy")
+
+# Flat int32 tokens and int64 sentence offsets (len(sentences) + 1) of a cache entry, memory-mapped by default
+def open_tokens(path, mmap_mode='r'):
+    return np.load(path + ".tokens.npy", mmap_mode=mmap_mode), np.load(path + ".offsets.npy", mmap_mode=mmap_mode)
+
+# Tokens and offsets of a cached file read into memory, None on a miss
+def load_tokens(bucket_name, file_key, version):
+    path = cache_path(bucket_name, file_key, version)
+    if not is_cached(path):
+        return None
+    return open_tokens(path, mmap_mode=None)
+
+# Write one file's tokenized sentences atomically
+def save_tokens(bucket_name, file_key, version, token_lists):
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    tokens = np.fromiter((token for sentence in token_lists for token in sentence), dtype=np.int32, count=int(offsets[-1]))
+
+    path = cache_path(bucket_name, file_key, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for suffix, array in ((".tokens.npy", tokens), (".offsets.npy", offsets)):
+        tmp_path = f"{path}{suffix}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path + suffix)
+    return tokens, offsets
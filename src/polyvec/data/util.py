@@ -1,6 +1,10 @@
 import boto3
+import collections
+import concurrent.futures
+import hashlib
 import json
 import os
+import shutil
 import torch
 import io
 
@@ -10,45 +14,186 @@ TOP_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 aws_access_key_id = os.getenv('AWS_ACCESS_KEY_ID')
 aws_secret_access_key = os.getenv('AWS_SECRET_ACCESS_KEY')
 
+# Local directory standing in for S3 (one subdirectory per bucket), for running the pipeline offline
+LOCAL_S3_DIRECTORY = os.getenv('POLYDB_LOCAL_S3')
+
+# Downloaded objects, keyed by bucket, key and ETag, evicted least recently used first past the size cap
+CACHE_DIRECTORY = os.getenv('POLYDB_S3_CACHE', TOP_DIRECTORY + "/artifacts/s3_cache")
+CACHE_MAX_BYTES = int(os.getenv('POLYDB_S3_CACHE_BYTES', 20 * 1024 ** 3))
+
+# The subset of the boto3 S3 client used here, backed by the local filesystem
+class LocalS3Client:
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, bucket_name, file_key):
+        return os.path.join(self.root, bucket_name, file_key)
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=None):
+        contents = []
+        bucket_directory = os.path.join(self.root, Bucket)
+        for directory, _, names in os.walk(bucket_directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, bucket_directory).replace(os.sep, '/')
+                if key.startswith(Prefix):
+                    contents.append({'Key': key, 'Size': os.path.getsize(path)})
+        contents.sort(key=lambda obj: obj['Key'])
+        return {'Contents': contents, 'IsTruncated': False} if contents else {'IsTruncated': False}
+
+    def get_paginator(self, operation_name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix=''):
+                yield client.list_objects_v2(Bucket=Bucket, Prefix=Prefix)
+        return Paginator()
+
+    def head_object(self, Bucket, Key):
+        stat = os.stat(self.local_path(Bucket, Key))
+        return {'ETag': f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', 'ContentLength': stat.st_size}
+
+    def get_object(self, Bucket, Key):
+        with open(self.local_path(Bucket, Key), 'rb') as f:
+            return {'Body': io.BytesIO(f.read()), **self.head_object(Bucket, Key)}
+
+    def download_file(self, Bucket, Key, Filename):
+        shutil.copyfile(self.local_path(Bucket, Key), Filename)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key):
+        path = self.local_path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            shutil.copyfileobj(Fileobj, f)
+        os.replace(path + '.tmp', path)
+
 # Create an S3 client using the environment variables
-s3_client = boto3.client(
-    's3',
-    region_name='us-east-1',
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key
-)
+if LOCAL_S3_DIRECTORY:
+    s3_client = LocalS3Client(LOCAL_S3_DIRECTORY)
+else:
+    s3_client = boto3.client(
+        's3',
+        region_name='us-east-1',
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key
+    )
 
-# Fetch data from S3
-def fetch_data_from_s3(bucket_name, start: int, end: int):
-    # List all objects in the bucket
-    response = s3_client.list_objects_v2(Bucket=bucket_name)
-    
-    if 'Contents' not in response:
-        return []
+# Local path of an object, downloaded into the cache unless this ETag is already there
+def fetch_cached_file(bucket_name, file_key):
+    # Local objects are read in place
+    if isinstance(s3_client, LocalS3Client):
+        return s3_client.local_path(bucket_name, file_key)
+
+    # A changed object gets a new ETag and therefore a new cache entry
+    etag = s3_client.head_object(Bucket=bucket_name, Key=file_key)['ETag']
+    digest = hashlib.sha256(f"{bucket_name}/{file_key}/{etag}".encode('utf-8')).hexdigest()
+    path = os.path.join(CACHE_DIRECTORY, digest)
+
+    # Hits refresh the modification time, which is the LRU clock
+    if os.path.exists(path):
+        os.utime(path)
+        return path
 
-    file_keys = [obj['Key'] for obj in response['Contents']]
-    data_list = []
+    # Download next to the entry and move it into place
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    s3_client.download_file(bucket_name, file_key, tmp_path)
+    os.replace(tmp_path, path)
+    evict_cache(keep=path)
+    return path
+
+# Remove least recently used entries until the cache fits under CACHE_MAX_BYTES
+def evict_cache(keep=None):
+    entries = []
+    for name in os.listdir(CACHE_DIRECTORY):
+        if name.endswith('.tmp'):
+            continue
+        try:
+            stat = os.stat(os.path.join(CACHE_DIRECTORY, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, os.path.join(CACHE_DIRECTORY, name)))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+# Sorted data file keys [start:end] of a bucket, across every page of the listing
+def list_data_keys(bucket_name, start: int, end: int):
+    file_keys = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name):
+        file_keys.extend(obj['Key'] for obj in page.get('Contents', []))
 
     # Get a set of files
     file_keys.sort()
-    file_keys = file_keys[start:end]
+    return file_keys[start:end]
 
-    # Fetch each file
-    for file_key in file_keys:
-        print(file_key)
-        obj = s3_client.get_object(Bucket=bucket_name, Key=file_key)
-        file_content = obj['Body'].read().decode('utf-8')
-        try:
-            # Load file
-            data = json.loads(file_content)
-            
-            # Add just the sentences
-            for language in data.keys():
-                data_list.extend(data[language])
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from {file_key}")
+# Raw bytes of one data file
+def read_file_from_s3(bucket_name, file_key):
+    print(file_key)
+    with open(fetch_cached_file(bucket_name, file_key), 'rb') as f:
+        return f.read()
+
+# Sentences of a data file's bytes as {language: [sentences]}, optionally only some languages
+def decode_languages(file_key, file_content, languages=None):
+    try:
+        # Load file
+        data = json.loads(file_content.decode('utf-8'))
+    except json.JSONDecodeError:
+        print(f"Error decoding JSON from {file_key}")
+        return {}
+
+    return {language: sentences for language, sentences in data.items() if languages is None or language in languages}
 
-    return data_list
+# Fetch the sentences of one data file as {language: [sentences]}, optionally only some languages
+def fetch_languages_from_s3(bucket_name, file_key, languages=None):
+    return decode_languages(file_key, read_file_from_s3(bucket_name, file_key), languages)
+
+# Fetch the sentences of every language in one data file
+def fetch_sentences_from_s3(bucket_name, file_key, languages=None):
+    # Add just the sentences
+    sentences = []
+    for language_sentences in fetch_languages_from_s3(bucket_name, file_key, languages).values():
+        sentences.extend(language_sentences)
+    return sentences
+
+# Download files on a thread pool and decode them as they are consumed, yielding (file_key, {language: sentences})
+# in key order. Only the downloads run in parallel: json.loads holds the GIL, and decoding in worker processes would
+# just move the cost into unpickling the sentences they send back. Files waiting for the consumer stay as raw bytes,
+# a fraction of their decoded size
+def stream_files_from_s3(bucket_name, file_keys, languages=None, max_workers=8):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # At most max_workers files are downloaded ahead of the consumer
+        in_flight = collections.deque()
+        for file_key in file_keys:
+            in_flight.append((file_key, executor.submit(read_file_from_s3, bucket_name, file_key)))
+            if len(in_flight) >= max_workers:
+                file_key, future = in_flight.popleft()
+                yield file_key, decode_languages(file_key, future.result(), languages)
+        while in_flight:
+            file_key, future = in_flight.popleft()
+            yield file_key, decode_languages(file_key, future.result(), languages)
+
+# Stream sentences of files [start:end], as (language, sentence) pairs when by_language is set
+def stream_sentences_from_s3(bucket_name, start: int, end: int, languages=None, by_language=False, max_workers=8):
+    file_keys = list_data_keys(bucket_name, start, end)
+    for _, data in stream_files_from_s3(bucket_name, file_keys, languages, max_workers):
+        for language, sentences in data.items():
+            for sentence in sentences:
+                yield (language, sentence) if by_language else sentence
+
+# Fetch data from S3
+def fetch_data_from_s3(bucket_name, start: int, end: int):
+    return list(stream_sentences_from_s3(bucket_name, start, end))
 
 # Upload a file to a specific S3 bucket
 def upload_to_s3(pair, file_name):
@@ -63,6 +208,13 @@ def upload_to_s3(pair, file_name):
     except Exception as err:
         print("Unable to upload to s3:", str(err))
 
+# Upload raw bytes (packed pair shards) to a specific S3 bucket
+def upload_bytes_to_s3(data, file_name, bucket_name="sgns-pairs"):
+    try:
+        s3_client.upload_fileobj(io.BytesIO(data), bucket_name, file_name)
+    except Exception as err:
+        print("Unable to upload to s3:", str(err))
+
 # Get the vocab size from the map
 def get_vocab_size():
     merges_file = TOP_DIRECTORY + "/artifacts/merges.json"
@@ -86,15 +238,15 @@ def get_vocab_size():
         return None
 
 # List s3 files
-def list_s3_pt_files(bucket_name='sgns-pairs'):
+def list_s3_pt_files(bucket_name='sgns-pairs', prefix='', extensions=('.pt',)):
     # List all objects in the bucket
     files = []
     paginator = s3_client.get_paginator('list_objects_v2')
     
-    for page in paginator.paginate(Bucket=bucket_name):
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
         if 'Contents' in page:
             for obj in page['Contents']:
-                if obj['Key'].endswith('.pt'):
+                if obj['Key'].endswith(tuple(extensions)):
                     files.append({
                         'key': obj['Key'],
                         'size': obj['Size']
@@ -107,16 +259,24 @@ def list_s3_pt_files(bucket_name='sgns-pairs'):
 # Fetch a file from s3
 def fetch_pt_file_from_s3(bucket_name, file_key):
     try:
-        # Get the object from S3
-        response = s3_client.get_object(Bucket=bucket_name, Key=file_key)
+        # Get the object from S3, or the local cache
+        path = fetch_cached_file(bucket_name, file_key)
         
         # Load the object using torch.load
-        buffer = io.BytesIO(response['Body'].read())
-        return torch.load(buffer)
+        return torch.load(path)
     except Exception as e:
         print(f"Error fetching or loading {file_key} from S3: {str(e)}")
         return None
 
+# Fetch a file from s3 as raw bytes
+def fetch_bytes_from_s3(bucket_name, file_key):
+    try:
+        with open(fetch_cached_file(bucket_name, file_key), 'rb') as f:
+            return f.read()
+    except Exception as e:
+        print(f"Error fetching {file_key} from S3: {str(e)}")
+        return None
+
 # Upload a tensor to s3
 def upload_tensor_to_s3(tensor, key):
     # Serialize tensor to in-memory buffer
@@ -125,5 +285,4 @@ def upload_tensor_to_s3(tensor, key):
     buffer.seek(0)
 
     # Push to S3
-    s3 = boto3.client('s3', region_name='us-east-1')
-    s3.upload_fileobj(buffer, 'sgns-artifacts', key)
\ No newline at end of file
+    s3_client.upload_fileobj(buffer, 'sgns-artifacts', key)
\ No newline at end of file
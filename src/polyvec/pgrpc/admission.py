@@ -0,0 +1,131 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+
+import grpc
+
+# Requests of each capacity class that run at once, searches get most of the workers so writes cannot starve them
+CAPACITY = {
+    "read": int(os.getenv("POLYDB_READ_CAPACITY", 8)),
+    "write": int(os.getenv("POLYDB_WRITE_CAPACITY", 2)),
+}
+
+# Requests of each class one method may have waiting for capacity, beyond that new ones fail fast
+QUEUE_LIMIT = {
+    "read": int(os.getenv("POLYDB_READ_QUEUE", 32)),
+    "write": int(os.getenv("POLYDB_WRITE_QUEUE", 16)),
+}
+
+# Capacity class of every RPC
+METHOD_CLASSES = {
+    "FindSimilarEmbeddings": "read",
+    "GetStats": "read",
+    "GenerateEmbeddings": "write",
+    "DeleteEmbedding": "write",
+    "ReloadModel": "write",
+}
+
+# Seconds a request is worth working on after it arrives, the API server gives up on it after 5. Applies when the
+# caller's own deadline is later or missing
+REQUEST_BUDGET = float(os.getenv("POLYDB_REQUEST_BUDGET", 5.0))
+
+
+# A request turned away before or between its stages, with the status to report
+class Rejected(Exception):
+    def __init__(self, code, details):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+
+# Bounded per-method queues in front of per-class worker slots, with deadline checks between stages
+class Admission:
+    def __init__(self, capacity=CAPACITY, queue_limit=QUEUE_LIMIT, method_classes=METHOD_CLASSES):
+        self.lock = threading.Lock()
+        self.slots = {name: threading.BoundedSemaphore(slots) for name, slots in capacity.items()}
+        self.method_classes = method_classes
+        self.queue_limit = {method: queue_limit[name] for method, name in method_classes.items()}
+        self.waiting = dict.fromkeys(method_classes, 0)
+        self.stats = {method: {"admitted": 0, "rejected": 0, "shed": 0} for method in method_classes}
+        self.workers = sum(capacity.values()) + sum(self.queue_limit.values())
+
+    # Absolute monotonic deadline of a request that arrived at the given time
+    def deadline(self, context, arrival):
+        remaining = context.time_remaining()
+        if remaining is None:
+            return arrival + REQUEST_BUDGET
+        return min(arrival + REQUEST_BUDGET, time.monotonic() + remaining)
+
+    # Bump a counter of a method, requests of one method run on many threads at once
+    def count(self, method, name):
+        with self.lock:
+            self.stats[method][name] += 1
+
+    # Stop before an expensive stage if the caller is gone or the result would arrive too late
+    def check(self, method, context, deadline):
+        if not context.is_active():
+            self.count(method, "shed")
+            raise Rejected(grpc.StatusCode.CANCELLED, f"{method} cancelled by the caller")
+        if time.monotonic() >= deadline:
+            self.count(method, "shed")
+            raise Rejected(grpc.StatusCode.DEADLINE_EXCEEDED, f"{method} deadline passed before it completed")
+
+    # Hold a worker slot of the method's class for the duration of the block, yielding the stage check
+    @contextlib.contextmanager
+    def admit(self, method, context):
+        arrival = time.monotonic()
+        deadline = self.deadline(context, arrival)
+        slots = self.slots[self.method_classes[method]]
+
+        # Fail fast when the queue is full, instead of letting the wait run into the deadline
+        with self.lock:
+            if self.waiting[method] >= self.queue_limit[method]:
+                self.stats[method]["rejected"] += 1
+                raise Rejected(grpc.StatusCode.RESOURCE_EXHAUSTED, f"{method} queue is full, retry with backoff")
+            self.waiting[method] += 1
+        try:
+            acquired = slots.acquire(timeout=max(0.0, deadline - time.monotonic()))
+        finally:
+            with self.lock:
+                self.waiting[method] -= 1
+        if not acquired:
+            self.count(method, "shed")
+            raise Rejected(grpc.StatusCode.DEADLINE_EXCEEDED, f"{method} deadline passed while queued")
+
+        try:
+            # It may have been cancelled while it waited
+            self.check(method, context, deadline)
+            self.count(method, "admitted")
+            yield functools.partial(self.check, method, context, deadline)
+        finally:
+            slots.release()
+
+    # Wrap a servicer method. Methods with several stages (staged) receive the stage check as an extra argument, the
+    # others are only checked on admission. Rejections answer with an unsuccessful response of the given type
+    def admitted(self, response_type, staged=True):
+        def decorate(handler):
+            @functools.wraps(handler)
+            def wrapper(servicer, request, context):
+                try:
+                    with self.admit(handler.__name__, context) as check:
+                        if staged:
+                            return handler(servicer, request, context, check)
+                        return handler(servicer, request, context)
+                except Rejected as e:
+                    context.set_code(e.code)
+                    context.set_details(e.details)
+                    return response_type(success=False, error_message=e.details)
+            return wrapper
+        return decorate
+
+    # Counters per method, and the requests waiting right now
+    def flat_stats(self):
+        stats = {}
+        with self.lock:
+            for method, counters in self.stats.items():
+                for name, value in counters.items():
+                    stats[f"admission_{method}_{name}"] = value
+                stats[f"admission_{method}_waiting"] = self.waiting[method]
+        return stats
@@ -17,34 +17,62 @@ sys.path.append(LOCAL_DIRECTORY)
 sys.path.append(os.path.join(BASE_DIRECTORY, 'src', 'polyvec', 'proto'))
 sys.path.append(os.path.join(BASE_DIRECTORY, 'src', 'storage'))
 
-from train.embeddings import generate_embeddings
-from storage.storage import insert_embedding, find_similar_embeddings
+# Same module object as storage uses, so a model reload swaps the matrix for both
+from polyvec.train.embeddings import generate_versioned_embeddings
+from storage.storage import insert_embedding, find_similar_embeddings, find_duplicate, delete_embedding, storage_stats, \
+    reload_model
 
 # Import the generated proto classes (after generating them)
 import embeddings_pb2
 import embeddings_pb2_grpc
 
+from pgrpc.admission import Admission, Rejected
+
+# Bounded queues and worker slots in front of every RPC
+admission = Admission()
+
 class EmbeddingsServicer(embeddings_pb2_grpc.EmbeddingsServicer):
-    def GenerateEmbeddings(self, request, context):
+    @admission.admitted(embeddings_pb2.EmbeddingsResponse)
+    def GenerateEmbeddings(self, request, context, check):
         try:
             # Extract text and uuid from the metadata instead of from the request
             metadata = dict(context.invocation_metadata())
             text = metadata.get('text', 'unknown')
             uuid = metadata.get('uuid', 'unknown')
+            collection = request.collection or metadata.get('collection', '')
             
             # Get token IDs from the request
             token_ids = list(request.token_ids)
+
+            # Skip embedding entirely if this exact text is already stored
+            existing_id = find_duplicate(text, uuid, token_count=len(token_ids), collection=collection)
+            if existing_id is not None:
+                response = embeddings_pb2.EmbeddingsResponse()
+                response.success = True
+                response.duplicate = True
+                response.id = existing_id
+                response.tokens_skipped = len(token_ids)
+                return response
             
             # Generate embeddings
-            embeddings = generate_embeddings(token_ids)
+            check()
+            embeddings, model_version = generate_versioned_embeddings(token_ids)
 
-            # Insert into database and index
-            insert_embedding(text, embeddings, uuid)
+            # Last chance to drop a request nobody waits for, the insert itself is not interrupted
+            check()
+
+            # Insert into database and index, keeping the tokens for lexical search and re-embedding
+            stored_id, duplicate = insert_embedding(text, embeddings, uuid, token_ids=token_ids,
+                                                    model_version=model_version, collection=collection)
 
             # Create and return a proper response protobuf object
             response = embeddings_pb2.EmbeddingsResponse()
             response.success = True
+            response.id = stored_id
+            response.duplicate = duplicate
             return response
+        except Rejected:
+            raise
         except Exception as e:
             error_msg = f"Error generating embeddings: {str(e)}"
             response = embeddings_pb2.EmbeddingsResponse()
@@ -56,17 +84,21 @@ class EmbeddingsServicer(embeddings_pb2_grpc.EmbeddingsServicer):
             context.set_details(error_msg)
             return response
             
-    def FindSimilarEmbeddings(self, request, context):
+    @admission.admitted(embeddings_pb2.FindSimilarResponse)
+    def FindSimilarEmbeddings(self, request, context, check):
         try:
             # Get token IDs from the request
             token_ids = list(request.token_ids)
             top_k = request.top_k if request.top_k > 0 else 5  # Default to 5 if not specified
+            mode = request.mode or "vector"  # Default to pure vector search
             
             # Generate embeddings from tokens
-            query_embedding = generate_embeddings(token_ids)
+            query_embedding, model_version = generate_versioned_embeddings(token_ids)
             
             # Find similar embeddings using the existing function
-            similar_texts = find_similar_embeddings(query_embedding, top_k=top_k)
+            check()
+            similar_texts = find_similar_embeddings(query_embedding, top_k=top_k, token_ids=token_ids, mode=mode,
+                                                    model_version=model_version, collection=request.collection)
             
             # Create and return a proper response protobuf object
             response = embeddings_pb2.FindSimilarResponse()
@@ -82,6 +114,8 @@ class EmbeddingsServicer(embeddings_pb2_grpc.EmbeddingsServicer):
                 response.similar_texts.extend(string_texts)  # Use extend instead of assignment
             
             return response
+        except Rejected:
+            raise
         except Exception as e:
             error_msg = f"Error finding similar embeddings: {str(e)}"
             print(f"Exception in FindSimilarEmbeddings: {error_msg}")
@@ -89,18 +123,90 @@ class EmbeddingsServicer(embeddings_pb2_grpc.EmbeddingsServicer):
             response.success = False
             response.error_message = error_msg
             
+            # Set gRPC status code for debugging but still return response object (unknown collections are NOT_FOUND)
+            context.set_code(grpc.StatusCode.NOT_FOUND if isinstance(e, KeyError) else grpc.StatusCode.INTERNAL)
+            context.set_details(error_msg)
+            return response
+
+    @admission.admitted(embeddings_pb2.DeleteResponse, staged=False)
+    def DeleteEmbedding(self, request, context):
+        try:
+            # Remove the document and publish the delete to followers
+            response = embeddings_pb2.DeleteResponse()
+            response.deleted = delete_embedding(request.uuid, collection=request.collection, doc_id=request.id)
+            response.success = True
+            return response
+        except Rejected:
+            raise
+        except Exception as e:
+            error_msg = f"Error deleting embedding: {str(e)}"
+            response = embeddings_pb2.DeleteResponse()
+            response.success = False
+            response.error_message = error_msg
+
+            # Set gRPC status code for debugging but still return response object
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(error_msg)
+            return response
+
+    @admission.admitted(embeddings_pb2.StatsResponse, staged=False)
+    def GetStats(self, request, context):
+        try:
+            # Storage and ingest counters of the collection, plus process-wide cache, reload and replication counters
+            response = embeddings_pb2.StatsResponse()
+            for name, value in storage_stats(request.collection).items():
+                response.stats[name] = float(value)
+            for name, value in admission.flat_stats().items():
+                response.stats[name] = float(value)
+            response.success = True
+            return response
+        except Rejected:
+            raise
+        except Exception as e:
+            error_msg = f"Error collecting stats: {str(e)}"
+            response = embeddings_pb2.StatsResponse()
+            response.success = False
+            response.error_message = error_msg
+
+            # Set gRPC status code for debugging but still return response object (unknown collections are NOT_FOUND)
+            context.set_code(grpc.StatusCode.NOT_FOUND if isinstance(e, KeyError) else grpc.StatusCode.INTERNAL)
+            context.set_details(error_msg)
+            return response
+
+    @admission.admitted(embeddings_pb2.ReloadResponse, staged=False)
+    def ReloadModel(self, request, context):
+        try:
+            # New embeddings use the new matrix right away, each collection swaps once its documents are re-embedded
+            response = embeddings_pb2.ReloadResponse()
+            if request.source:
+                response.documents = reload_model(request.source)
+            else:
+                response.documents = reload_model()
+            response.success = True
+            return response
+        except Rejected:
+            raise
+        except Exception as e:
+            error_msg = f"Error reloading model: {str(e)}"
+            response = embeddings_pb2.ReloadResponse()
+            response.success = False
+            response.error_message = error_msg
+
             # Set gRPC status code for debugging but still return response object
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(error_msg)
             return response
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # One thread per running or queued request, anything beyond is turned away by gRPC with RESOURCE_EXHAUSTED
+    # instead of piling up in the executor's queue
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=admission.workers),
+                         maximum_concurrent_rpcs=admission.workers)
     embeddings_pb2_grpc.add_EmbeddingsServicer_to_server(
         EmbeddingsServicer(), server)
     
-    # Use a Unix socket for communication
-    socket_path = '/tmp/embeddings.sock'
+    # Use a Unix socket for communication (followers listen on their own socket)
+    socket_path = os.getenv('POLYDB_EMBEDDINGS_SOCKET', '/tmp/embeddings.sock')
     
     # Remove existing socket file if it exists
     if os.path.exists(socket_path):
@@ -21,6 +21,9 @@ const _ = grpc.SupportPackageIsVersion9
 const (
 	Embeddings_GenerateEmbeddings_FullMethodName    = "/embeddings.Embeddings/GenerateEmbeddings"
 	Embeddings_FindSimilarEmbeddings_FullMethodName = "/embeddings.Embeddings/FindSimilarEmbeddings"
+	Embeddings_DeleteEmbedding_FullMethodName       = "/embeddings.Embeddings/DeleteEmbedding"
+	Embeddings_GetStats_FullMethodName              = "/embeddings.Embeddings/GetStats"
+	Embeddings_ReloadModel_FullMethodName           = "/embeddings.Embeddings/ReloadModel"
 )
 
 // EmbeddingsClient is the client API for Embeddings service.
@@ -29,6 +32,9 @@ const (
 type EmbeddingsClient interface {
 	GenerateEmbeddings(ctx context.Context, in *EmbeddingsRequest, opts ...grpc.CallOption) (*EmbeddingsResponse, error)
 	FindSimilarEmbeddings(ctx context.Context, in *FindSimilarRequest, opts ...grpc.CallOption) (*FindSimilarResponse, error)
+	DeleteEmbedding(ctx context.Context, in *DeleteRequest, opts ...grpc.CallOption) (*DeleteResponse, error)
+	GetStats(ctx context.Context, in *StatsRequest, opts ...grpc.CallOption) (*StatsResponse, error)
+	ReloadModel(ctx context.Context, in *ReloadRequest, opts ...grpc.CallOption) (*ReloadResponse, error)
 }
 
 type embeddingsClient struct {
@@ -59,12 +65,45 @@ func (c *embeddingsClient) FindSimilarEmbeddings(ctx context.Context, in *FindSi
 	return out, nil
 }
 
+func (c *embeddingsClient) DeleteEmbedding(ctx context.Context, in *DeleteRequest, opts ...grpc.CallOption) (*DeleteResponse, error) {
+	cOpts := append([]grpc.CallOption{grpc.StaticMethod()}, opts...)
+	out := new(DeleteResponse)
+	err := c.cc.Invoke(ctx, Embeddings_DeleteEmbedding_FullMethodName, in, out, cOpts...)
+	if err != nil {
+		return nil, err
+	}
+	return out, nil
+}
+
+func (c *embeddingsClient) GetStats(ctx context.Context, in *StatsRequest, opts ...grpc.CallOption) (*StatsResponse, error) {
+	cOpts := append([]grpc.CallOption{grpc.StaticMethod()}, opts...)
+	out := new(StatsResponse)
+	err := c.cc.Invoke(ctx, Embeddings_GetStats_FullMethodName, in, out, cOpts...)
+	if err != nil {
+		return nil, err
+	}
+	return out, nil
+}
+
+func (c *embeddingsClient) ReloadModel(ctx context.Context, in *ReloadRequest, opts ...grpc.CallOption) (*ReloadResponse, error) {
+	cOpts := append([]grpc.CallOption{grpc.StaticMethod()}, opts...)
+	out := new(ReloadResponse)
+	err := c.cc.Invoke(ctx, Embeddings_ReloadModel_FullMethodName, in, out, cOpts...)
+	if err != nil {
+		return nil, err
+	}
+	return out, nil
+}
+
 // EmbeddingsServer is the server API for Embeddings service.
 // All implementations must embed UnimplementedEmbeddingsServer
 // for forward compatibility.
 type EmbeddingsServer interface {
 	GenerateEmbeddings(context.Context, *EmbeddingsRequest) (*EmbeddingsResponse, error)
 	FindSimilarEmbeddings(context.Context, *FindSimilarRequest) (*FindSimilarResponse, error)
+	DeleteEmbedding(context.Context, *DeleteRequest) (*DeleteResponse, error)
+	GetStats(context.Context, *StatsRequest) (*StatsResponse, error)
+	ReloadModel(context.Context, *ReloadRequest) (*ReloadResponse, error)
 	mustEmbedUnimplementedEmbeddingsServer()
 }
 
@@ -81,6 +120,15 @@ func (UnimplementedEmbeddingsServer) GenerateEmbeddings(context.Context, *Embedd
 func (UnimplementedEmbeddingsServer) FindSimilarEmbeddings(context.Context, *FindSimilarRequest) (*FindSimilarResponse, error) {
 	return nil, status.Errorf(codes.Unimplemented, "method FindSimilarEmbeddings not implemented")
 }
+func (UnimplementedEmbeddingsServer) DeleteEmbedding(context.Context, *DeleteRequest) (*DeleteResponse, error) {
+	return nil, status.Errorf(codes.Unimplemented, "method DeleteEmbedding not implemented")
+}
+func (UnimplementedEmbeddingsServer) GetStats(context.Context, *StatsRequest) (*StatsResponse, error) {
+	return nil, status.Errorf(codes.Unimplemented, "method GetStats not implemented")
+}
+func (UnimplementedEmbeddingsServer) ReloadModel(context.Context, *ReloadRequest) (*ReloadResponse, error) {
+	return nil, status.Errorf(codes.Unimplemented, "method ReloadModel not implemented")
+}
 func (UnimplementedEmbeddingsServer) mustEmbedUnimplementedEmbeddingsServer() {}
 func (UnimplementedEmbeddingsServer) testEmbeddedByValue()                    {}
 
@@ -138,6 +186,60 @@ func _Embeddings_FindSimilarEmbeddings_Handler(srv interface{}, ctx context.Cont
 	return interceptor(ctx, in, info, handler)
 }
 
+func _Embeddings_DeleteEmbedding_Handler(srv interface{}, ctx context.Context, dec func(interface{}) error, interceptor grpc.UnaryServerInterceptor) (interface{}, error) {
+	in := new(DeleteRequest)
+	if err := dec(in); err != nil {
+		return nil, err
+	}
+	if interceptor == nil {
+		return srv.(EmbeddingsServer).DeleteEmbedding(ctx, in)
+	}
+	info := &grpc.UnaryServerInfo{
+		Server:     srv,
+		FullMethod: Embeddings_DeleteEmbedding_FullMethodName,
+	}
+	handler := func(ctx context.Context, req interface{}) (interface{}, error) {
+		return srv.(EmbeddingsServer).DeleteEmbedding(ctx, req.(*DeleteRequest))
+	}
+	return interceptor(ctx, in, info, handler)
+}
+
+func _Embeddings_GetStats_Handler(srv interface{}, ctx context.Context, dec func(interface{}) error, interceptor grpc.UnaryServerInterceptor) (interface{}, error) {
+	in := new(StatsRequest)
+	if err := dec(in); err != nil {
+		return nil, err
+	}
+	if interceptor == nil {
+		return srv.(EmbeddingsServer).GetStats(ctx, in)
+	}
+	info := &grpc.UnaryServerInfo{
+		Server:     srv,
+		FullMethod: Embeddings_GetStats_FullMethodName,
+	}
+	handler := func(ctx context.Context, req interface{}) (interface{}, error) {
+		return srv.(EmbeddingsServer).GetStats(ctx, req.(*StatsRequest))
+	}
+	return interceptor(ctx, in, info, handler)
+}
+
+func _Embeddings_ReloadModel_Handler(srv interface{}, ctx context.Context, dec func(interface{}) error, interceptor grpc.UnaryServerInterceptor) (interface{}, error) {
+	in := new(ReloadRequest)
+	if err := dec(in); err != nil {
+		return nil, err
+	}
+	if interceptor == nil {
+		return srv.(EmbeddingsServer).ReloadModel(ctx, in)
+	}
+	info := &grpc.UnaryServerInfo{
+		Server:     srv,
+		FullMethod: Embeddings_ReloadModel_FullMethodName,
+	}
+	handler := func(ctx context.Context, req interface{}) (interface{}, error) {
+		return srv.(EmbeddingsServer).ReloadModel(ctx, req.(*ReloadRequest))
+	}
+	return interceptor(ctx, in, info, handler)
+}
+
 // Embeddings_ServiceDesc is the grpc.ServiceDesc for Embeddings service.
 // It's only intended for direct use with grpc.RegisterService,
 // and not to be introspected or modified (even as a copy)
@@ -153,6 +255,18 @@ var Embeddings_ServiceDesc = grpc.ServiceDesc{
 			MethodName: "FindSimilarEmbeddings",
 			Handler:    _Embeddings_FindSimilarEmbeddings_Handler,
 		},
+		{
+			MethodName: "DeleteEmbedding",
+			Handler:    _Embeddings_DeleteEmbedding_Handler,
+		},
+		{
+			MethodName: "GetStats",
+			Handler:    _Embeddings_GetStats_Handler,
+		},
+		{
+			MethodName: "ReloadModel",
+			Handler:    _Embeddings_ReloadModel_Handler,
+		},
 	},
 	Streams:  []grpc.StreamDesc{},
 	Metadata: "embeddings.proto",
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x65mbeddings.proto\x12\nembeddings\"B\n\x11\x45mbeddingsRequest\x12\x11\n\ttoken_ids\x18\x01 \x03(\x03\x12\x0c\n\x04text\x18\x02 \x01(\t\x12\x0c\n\x04uuid\x18\x03 \x01(\t\"<\n\x12\x45mbeddingsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rerror_message\x18\x02 \x01(\t\"6\n\x12\x46indSimilarRequest\x12\x11\n\ttoken_ids\x18\x01 \x03(\x03\x12\r\n\x05top_k\x18\x02 \x01(\x05\"T\n\x13\x46indSimilarResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rsimilar_texts\x18\x02 \x03(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t2\xbb\x01\n\nEmbeddings\x12S\n\x12GenerateEmbeddings\x12\x1d.embeddings.EmbeddingsRequest\x1a\x1e.embeddings.EmbeddingsResponse\x12X\n\x15\x46indSimilarEmbeddings\x12\x1e.embeddings.FindSimilarRequest\x1a\x1f.embeddings.FindSimilarResponseB\x10Z\x0e./embeddingspbb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10\x65mbeddings.proto\x12\nembeddings\"V\n\x11\x45mbeddingsRequest\x12\x11\n\ttoken_ids\x18\x01 \x03(\x03\x12\x0c\n\x04text\x18\x02 \x01(\t\x12\x0c\n\x04uuid\x18\x03 \x01(\t\x12\x12\n\ncollection\x18\x04 \x01(\t\"s\n\x12\x45mbeddingsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rerror_message\x18\x02 \x01(\t\x12\x11\n\tduplicate\x18\x03 \x01(\x08\x12\n\n\x02id\x18\x04 \x01(\x03\x12\x16\n\x0etokens_skipped\x18\x05 \x01(\x05\"X\n\x12\x46indSimilarRequest\x12\x11\n\ttoken_ids\x18\x01 \x03(\x03\x12\r\n\x05top_k\x18\x02 \x01(\x05\x12\x0c\n\x04mode\x18\x03 \x01(\t\x12\x12\n\ncollection\x18\x04 \x01(\t\"T\n\x13\x46indSimilarResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x15\n\rsimilar_texts\x18\x02 \x03(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\"=\n\rDeleteRequest\x12\x0c\n\x04uuid\x18\x01 \x01(\t\x12\x12\n\ncollection\x18\x02 \x01(\t\x12\n\n\x02id\x18\x03 \x01(\x03\"I\n\x0e\x44\x65leteResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07\x64\x65leted\x18\x02 \x01(\x08\x12\x15\n\rerror_message\x18\x03 \x01(\t\"\"\n\x0cStatsRequest\x12\x12\n\ncollection\x18\x01 \x01(\t\"\x9a\x01\n\rStatsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x33\n\x05stats\x18\x02 \x03(\x0b\x32$.embeddings.StatsResponse.StatsEntry\x12\x15\n\rerror_message\x18\x03 \x01(\t\x1a,\n\nStatsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\"\x1f\n\rReloadRequest\x12\x0e\n\x06source\x18\x01 \x01(\t\"K\n\x0eReloadResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x11\n\tdocuments\x18\x02 \x01(\x03\x12\x15\n\rerror_message\x18\x03 \x01(\t2\x8c\x03\n\nEmbeddings\x12S\n\x12GenerateEmbeddings\x12\x1d.embeddings.EmbeddingsRequest\x1a\x1e.embeddings.EmbeddingsResponse\x12X\n\x15\x46indSimilarEmbeddings\x12\x1e.embeddings.FindSimilarRequest\x1a\x1f.embeddings.FindSimilarResponse\x12H\n\x0f\x44\x65leteEmbedding\x12\x19.embeddings.DeleteRequest\x1a\x1a.embeddings.DeleteResponse\x12?\n\x08GetStats\x12\x18.embeddings.StatsRequest\x1a\x19.embeddings.StatsResponse\x12\x44\n\x0bReloadModel\x12\x19.embeddings.ReloadRequest\x1a\x1a.embeddings.ReloadResponseB\x10Z\x0e./embeddingspbb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,14 +32,30 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'embeddings_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'Z\016./embeddingspb'
+  _globals['_STATSRESPONSE_STATSENTRY']._loaded_options = None
+  _globals['_STATSRESPONSE_STATSENTRY']._serialized_options = b'8\001'
   _globals['_EMBEDDINGSREQUEST']._serialized_start=32
-  _globals['_EMBEDDINGSREQUEST']._serialized_end=98
-  _globals['_EMBEDDINGSRESPONSE']._serialized_start=100
-  _globals['_EMBEDDINGSRESPONSE']._serialized_end=160
-  _globals['_FINDSIMILARREQUEST']._serialized_start=162
-  _globals['_FINDSIMILARREQUEST']._serialized_end=216
-  _globals['_FINDSIMILARRESPONSE']._serialized_start=218
-  _globals['_FINDSIMILARRESPONSE']._serialized_end=302
-  _globals['_EMBEDDINGS']._serialized_start=305
-  _globals['_EMBEDDINGS']._serialized_end=492
+  _globals['_EMBEDDINGSREQUEST']._serialized_end=118
+  _globals['_EMBEDDINGSRESPONSE']._serialized_start=120
+  _globals['_EMBEDDINGSRESPONSE']._serialized_end=235
+  _globals['_FINDSIMILARREQUEST']._serialized_start=237
+  _globals['_FINDSIMILARREQUEST']._serialized_end=325
+  _globals['_FINDSIMILARRESPONSE']._serialized_start=327
+  _globals['_FINDSIMILARRESPONSE']._serialized_end=411
+  _globals['_DELETEREQUEST']._serialized_start=413
+  _globals['_DELETEREQUEST']._serialized_end=474
+  _globals['_DELETERESPONSE']._serialized_start=476
+  _globals['_DELETERESPONSE']._serialized_end=549
+  _globals['_STATSREQUEST']._serialized_start=551
+  _globals['_STATSREQUEST']._serialized_end=585
+  _globals['_STATSRESPONSE']._serialized_start=588
+  _globals['_STATSRESPONSE']._serialized_end=742
+  _globals['_STATSRESPONSE_STATSENTRY']._serialized_start=698
+  _globals['_STATSRESPONSE_STATSENTRY']._serialized_end=742
+  _globals['_RELOADREQUEST']._serialized_start=744
+  _globals['_RELOADREQUEST']._serialized_end=775
+  _globals['_RELOADRESPONSE']._serialized_start=777
+  _globals['_RELOADRESPONSE']._serialized_end=852
+  _globals['_EMBEDDINGS']._serialized_start=855
+  _globals['_EMBEDDINGS']._serialized_end=1251
 # @@protoc_insertion_point(module_scope)
@@ -44,6 +44,21 @@ class EmbeddingsStub(object):
                 request_serializer=embeddings__pb2.FindSimilarRequest.SerializeToString,
                 response_deserializer=embeddings__pb2.FindSimilarResponse.FromString,
                 _registered_method=True)
+        self.DeleteEmbedding = channel.unary_unary(
+                '/embeddings.Embeddings/DeleteEmbedding',
+                request_serializer=embeddings__pb2.DeleteRequest.SerializeToString,
+                response_deserializer=embeddings__pb2.DeleteResponse.FromString,
+                _registered_method=True)
+        self.GetStats = channel.unary_unary(
+                '/embeddings.Embeddings/GetStats',
+                request_serializer=embeddings__pb2.StatsRequest.SerializeToString,
+                response_deserializer=embeddings__pb2.StatsResponse.FromString,
+                _registered_method=True)
+        self.ReloadModel = channel.unary_unary(
+                '/embeddings.Embeddings/ReloadModel',
+                request_serializer=embeddings__pb2.ReloadRequest.SerializeToString,
+                response_deserializer=embeddings__pb2.ReloadResponse.FromString,
+                _registered_method=True)
 
 
 class EmbeddingsServicer(object):
@@ -61,6 +76,24 @@ class EmbeddingsServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def DeleteEmbedding(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReloadModel(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_EmbeddingsServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -74,6 +107,21 @@ def add_EmbeddingsServicer_to_server(servicer, server):
                     request_deserializer=embeddings__pb2.FindSimilarRequest.FromString,
                     response_serializer=embeddings__pb2.FindSimilarResponse.SerializeToString,
             ),
+            'DeleteEmbedding': grpc.unary_unary_rpc_method_handler(
+                    servicer.DeleteEmbedding,
+                    request_deserializer=embeddings__pb2.DeleteRequest.FromString,
+                    response_serializer=embeddings__pb2.DeleteResponse.SerializeToString,
+            ),
+            'GetStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetStats,
+                    request_deserializer=embeddings__pb2.StatsRequest.FromString,
+                    response_serializer=embeddings__pb2.StatsResponse.SerializeToString,
+            ),
+            'ReloadModel': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReloadModel,
+                    request_deserializer=embeddings__pb2.ReloadRequest.FromString,
+                    response_serializer=embeddings__pb2.ReloadResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'embeddings.Embeddings', rpc_method_handlers)
@@ -138,3 +186,84 @@ class Embeddings(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def DeleteEmbedding(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/embeddings.Embeddings/DeleteEmbedding',
+            embeddings__pb2.DeleteRequest.SerializeToString,
+            embeddings__pb2.DeleteResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/embeddings.Embeddings/GetStats',
+            embeddings__pb2.StatsRequest.SerializeToString,
+            embeddings__pb2.StatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReloadModel(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/embeddings.Embeddings/ReloadModel',
+            embeddings__pb2.ReloadRequest.SerializeToString,
+            embeddings__pb2.ReloadResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
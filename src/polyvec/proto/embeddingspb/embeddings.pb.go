@@ -26,6 +26,7 @@ type EmbeddingsRequest struct {
 	TokenIds      []int64                `protobuf:"varint,1,rep,packed,name=token_ids,json=tokenIds,proto3" json:"token_ids,omitempty"`
 	Text          string                 `protobuf:"bytes,2,opt,name=text,proto3" json:"text,omitempty"`
 	Uuid          string                 `protobuf:"bytes,3,opt,name=uuid,proto3" json:"uuid,omitempty"`
+	Collection    string                 `protobuf:"bytes,4,opt,name=collection,proto3" json:"collection,omitempty"` // Optional: collection to store the text in, created on first use (default: "default")
 	unknownFields protoimpl.UnknownFields
 	sizeCache     protoimpl.SizeCache
 }
@@ -81,10 +82,20 @@ func (x *EmbeddingsRequest) GetUuid() string {
 	return ""
 }
 
+func (x *EmbeddingsRequest) GetCollection() string {
+	if x != nil {
+		return x.Collection
+	}
+	return ""
+}
+
 type EmbeddingsResponse struct {
 	state         protoimpl.MessageState `protogen:"open.v1"`
 	Success       bool                   `protobuf:"varint,1,opt,name=success,proto3" json:"success,omitempty"`
-	ErrorMessage  string                 `protobuf:"bytes,2,opt,name=error_message,json=errorMessage,proto3" json:"error_message,omitempty"` // Optional error message if success is false
+	ErrorMessage  string                 `protobuf:"bytes,2,opt,name=error_message,json=errorMessage,proto3" json:"error_message,omitempty"`     // Optional error message if success is false
+	Duplicate     bool                   `protobuf:"varint,3,opt,name=duplicate,proto3" json:"duplicate,omitempty"`                              // True if the text was already stored and nothing was embedded
+	Id            int64                  `protobuf:"varint,4,opt,name=id,proto3" json:"id,omitempty"`                                            // Index id of the stored document (the existing one for duplicates)
+	TokensSkipped int32                  `protobuf:"varint,5,opt,name=tokens_skipped,json=tokensSkipped,proto3" json:"tokens_skipped,omitempty"` // Tokens that did not need embedding because of deduplication
 	unknownFields protoimpl.UnknownFields
 	sizeCache     protoimpl.SizeCache
 }
@@ -133,10 +144,33 @@ func (x *EmbeddingsResponse) GetErrorMessage() string {
 	return ""
 }
 
+func (x *EmbeddingsResponse) GetDuplicate() bool {
+	if x != nil {
+		return x.Duplicate
+	}
+	return false
+}
+
+func (x *EmbeddingsResponse) GetId() int64 {
+	if x != nil {
+		return x.Id
+	}
+	return 0
+}
+
+func (x *EmbeddingsResponse) GetTokensSkipped() int32 {
+	if x != nil {
+		return x.TokensSkipped
+	}
+	return 0
+}
+
 type FindSimilarRequest struct {
 	state         protoimpl.MessageState `protogen:"open.v1"`
 	TokenIds      []int64                `protobuf:"varint,1,rep,packed,name=token_ids,json=tokenIds,proto3" json:"token_ids,omitempty"` // Token IDs to find similar embeddings for
 	TopK          int32                  `protobuf:"varint,2,opt,name=top_k,json=topK,proto3" json:"top_k,omitempty"`                    // Optional: number of results to return (default: 5)
+	Mode          string                 `protobuf:"bytes,3,opt,name=mode,proto3" json:"mode,omitempty"`                                 // Optional: "vector" (default), "hybrid" or "keyword"
+	Collection    string                 `protobuf:"bytes,4,opt,name=collection,proto3" json:"collection,omitempty"`                     // Optional: collection to search (default: "default")
 	unknownFields protoimpl.UnknownFields
 	sizeCache     protoimpl.SizeCache
 }
@@ -185,6 +219,20 @@ func (x *FindSimilarRequest) GetTopK() int32 {
 	return 0
 }
 
+func (x *FindSimilarRequest) GetMode() string {
+	if x != nil {
+		return x.Mode
+	}
+	return ""
+}
+
+func (x *FindSimilarRequest) GetCollection() string {
+	if x != nil {
+		return x.Collection
+	}
+	return ""
+}
+
 type FindSimilarResponse struct {
 	state         protoimpl.MessageState `protogen:"open.v1"`
 	Success       bool                   `protobuf:"varint,1,opt,name=success,proto3" json:"success,omitempty"`
@@ -245,30 +293,399 @@ func (x *FindSimilarResponse) GetErrorMessage() string {
 	return ""
 }
 
+type DeleteRequest struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Uuid          string                 `protobuf:"bytes,1,opt,name=uuid,proto3" json:"uuid,omitempty"`             // UUID the text was inserted under
+	Collection    string                 `protobuf:"bytes,2,opt,name=collection,proto3" json:"collection,omitempty"` // Optional: collection the text was inserted into (default: "default")
+	Id            int64                  `protobuf:"varint,3,opt,name=id,proto3" json:"id,omitempty"`                // Index id an insert returned, used when uuid is empty
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *DeleteRequest) Reset() {
+	*x = DeleteRequest{}
+	mi := &file_embeddings_proto_msgTypes[4]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *DeleteRequest) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*DeleteRequest) ProtoMessage() {}
+
+func (x *DeleteRequest) ProtoReflect() protoreflect.Message {
+	mi := &file_embeddings_proto_msgTypes[4]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use DeleteRequest.ProtoReflect.Descriptor instead.
+func (*DeleteRequest) Descriptor() ([]byte, []int) {
+	return file_embeddings_proto_rawDescGZIP(), []int{4}
+}
+
+func (x *DeleteRequest) GetUuid() string {
+	if x != nil {
+		return x.Uuid
+	}
+	return ""
+}
+
+func (x *DeleteRequest) GetCollection() string {
+	if x != nil {
+		return x.Collection
+	}
+	return ""
+}
+
+func (x *DeleteRequest) GetId() int64 {
+	if x != nil {
+		return x.Id
+	}
+	return 0
+}
+
+type DeleteResponse struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Success       bool                   `protobuf:"varint,1,opt,name=success,proto3" json:"success,omitempty"`
+	Deleted       bool                   `protobuf:"varint,2,opt,name=deleted,proto3" json:"deleted,omitempty"`                              // False if no document was stored under the UUID
+	ErrorMessage  string                 `protobuf:"bytes,3,opt,name=error_message,json=errorMessage,proto3" json:"error_message,omitempty"` // Optional error message if success is false
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *DeleteResponse) Reset() {
+	*x = DeleteResponse{}
+	mi := &file_embeddings_proto_msgTypes[5]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *DeleteResponse) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*DeleteResponse) ProtoMessage() {}
+
+func (x *DeleteResponse) ProtoReflect() protoreflect.Message {
+	mi := &file_embeddings_proto_msgTypes[5]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use DeleteResponse.ProtoReflect.Descriptor instead.
+func (*DeleteResponse) Descriptor() ([]byte, []int) {
+	return file_embeddings_proto_rawDescGZIP(), []int{5}
+}
+
+func (x *DeleteResponse) GetSuccess() bool {
+	if x != nil {
+		return x.Success
+	}
+	return false
+}
+
+func (x *DeleteResponse) GetDeleted() bool {
+	if x != nil {
+		return x.Deleted
+	}
+	return false
+}
+
+func (x *DeleteResponse) GetErrorMessage() string {
+	if x != nil {
+		return x.ErrorMessage
+	}
+	return ""
+}
+
+type StatsRequest struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Collection    string                 `protobuf:"bytes,1,opt,name=collection,proto3" json:"collection,omitempty"` // Optional: collection to report on next to the process-wide counters (default: "default")
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *StatsRequest) Reset() {
+	*x = StatsRequest{}
+	mi := &file_embeddings_proto_msgTypes[6]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *StatsRequest) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*StatsRequest) ProtoMessage() {}
+
+func (x *StatsRequest) ProtoReflect() protoreflect.Message {
+	mi := &file_embeddings_proto_msgTypes[6]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use StatsRequest.ProtoReflect.Descriptor instead.
+func (*StatsRequest) Descriptor() ([]byte, []int) {
+	return file_embeddings_proto_rawDescGZIP(), []int{6}
+}
+
+func (x *StatsRequest) GetCollection() string {
+	if x != nil {
+		return x.Collection
+	}
+	return ""
+}
+
+type StatsResponse struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Success       bool                   `protobuf:"varint,1,opt,name=success,proto3" json:"success,omitempty"`
+	Stats         map[string]float64     `protobuf:"bytes,2,rep,name=stats,proto3" json:"stats,omitempty" protobuf_key:"bytes,1,opt,name=key,proto3" protobuf_val:"fixed64,2,opt,name=value,proto3"` // Storage, ingest and replication counters
+	ErrorMessage  string                 `protobuf:"bytes,3,opt,name=error_message,json=errorMessage,proto3" json:"error_message,omitempty"`                                                         // Optional error message if success is false
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *StatsResponse) Reset() {
+	*x = StatsResponse{}
+	mi := &file_embeddings_proto_msgTypes[7]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *StatsResponse) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*StatsResponse) ProtoMessage() {}
+
+func (x *StatsResponse) ProtoReflect() protoreflect.Message {
+	mi := &file_embeddings_proto_msgTypes[7]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use StatsResponse.ProtoReflect.Descriptor instead.
+func (*StatsResponse) Descriptor() ([]byte, []int) {
+	return file_embeddings_proto_rawDescGZIP(), []int{7}
+}
+
+func (x *StatsResponse) GetSuccess() bool {
+	if x != nil {
+		return x.Success
+	}
+	return false
+}
+
+func (x *StatsResponse) GetStats() map[string]float64 {
+	if x != nil {
+		return x.Stats
+	}
+	return nil
+}
+
+func (x *StatsResponse) GetErrorMessage() string {
+	if x != nil {
+		return x.ErrorMessage
+	}
+	return ""
+}
+
+type ReloadRequest struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Source        string                 `protobuf:"bytes,1,opt,name=source,proto3" json:"source,omitempty"` // Optional: key in sgns-artifacts or local .pt path (default: polyvec_embeddings.pt)
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *ReloadRequest) Reset() {
+	*x = ReloadRequest{}
+	mi := &file_embeddings_proto_msgTypes[8]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *ReloadRequest) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*ReloadRequest) ProtoMessage() {}
+
+func (x *ReloadRequest) ProtoReflect() protoreflect.Message {
+	mi := &file_embeddings_proto_msgTypes[8]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use ReloadRequest.ProtoReflect.Descriptor instead.
+func (*ReloadRequest) Descriptor() ([]byte, []int) {
+	return file_embeddings_proto_rawDescGZIP(), []int{8}
+}
+
+func (x *ReloadRequest) GetSource() string {
+	if x != nil {
+		return x.Source
+	}
+	return ""
+}
+
+type ReloadResponse struct {
+	state         protoimpl.MessageState `protogen:"open.v1"`
+	Success       bool                   `protobuf:"varint,1,opt,name=success,proto3" json:"success,omitempty"`
+	Documents     int64                  `protobuf:"varint,2,opt,name=documents,proto3" json:"documents,omitempty"`                          // Documents of the loaded collections being re-embedded in the background
+	ErrorMessage  string                 `protobuf:"bytes,3,opt,name=error_message,json=errorMessage,proto3" json:"error_message,omitempty"` // Optional error message if success is false
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *ReloadResponse) Reset() {
+	*x = ReloadResponse{}
+	mi := &file_embeddings_proto_msgTypes[9]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *ReloadResponse) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*ReloadResponse) ProtoMessage() {}
+
+func (x *ReloadResponse) ProtoReflect() protoreflect.Message {
+	mi := &file_embeddings_proto_msgTypes[9]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use ReloadResponse.ProtoReflect.Descriptor instead.
+func (*ReloadResponse) Descriptor() ([]byte, []int) {
+	return file_embeddings_proto_rawDescGZIP(), []int{9}
+}
+
+func (x *ReloadResponse) GetSuccess() bool {
+	if x != nil {
+		return x.Success
+	}
+	return false
+}
+
+func (x *ReloadResponse) GetDocuments() int64 {
+	if x != nil {
+		return x.Documents
+	}
+	return 0
+}
+
+func (x *ReloadResponse) GetErrorMessage() string {
+	if x != nil {
+		return x.ErrorMessage
+	}
+	return ""
+}
+
 var File_embeddings_proto protoreflect.FileDescriptor
 
 const file_embeddings_proto_rawDesc = "" +
 	"\n" +
 	"\x10embeddings.proto\x12\n" +
-	"embeddings\"X\n" +
+	"embeddings\"x\n" +
 	"\x11EmbeddingsRequest\x12\x1b\n" +
 	"\ttoken_ids\x18\x01 \x03(\x03R\btokenIds\x12\x12\n" +
 	"\x04text\x18\x02 \x01(\tR\x04text\x12\x12\n" +
-	"\x04uuid\x18\x03 \x01(\tR\x04uuid\"S\n" +
+	"\x04uuid\x18\x03 \x01(\tR\x04uuid\x12\x1e\n" +
+	"\n" +
+	"collection\x18\x04 \x01(\tR\n" +
+	"collection\"\xa8\x01\n" +
 	"\x12EmbeddingsResponse\x12\x18\n" +
 	"\asuccess\x18\x01 \x01(\bR\asuccess\x12#\n" +
-	"\rerror_message\x18\x02 \x01(\tR\ferrorMessage\"F\n" +
+	"\rerror_message\x18\x02 \x01(\tR\ferrorMessage\x12\x1c\n" +
+	"\tduplicate\x18\x03 \x01(\bR\tduplicate\x12\x0e\n" +
+	"\x02id\x18\x04 \x01(\x03R\x02id\x12%\n" +
+	"\x0etokens_skipped\x18\x05 \x01(\x05R\rtokensSkipped\"z\n" +
 	"\x12FindSimilarRequest\x12\x1b\n" +
 	"\ttoken_ids\x18\x01 \x03(\x03R\btokenIds\x12\x13\n" +
-	"\x05top_k\x18\x02 \x01(\x05R\x04topK\"y\n" +
+	"\x05top_k\x18\x02 \x01(\x05R\x04topK\x12\x12\n" +
+	"\x04mode\x18\x03 \x01(\tR\x04mode\x12\x1e\n" +
+	"\n" +
+	"collection\x18\x04 \x01(\tR\n" +
+	"collection\"y\n" +
 	"\x13FindSimilarResponse\x12\x18\n" +
 	"\asuccess\x18\x01 \x01(\bR\asuccess\x12#\n" +
 	"\rsimilar_texts\x18\x02 \x03(\tR\fsimilarTexts\x12#\n" +
-	"\rerror_message\x18\x03 \x01(\tR\ferrorMessage2\xbb\x01\n" +
+	"\rerror_message\x18\x03 \x01(\tR\ferrorMessage\"S\n" +
+	"\rDeleteRequest\x12\x12\n" +
+	"\x04uuid\x18\x01 \x01(\tR\x04uuid\x12\x1e\n" +
+	"\n" +
+	"collection\x18\x02 \x01(\tR\n" +
+	"collection\x12\x0e\n" +
+	"\x02id\x18\x03 \x01(\x03R\x02id\"i\n" +
+	"\x0eDeleteResponse\x12\x18\n" +
+	"\asuccess\x18\x01 \x01(\bR\asuccess\x12\x18\n" +
+	"\adeleted\x18\x02 \x01(\bR\adeleted\x12#\n" +
+	"\rerror_message\x18\x03 \x01(\tR\ferrorMessage\".\n" +
+	"\fStatsRequest\x12\x1e\n" +
+	"\n" +
+	"collection\x18\x01 \x01(\tR\n" +
+	"collection\"\xc4\x01\n" +
+	"\rStatsResponse\x12\x18\n" +
+	"\asuccess\x18\x01 \x01(\bR\asuccess\x12:\n" +
+	"\x05stats\x18\x02 \x03(\v2$.embeddings.StatsResponse.StatsEntryR\x05stats\x12#\n" +
+	"\rerror_message\x18\x03 \x01(\tR\ferrorMessage\x1a8\n" +
+	"\n" +
+	"StatsEntry\x12\x10\n" +
+	"\x03key\x18\x01 \x01(\tR\x03key\x12\x14\n" +
+	"\x05value\x18\x02 \x01(\x01R\x05value:\x028\x01\"'\n" +
+	"\rReloadRequest\x12\x16\n" +
+	"\x06source\x18\x01 \x01(\tR\x06source\"m\n" +
+	"\x0eReloadResponse\x12\x18\n" +
+	"\asuccess\x18\x01 \x01(\bR\asuccess\x12\x1c\n" +
+	"\tdocuments\x18\x02 \x01(\x03R\tdocuments\x12#\n" +
+	"\rerror_message\x18\x03 \x01(\tR\ferrorMessage2\x8c\x03\n" +
 	"\n" +
 	"Embeddings\x12S\n" +
 	"\x12GenerateEmbeddings\x12\x1d.embeddings.EmbeddingsRequest\x1a\x1e.embeddings.EmbeddingsResponse\x12X\n" +
-	"\x15FindSimilarEmbeddings\x12\x1e.embeddings.FindSimilarRequest\x1a\x1f.embeddings.FindSimilarResponseB\x10Z\x0e./embeddingspbb\x06proto3"
+	"\x15FindSimilarEmbeddings\x12\x1e.embeddings.FindSimilarRequest\x1a\x1f.embeddings.FindSimilarResponse\x12H\n" +
+	"\x0fDeleteEmbedding\x12\x19.embeddings.DeleteRequest\x1a\x1a.embeddings.DeleteResponse\x12?\n" +
+	"\bGetStats\x12\x18.embeddings.StatsRequest\x1a\x19.embeddings.StatsResponse\x12D\n" +
+	"\vReloadModel\x12\x19.embeddings.ReloadRequest\x1a\x1a.embeddings.ReloadResponseB\x10Z\x0e./embeddingspbb\x06proto3"
 
 var (
 	file_embeddings_proto_rawDescOnce sync.Once
@@ -282,23 +699,37 @@ func file_embeddings_proto_rawDescGZIP() []byte {
 	return file_embeddings_proto_rawDescData
 }
 
-var file_embeddings_proto_msgTypes = make([]protoimpl.MessageInfo, 4)
+var file_embeddings_proto_msgTypes = make([]protoimpl.MessageInfo, 11)
 var file_embeddings_proto_goTypes = []any{
 	(*EmbeddingsRequest)(nil),   // 0: embeddings.EmbeddingsRequest
 	(*EmbeddingsResponse)(nil),  // 1: embeddings.EmbeddingsResponse
 	(*FindSimilarRequest)(nil),  // 2: embeddings.FindSimilarRequest
 	(*FindSimilarResponse)(nil), // 3: embeddings.FindSimilarResponse
+	(*DeleteRequest)(nil),       // 4: embeddings.DeleteRequest
+	(*DeleteResponse)(nil),      // 5: embeddings.DeleteResponse
+	(*StatsRequest)(nil),        // 6: embeddings.StatsRequest
+	(*StatsResponse)(nil),       // 7: embeddings.StatsResponse
+	(*ReloadRequest)(nil),       // 8: embeddings.ReloadRequest
+	(*ReloadResponse)(nil),      // 9: embeddings.ReloadResponse
+	nil,                         // 10: embeddings.StatsResponse.StatsEntry
 }
 var file_embeddings_proto_depIdxs = []int32{
-	0, // 0: embeddings.Embeddings.GenerateEmbeddings:input_type -> embeddings.EmbeddingsRequest
-	2, // 1: embeddings.Embeddings.FindSimilarEmbeddings:input_type -> embeddings.FindSimilarRequest
-	1, // 2: embeddings.Embeddings.GenerateEmbeddings:output_type -> embeddings.EmbeddingsResponse
-	3, // 3: embeddings.Embeddings.FindSimilarEmbeddings:output_type -> embeddings.FindSimilarResponse
-	2, // [2:4] is the sub-list for method output_type
-	0, // [0:2] is the sub-list for method input_type
-	0, // [0:0] is the sub-list for extension type_name
-	0, // [0:0] is the sub-list for extension extendee
-	0, // [0:0] is the sub-list for field type_name
+	10, // 0: embeddings.StatsResponse.stats:type_name -> embeddings.StatsResponse.StatsEntry
+	0,  // 1: embeddings.Embeddings.GenerateEmbeddings:input_type -> embeddings.EmbeddingsRequest
+	2,  // 2: embeddings.Embeddings.FindSimilarEmbeddings:input_type -> embeddings.FindSimilarRequest
+	4,  // 3: embeddings.Embeddings.DeleteEmbedding:input_type -> embeddings.DeleteRequest
+	6,  // 4: embeddings.Embeddings.GetStats:input_type -> embeddings.StatsRequest
+	8,  // 5: embeddings.Embeddings.ReloadModel:input_type -> embeddings.ReloadRequest
+	1,  // 6: embeddings.Embeddings.GenerateEmbeddings:output_type -> embeddings.EmbeddingsResponse
+	3,  // 7: embeddings.Embeddings.FindSimilarEmbeddings:output_type -> embeddings.FindSimilarResponse
+	5,  // 8: embeddings.Embeddings.DeleteEmbedding:output_type -> embeddings.DeleteResponse
+	7,  // 9: embeddings.Embeddings.GetStats:output_type -> embeddings.StatsResponse
+	9,  // 10: embeddings.Embeddings.ReloadModel:output_type -> embeddings.ReloadResponse
+	6,  // [6:11] is the sub-list for method output_type
+	1,  // [1:6] is the sub-list for method input_type
+	1,  // [1:1] is the sub-list for extension type_name
+	1,  // [1:1] is the sub-list for extension extendee
+	0,  // [0:1] is the sub-list for field type_name
 }
 
 func init() { file_embeddings_proto_init() }
@@ -312,7 +743,7 @@ func file_embeddings_proto_init() {
 			GoPackagePath: reflect.TypeOf(x{}).PkgPath(),
 			RawDescriptor: unsafe.Slice(unsafe.StringData(file_embeddings_proto_rawDesc), len(file_embeddings_proto_rawDesc)),
 			NumEnums:      0,
-			NumMessages:   4,
+			NumMessages:   11,
 			NumExtensions: 0,
 			NumServices:   1,
 		},
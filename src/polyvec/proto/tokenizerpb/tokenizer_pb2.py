@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0ftokenizer.proto\x12\ttokenizer\"\x1d\n\rEncodeRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\"5\n\x0e\x45ncodeResponse\x12\x0e\n\x06tokens\x18\x01 \x03(\x03\x12\x13\n\x0btoken_texts\x18\x02 \x03(\t2J\n\tTokenizer\x12=\n\x06\x45ncode\x12\x18.tokenizer.EncodeRequest\x1a\x19.tokenizer.EncodeResponseB\x0fZ\r./tokenizerpbb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0ftokenizer.proto\x12\ttokenizer\"\x1d\n\rEncodeRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\"5\n\x0e\x45ncodeResponse\x12\x0e\n\x06tokens\x18\x01 \x03(\x03\x12\x13\n\x0btoken_texts\x18\x02 \x03(\t\"@\n\x12\x45ncodeBatchRequest\x12\r\n\x05texts\x18\x01 \x03(\t\x12\x1b\n\x13include_token_texts\x18\x02 \x01(\x08\"A\n\x13\x45ncodeBatchResponse\x12*\n\x07results\x18\x01 \x03(\x0b\x32\x19.tokenizer.EncodeResponse2\x98\x01\n\tTokenizer\x12=\n\x06\x45ncode\x12\x18.tokenizer.EncodeRequest\x1a\x19.tokenizer.EncodeResponse\x12L\n\x0b\x45ncodeBatch\x12\x1d.tokenizer.EncodeBatchRequest\x1a\x1e.tokenizer.EncodeBatchResponseB\x0fZ\r./tokenizerpbb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -36,6 +36,10 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_ENCODEREQUEST']._serialized_end=59
   _globals['_ENCODERESPONSE']._serialized_start=61
   _globals['_ENCODERESPONSE']._serialized_end=114
-  _globals['_TOKENIZER']._serialized_start=116
-  _globals['_TOKENIZER']._serialized_end=190
+  _globals['_ENCODEBATCHREQUEST']._serialized_start=116
+  _globals['_ENCODEBATCHREQUEST']._serialized_end=180
+  _globals['_ENCODEBATCHRESPONSE']._serialized_start=182
+  _globals['_ENCODEBATCHRESPONSE']._serialized_end=247
+  _globals['_TOKENIZER']._serialized_start=250
+  _globals['_TOKENIZER']._serialized_end=402
 # @@protoc_insertion_point(module_scope)
@@ -5,7 +5,6 @@ import warnings
 
 from . import tokenizer_pb2 as tokenizer__pb2
 
-
 GRPC_GENERATED_VERSION = '1.72.0'
 GRPC_VERSION = grpc.__version__
 _version_not_supported = False
@@ -40,6 +39,11 @@ class TokenizerStub(object):
                 request_serializer=tokenizer__pb2.EncodeRequest.SerializeToString,
                 response_deserializer=tokenizer__pb2.EncodeResponse.FromString,
                 _registered_method=True)
+        self.EncodeBatch = channel.unary_unary(
+                '/tokenizer.Tokenizer/EncodeBatch',
+                request_serializer=tokenizer__pb2.EncodeBatchRequest.SerializeToString,
+                response_deserializer=tokenizer__pb2.EncodeBatchResponse.FromString,
+                _registered_method=True)
 
 
 class TokenizerServicer(object):
@@ -51,6 +55,12 @@ class TokenizerServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def EncodeBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_TokenizerServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -59,6 +69,11 @@ def add_TokenizerServicer_to_server(servicer, server):
                     request_deserializer=tokenizer__pb2.EncodeRequest.FromString,
                     response_serializer=tokenizer__pb2.EncodeResponse.SerializeToString,
             ),
+            'EncodeBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.EncodeBatch,
+                    request_deserializer=tokenizer__pb2.EncodeBatchRequest.FromString,
+                    response_serializer=tokenizer__pb2.EncodeBatchResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'tokenizer.Tokenizer', rpc_method_handlers)
@@ -96,3 +111,30 @@ class Tokenizer(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def EncodeBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/tokenizer.Tokenizer/EncodeBatch',
+            tokenizer__pb2.EncodeBatchRequest.SerializeToString,
+            tokenizer__pb2.EncodeBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+# Sys path
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from train import SGNSModel, make_optimizer
+from data.sampler import UnigramSampler
+
+# Zipf-distributed (center, context) pairs with the skew of real token streams
+def synthetic_pairs(num_pairs, vocab_size, seed):
+    rng = np.random.default_rng(seed)
+    centers = np.minimum(rng.zipf(1.2, size=num_pairs), vocab_size) - 1
+    contexts = (centers + rng.integers(1, 50, size=num_pairs)) % vocab_size
+    freqs = np.bincount(np.concatenate((centers, contexts)), minlength=vocab_size) + 1
+    return torch.from_numpy(centers), torch.from_numpy(contexts), freqs
+
+# Train for a fixed number of steps, returning steps/sec and the mean loss of the last tenth
+def benchmark(sparse, pairs, vocab_size, dimension, batch_size, negatives, steps, seed, negative_pool=0):
+    centers, contexts, freqs = pairs
+    torch.manual_seed(seed)
+    model = SGNSModel(vocab_size, dimension, sparse=sparse)
+    optimizer = make_optimizer(model, sparse)
+    sampler = UnigramSampler(freqs)
+    generator = torch.Generator().manual_seed(seed)
+
+    losses = []
+    start = time.perf_counter()
+    for step in range(steps):
+        batch = slice((step * batch_size) % (centers.numel() - batch_size), None)
+        center, context = centers[batch][:batch_size], contexts[batch][:batch_size]
+        if negative_pool:
+            negative = sampler.sample_torch((negative_pool,), generator=generator)
+        else:
+            negative = sampler.sample_torch((batch_size, negatives), generator=generator)
+
+        optimizer.zero_grad()
+        loss = model(center, context, negative)
+        loss.backward()
+        optimizer.step()
+        losses.append(loss.item())
+    elapsed = time.perf_counter() - start
+
+    return steps / elapsed, float(np.mean(losses[-max(1, steps // 10):]))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Steps per second and final loss of dense Adam vs sparse SparseAdam SGNS training")
+    parser.add_argument("--vocab-size", type=int, default=160000)
+    parser.add_argument("--dimension", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--negatives", type=int, default=15)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--negative-pool", type=int, default=0, help="Negatives shared by the batch instead of per pair")
+    args = parser.parse_args()
+
+    pairs = synthetic_pairs(args.steps * args.batch_size + args.batch_size, args.vocab_size, args.seed)
+    for name, sparse in (("dense", False), ("sparse", True)):
+        steps_per_second, final_loss = benchmark(sparse, pairs, args.vocab_size, args.dimension, args.batch_size,
+                                                 args.negatives, args.steps, args.seed, args.negative_pool)
+        print(f"{name:>6}: {steps_per_second:,.1f} steps/sec ({steps_per_second * args.batch_size:,.0f} pairs/sec), "
+              f"final loss {final_loss:.4f}")
@@ -14,17 +14,42 @@ sys.path.append(BASE_DIRECTORY)
 # More imports
 from sgns import process_sentence
 
-# Load embeddings globally at startup
-embedding_matrix = fetch_pt_file_from_s3("sgns-artifacts", "polyvec_embeddings.pt")
+# Key of the served matrix in the sgns-artifacts bucket
+DEFAULT_SOURCE = "polyvec_embeddings.pt"
 
-# If unable to load from S3, create dummy embedding matrix for testing
-if embedding_matrix is None:
-    print("Creating a dummy embedding matrix for testing (10000 x 300)")
-    embedding_matrix = torch.rand((10000, 300))  # Dummy matrix with random values
+# Embedding matrix from a local .pt file or a key in sgns-artifacts, None if it cannot be loaded
+def load_embedding_matrix(source=DEFAULT_SOURCE):
+    if os.path.exists(source):
+        matrix = torch.load(source)
+    else:
+        matrix = fetch_pt_file_from_s3("sgns-artifacts", source)
+    if matrix is None:
+        return None
+    return matrix.detach().float().cpu()
 
-def generate_embeddings(token_ids):
+# Load embeddings globally at startup, None if they cannot be loaded (storage then serves its local copy of the
+# matrix it served last, or refuses to start)
+embedding_matrix = load_embedding_matrix()
+
+# Served (version, matrix), replaced as one object so a lookup never mixes two models
+model = (0, embedding_matrix)
+
+# Swap in a new matrix, returning its version
+def set_embedding_matrix(matrix):
+    global embedding_matrix, model
+    version = model[0] + 1
+    embedding_matrix = matrix
+    model = (version, matrix)
+    return version
+
+# Token embeddings together with the version of the matrix they came from
+def generate_versioned_embeddings(token_ids):
+    version, matrix = model
     # Convert token_ids to a tensor and limit to valid indices
     token_tensor = torch.tensor(token_ids, dtype=torch.long)
     # Clamp indices to be within the valid range
-    token_tensor = torch.clamp(token_tensor, 0, embedding_matrix.size(0) - 1)
-    return embedding_matrix[token_tensor]
+    token_tensor = torch.clamp(token_tensor, 0, matrix.size(0) - 1)
+    return matrix[token_tensor], version
+
+def generate_embeddings(token_ids):
+    return generate_versioned_embeddings(token_ids)[0]
@@ -0,0 +1,110 @@
+import json
+import os
+import resource
+import time
+
+import torch
+
+# Resident set size of this process in bytes, from /proc where available
+def resident_memory():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS, reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# Per-interval training metrics, printed and optionally appended to a JSON lines log
+class TrainingMetrics:
+    def __init__(self, log_path=None, interval=30.0, worker=None):
+        self.log_path = log_path
+        self.interval = interval
+        self.worker = worker
+        self.start = time.time()
+        self.reset()
+
+    def reset(self):
+        self.interval_start = time.time()
+        self.pairs = 0
+        self.steps = 0
+        self.loss = 0.0
+        self.wait_seconds = 0.0
+        self.timings = {}
+        self.files = []
+        self.masked_negatives = 0
+
+    # One optimization step: pairs trained, time blocked on the loader, the step's phase timings and the negatives
+    # left out of the loss because they collided with their pair
+    def record_step(self, pairs, loss, wait_seconds, timings, masked_negatives=0):
+        self.pairs += pairs
+        self.masked_negatives += masked_negatives
+        self.steps += 1
+        self.loss += loss
+        self.wait_seconds += wait_seconds
+        for phase, seconds in timings.items():
+            self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    # One shard load as reported by the dataset: key, bytes and load latency
+    def record_file(self, shard):
+        self.files.append(shard)
+
+    # Emit a record once the interval has elapsed (or when forced, e.g. at the end of an epoch)
+    def maybe_report(self, epoch, force=False):
+        elapsed = time.time() - self.interval_start
+        if not force and elapsed < self.interval:
+            return None
+        if self.steps == 0 and not self.files:
+            return None
+
+        compute_seconds = sum(self.timings.values())
+        record = {
+            "time": time.time(),
+            "elapsed": time.time() - self.start,
+            "epoch": epoch,
+            "worker": self.worker,
+            "steps": self.steps,
+            "pairs": self.pairs,
+            "pairs_per_second": self.pairs / max(elapsed, 1e-9),
+            "loss": self.loss / max(1, self.steps),
+            "data_wait_seconds": self.wait_seconds,
+            "compute_seconds": compute_seconds,
+            "data_wait_fraction": self.wait_seconds / max(self.wait_seconds + compute_seconds, 1e-9),
+            "phase_seconds": self.timings,
+            "masked_negatives": self.masked_negatives,
+            "files": len(self.files),
+            "file_bytes": sum(shard["bytes"] for shard in self.files),
+            "file_load_seconds": sum(shard["load_seconds"] for shard in self.files),
+            "max_file_load_seconds": max((shard["load_seconds"] for shard in self.files), default=0.0),
+            "rss_bytes": resident_memory(),
+        }
+        if torch.cuda.is_available():
+            record["cuda_allocated_bytes"] = torch.cuda.memory_allocated()
+            record["cuda_max_allocated_bytes"] = torch.cuda.max_memory_allocated()
+
+        prefix = f"[worker {self.worker}] " if self.worker is not None else ""
+        print(f"{prefix}epoch {epoch + 1}: {record['pairs_per_second']:,.0f} pairs/sec, loss {record['loss']:.4f}, "
+              f"waiting on data {100 * record['data_wait_fraction']:.0f}%, {record['files']} files "
+              f"({record['file_bytes'] / 1e6:.1f} MB), rss {record['rss_bytes'] / 1e9:.2f} GB"
+              + (f", {self.masked_negatives} colliding negatives masked" if self.masked_negatives else ""))
+
+        if self.log_path:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+
+        self.reset()
+        return record
+
+# Opt-in torch.profiler window: skip `wait` steps, warm up, then trace `active` steps into trace_dir
+def make_profiler(trace_dir, wait=10, warmup=2, active=20):
+    if not trace_dir:
+        return None
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    return torch.profiler.profile(
+        activities=activities,
+        schedule=torch.profiler.schedule(wait=wait, warmup=warmup, active=active, repeat=1),
+        on_trace_ready=torch.profiler.tensorboard_trace_handler(trace_dir),
+        record_shapes=True,
+        profile_memory=True,
+    )
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 from tqdm import tqdm
@@ -11,66 +12,144 @@ sys.path.append(DATA_DIRECTORY)
 sys.path.append(BASE_DIRECTORY)
 
 from numpy import negative
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 import torch.nn as nn
 import torch.nn.functional as F
 from torch.utils.data import DataLoader
-from torch.optim import Adam
-from data.sgns import generate_sgns_pairs
+from torch.optim import Adam, SparseAdam
+from data.sgns import generate_sgns_pairs, TOKEN_FREQS_PREFIX
+from data.sampler import UnigramSampler
 import time
+import queue
+import random
+import threading
 import requests
 import json
-from data.util import get_vocab_size, list_s3_pt_files, fetch_pt_file_from_s3, upload_tensor_to_s3
+from data.shards import SHARD_EXTENSION, read_shard, columns_from_tuples
+from data.util import get_vocab_size, list_s3_pt_files, fetch_pt_file_from_s3, fetch_cached_file, upload_tensor_to_s3
+from metrics import TrainingMetrics, make_profiler
+
+# Packed shards, plus legacy torch.save shards that have not been regenerated yet
+SHARD_EXTENSIONS = (SHARD_EXTENSION, '.pt')
 
 # Class setup
 
 # Dataset, streamed
 class StreamingSGNSDataset(torch.utils.data.IterableDataset):
-    def __init__(self, s3_files=None, bucket_name='sgns-pairs-beta'):
+    def __init__(self, s3_files=None, bucket_name='sgns-pairs-beta', batch_size=128, seed=0, prefetch=2, shard=None):
         """
         Initialize dataset with files from S3 bucket
         
         Args:
             s3_files (list): List of file metadata from S3, if None will be fetched
             bucket_name (str): Name of the S3 bucket containing the files
+            batch_size (int): Pairs per yielded (center, context) batch
+            seed (int): Base seed of the per-epoch file shuffle
+            prefetch (int): Shards downloaded ahead of the one being consumed
+            shard (tuple): Explicit (index, count) slice of the files, used by Hogwild processes
         """
         self.bucket_name = bucket_name
+        self.batch_size = batch_size
+        self.seed = seed
+        self.prefetch = prefetch
+        self.shard = shard
+        self.epoch = 0
         if s3_files is None:
-            self.s3_files = list_s3_pt_files(bucket_name)
+            self.s3_files = list_s3_pt_files(bucket_name, extensions=SHARD_EXTENSIONS)
         else:
             self.s3_files = s3_files
-        print(f"Found {len(self.s3_files)} .pt files in S3 bucket {bucket_name}")
+        print(f"Found {len(self.s3_files)} shards in S3 bucket {bucket_name}")
+
+    # Pair columns of one shard, packed or legacy torch.save
+    def load_shard(self, file_key):
+        if file_key.endswith(SHARD_EXTENSION):
+            # Memory-mapped straight out of the local S3 cache
+            try:
+                return read_shard(fetch_cached_file(self.bucket_name, file_key))
+            except Exception as e:
+                print(f"Error fetching {file_key} from S3: {str(e)}")
+                return None
+
+        # Older shards may still carry stored negatives, which are ignored in favour of fresh ones
+        triplets = fetch_pt_file_from_s3(self.bucket_name, file_key)
+        return columns_from_tuples(triplets) if triplets is not None else None
+
+    # Reshuffles the file order, call before iterating each epoch
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    # This worker's files: one shuffled order per epoch, dealt round robin across ranks and loader workers
+    def worker_files(self):
+        files = list(self.s3_files)
+        random.Random(self.seed + self.epoch).shuffle(files)
+
+        # Distributed ranks, or Hogwild processes
+        rank, world_size = 0, 1
+        if self.shard is not None:
+            rank, world_size = self.shard
+        elif torch.distributed.is_available() and torch.distributed.is_initialized():
+            rank, world_size = torch.distributed.get_rank(), torch.distributed.get_world_size()
+
+        # DataLoader workers within this rank
+        worker_info = torch.utils.data.get_worker_info()
+        worker_id, num_workers = (worker_info.id, worker_info.num_workers) if worker_info is not None else (0, 1)
+
+        return files[rank * num_workers + worker_id::world_size * num_workers]
+
+    # Download shards on a background thread, at most prefetch ahead of the consumer
+    def prefetch_shards(self, files):
+        shards = queue.Queue(maxsize=max(1, self.prefetch))
+
+        def produce():
+            for file_info in files:
+                print(f"Loading {file_info['key']} from S3...")
+                load_start = time.perf_counter()
+                columns = self.load_shard(file_info['key'])
+                shards.put((file_info, columns, time.perf_counter() - load_start))
+            shards.put(None)
 
+        threading.Thread(target=produce, daemon=True).start()
+        while True:
+            item = shards.get()
+            if item is None:
+                return
+            yield item
+
+    # Yields (center, context, shard): shard describes the file's load on its first batch and is None otherwise
     def __iter__(self):
-        # Loop through all files in S3
-        for file_info in self.s3_files:
-            file_key = file_info['key']
-            print(f"Loading {file_key} from S3...")
-            triplets = fetch_pt_file_from_s3(self.bucket_name, file_key)
-            
-            if triplets is not None:
-                for center, context, negatives in triplets:
+        # Loop through this worker's files in S3
+        for file_info, columns, load_seconds in self.prefetch_shards(self.worker_files()):
+            if columns is not None:
+                # Batches are sliced straight out of the shard's columns
+                centers, contexts, _ = columns
+                shard = {"key": file_info['key'], "bytes": file_info.get('size', 0), "load_seconds": load_seconds}
+                for start in range(0, centers.size, self.batch_size):
                     yield (
-                        torch.tensor(center, dtype=torch.long),
-                        torch.tensor(context, dtype=torch.long),
-                        torch.tensor(negatives, dtype=torch.long),
+                        torch.from_numpy(centers[start:start + self.batch_size].astype(np.int64)),
+                        torch.from_numpy(contexts[start:start + self.batch_size].astype(np.int64)),
+                        shard if start == 0 else None,
                     )
             else:
-                print(f"Warning: Failed to load {file_key}")
+                print(f"Warning: Failed to load {file_info['key']}")
 
 
 # Embedding Model
 class SGNSModel(nn.Module):
-    # Initialize embeddings
-    def __init__(self, vocab_size, embedding_dimension):
+    # Initialize embeddings, sparse gradients only carry the rows a batch touched
+    def __init__(self, vocab_size, embedding_dimension, sparse=False):
         super().__init__()
-        self.input_embedding = nn.Embedding(vocab_size, embedding_dimension)
-        self.output_embedding = nn.Embedding(vocab_size, embedding_dimension)
+        self.input_embedding = nn.Embedding(vocab_size, embedding_dimension, sparse=sparse)
+        self.output_embedding = nn.Embedding(vocab_size, embedding_dimension, sparse=sparse)
 
     
-    # Forward pass, objective function
-    def forward(self, center, context, negatives):
+    # Forward pass, objective function. negatives is (B, K) per-example draws, or (N,) one pool shared by the batch.
+    # valid (B, K) marks the per-example draws that are real negatives for their row
+    def forward(self, center, context, negatives, valid=None):
+        if negatives.dim() == 1:
+            return self.forward_shared(center, context, negatives)
+
         # Get embeddings
         center_embedding = self.input_embedding(center) # (B, D)
         context_embedding = self.output_embedding(context) # (B, D)
@@ -82,11 +161,195 @@ class SGNSModel(nn.Module):
         # Dot product for (center, negatives) --> Unsqueeze then squeeze to make dimensions match
         negative_affinity = torch.bmm(negative_embeddings, torch.unsqueeze(center_embedding, 2)).squeeze(2)
 
+        # Draws that still hit the pair after redrawing are left out, each row averages over the rest
+        negative_loss = F.logsigmoid(-negative_affinity)
+        if valid is not None:
+            negative_loss = (negative_loss * valid).sum(dim=1) / valid.sum(dim=1).clamp(min=1)
+
+        # Policy
+        return -F.logsigmoid(context_affinity).mean() - negative_loss.mean()
+
+    # Same objective with a pool of N negatives scored against every center in one (B, D) x (D, N) matmul
+    def forward_shared(self, center, context, pool):
+        center_embedding = self.input_embedding(center) # (B, D)
+        context_embedding = self.output_embedding(context) # (B, D)
+        pool_embeddings = self.output_embedding(pool) # (N, D)
+
+        context_affinity = torch.sum(center_embedding * context_embedding, dim=1)
+        negative_affinity = center_embedding @ pool_embeddings.t() # (B, N)
+
+        # Accidental hits: a pool token that is the row's own center or context is not a negative for it
+        valid = (pool.unsqueeze(0) != center.unsqueeze(1)) & (pool.unsqueeze(0) != context.unsqueeze(1))
+
+        # The pool is drawn from the same unigram^0.75 distribution as per-example negatives, so it only needs
+        # reweighting: each row sees N (minus hits) negatives instead of K, averaging over its valid ones keeps its
+        # negative term on the K-sample scale
+        negative_loss = (F.logsigmoid(-negative_affinity) * valid).sum(dim=1) / valid.sum(dim=1).clamp(min=1)
+
         # Policy
-        return -F.logsigmoid(context_affinity).mean() - F.logsigmoid(-negative_affinity).mean()
+        return -F.logsigmoid(context_affinity).mean() - negative_loss.mean()
+
+
+# Token counts summed over every source file (each uploaded once as token ids and counts), None if none were uploaded
+def load_token_frequencies(vocab_size):
+    token_freqs = torch.zeros(vocab_size, dtype=torch.float64)
+    files = list_s3_pt_files('sgns-artifacts', prefix=TOKEN_FREQS_PREFIX)
+    for file_info in files:
+        counts = fetch_pt_file_from_s3('sgns-artifacts', file_info['key'])
+        if counts is not None:
+            token_ids, counts = counts[0], counts[1]
+            in_vocab = token_ids < vocab_size
+            token_freqs.index_add_(0, token_ids[in_vocab], counts[in_vocab].double())
+    return token_freqs if token_freqs.sum() > 0 else None
+
+
+# Optimizer matching the model's gradients: SparseAdam only updates moments of touched rows
+def make_optimizer(model, sparse, lr=1e-3):
+    if sparse:
+        return SparseAdam(list(model.parameters()), lr=lr)
+    return Adam(model.parameters(), lr=lr)
+
+
+# SparseAdam moments of a shared model, allocated once in shared memory so every Hogwild process updates the same
+# copy instead of keeping two private tables per parameter
+def share_optimizer_state(model):
+    return [(torch.zeros_like(param).share_memory_(), torch.zeros_like(param).share_memory_())
+            for param in model.parameters()]
+
+# SparseAdam over a shared model that reads and writes the shared moments. Step counts (bias correction only) stay
+# per process
+def make_shared_optimizer(model, optimizer_state, lr=1e-3):
+    optimizer = SparseAdam(list(model.parameters()), lr=lr)
+    for param, (exp_avg, exp_avg_sq) in zip(model.parameters(), optimizer_state):
+        optimizer.state[param] = {"step": 0, "exp_avg": exp_avg, "exp_avg_sq": exp_avg_sq}
+    return optimizer
+
+
+# One optimization step on a batch with freshly drawn negatives, returns the loss, per-phase seconds and the number
+# of negatives masked because they kept hitting their pair. With a negative_pool size the batch shares that many
+# negatives instead of drawing negative_sample_size per pair
+def train_step(model, optimizer, sampler, center, context, negative_sample_size, device, negative_pool=0):
+    phase_start = time.perf_counter()
+
+    # Fresh negatives, redrawn where they hit the pair itself (shared pools mask their hits in the model instead)
+    if negative_pool:
+        negatives, valid = sampler.sample_torch((negative_pool,)), None
+        masked = 0
+    else:
+        negatives, valid = sampler.sample_excluding(torch.stack((center, context), dim=1), negative_sample_size)
+        masked = int(valid.numel() - valid.sum())
+        valid = valid.to(device) if masked else None
+
+    # Convert
+    center = center.to(device).long()
+    context = context.to(device).long()
+    negatives = negatives.to(device).long()
+    sampled = time.perf_counter()
+
+    # Clear gradients
+    optimizer.zero_grad()
+
+    # Forward pass
+    loss = model(center, context, negatives, valid)
+    loss.backward()
+    loss_value = loss.item()
+    backward = time.perf_counter()
+
+    # Set gradients
+    optimizer.step()
+    stepped = time.perf_counter()
+
+    return loss_value, {"sample": sampled - phase_start, "forward_backward": backward - sampled, "optimizer": stepped - backward}, masked
+
+
+# Hogwild process: trains the shared model on its own slice of the shards without any locking
+def hogwild_worker(rank, processes, model, optimizer_state, s3_files, bucket_name, token_freqs, negative_sample_size, epochs,
+                   stats, metrics_path=None, metrics_interval=30.0, batch_size=128, negative_pool=0):
+    # The processes are the parallelism, one compute thread each
+    torch.set_num_threads(1)
+    sampler = UnigramSampler(token_freqs)
+    dataset = StreamingSGNSDataset(s3_files, bucket_name, batch_size=batch_size, shard=(rank, processes))
+
+    # Moments and embedding rows are both shared, updates land in them without locking
+    optimizer = make_shared_optimizer(model, optimizer_state)
+    device = torch.device("cpu")
+    metrics = TrainingMetrics(metrics_path, metrics_interval, worker=rank)
 
+    for epoch in range(epochs):
+        dataset.set_epoch(epoch)
+        total_loss, count, pairs = 0.0, 0, 0
+        start = time.time()
+        wait_start = time.perf_counter()
+        for center, context, shard in dataset:
+            wait_seconds = time.perf_counter() - wait_start
+            if shard is not None:
+                metrics.record_file(shard)
 
-def train(start_idx, end_idx):    
+            loss, timings, masked = train_step(model, optimizer, sampler, center, context, negative_sample_size, device,
+                                               negative_pool)
+            metrics.record_step(center.numel(), loss, wait_seconds, timings, masked)
+            metrics.maybe_report(epoch)
+            total_loss += loss
+            count += 1
+            pairs += center.numel()
+            wait_start = time.perf_counter()
+        metrics.maybe_report(epoch, force=True)
+
+        # Per-process throughput for this epoch
+        stats.put((epoch, rank, total_loss / max(1, count), pairs, time.time() - start))
+
+
+# Run Hogwild processes over a shared-memory model, reporting per-process throughput and saving after every epoch
+def train_hogwild(model, processes, s3_files, bucket_name, token_freqs, negative_sample_size, epochs, metrics_path=None,
+                  metrics_interval=30.0, batch_size=128, negative_pool=0):
+    model.share_memory()
+    optimizer_state = share_optimizer_state(model)
+    context = torch.multiprocessing.get_context("spawn")
+    stats = context.Queue()
+    workers = [
+        context.Process(target=hogwild_worker, args=(rank, processes, model, optimizer_state, s3_files, bucket_name,
+                                                     token_freqs, negative_sample_size, epochs, stats, metrics_path,
+                                                     metrics_interval, batch_size, negative_pool))
+        for rank in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Epoch reports arrive per process, an epoch is done once every process has reported it
+    start = time.time()
+    reports = {}
+    while len(reports) < epochs or any(len(epoch_reports) < processes for epoch_reports in reports.values()):
+        try:
+            epoch, rank, average_loss, pairs, elapsed = stats.get(timeout=10)
+        except queue.Empty:
+            if any(worker.exitcode not in (None, 0) for worker in workers):
+                raise RuntimeError("A Hogwild training process died")
+            continue
+
+        reports.setdefault(epoch, []).append((rank, average_loss, pairs, elapsed))
+        if len(reports[epoch]) < processes:
+            continue
+
+        # Print statistics for this epoch
+        print(f"Epoch: {epoch+1}/{epochs}")
+        for rank, average_loss, pairs, elapsed in sorted(reports[epoch]):
+            print(f"Worker {rank}: {pairs / max(elapsed, 1e-9):,.0f} pairs/sec, average loss {average_loss:.4f}")
+        print(f"Total: {sum(pairs / max(elapsed, 1e-9) for _, _, pairs, elapsed in reports[epoch]):,.0f} pairs/sec")
+        print("Elapsed:", time.time() - start)
+        print("*" * 100)
+
+        # Save embeddings after each epoch
+        upload_tensor_to_s3(
+            tensor=model.input_embedding.weight.data.clone(),
+            key='polyvec_embeddings.pt'
+        )
+
+    for worker in workers:
+        worker.join()
+
+
+def train(start_idx, end_idx, sparse=False, processes=1, metrics_path=None, metrics_interval=30.0, profile_dir=None,
+          batch_size=128, negative_pool=0):
     # If you need to generate dataset first - if data is present, leave commented out
     # start = time.time()
     # generate_sgns_pairs(start_idx, end_idx)
@@ -99,16 +362,33 @@ def train(start_idx, end_idx):
     # Set the S3 bucket name containing the .pt files
     s3_bucket_name = 'sgns-pairs'
 
-    # List all .pt files in the S3 bucket
-    s3_files = list_s3_pt_files(s3_bucket_name)
+    # List all shards in the S3 bucket
+    s3_files = list_s3_pt_files(s3_bucket_name, extensions=SHARD_EXTENSIONS)
+
+    # Negatives are drawn per batch from unigram^0.75 counts, so every epoch sees new ones
+    negative_sample_size = 15
+    token_freqs = load_token_frequencies(vocab_size)
+    if token_freqs is None:
+        print("Warning: no token frequencies found, sampling negatives uniformly")
+        token_freqs = torch.ones(vocab_size, dtype=torch.float64)
+    sampler = UnigramSampler(token_freqs.numpy())
+
+    # Hogwild: lock-free sparse updates from several processes into one shared model
+    embedding_dim = 300
+    epochs = 5
+    if processes > 1:
+        model = SGNSModel(vocab_size, embedding_dim, sparse=True)
+        train_hogwild(model, processes, s3_files, s3_bucket_name, token_freqs.numpy(), negative_sample_size, epochs,
+                      metrics_path, metrics_interval, batch_size, negative_pool)
+        return
 
     # Set up dataset
-    dataset = StreamingSGNSDataset(s3_files, s3_bucket_name)
+    dataset = StreamingSGNSDataset(s3_files, s3_bucket_name, batch_size=batch_size)
     cpu_cores = os.cpu_count()
     max_workers = max(1, int(cpu_cores * 0.9))
     dataloader = DataLoader(
         dataset,
-        batch_size=128,
+        batch_size=None,  # The dataset yields whole batches
         num_workers=max_workers,
         pin_memory=True,  # Speeds up host to GPU transfers
         prefetch_factor=2,  # Prefetch ahead to keep GPU fed
@@ -116,54 +396,63 @@ def train(start_idx, end_idx):
 
     # Initialize model and optimizer
     start = time.time()  # Start timer here for epoch tracking
-    embedding_dim = 300
-    model = SGNSModel(vocab_size, embedding_dim)
-    optimizer = Adam(model.parameters(), lr=1e-3)
+    model = SGNSModel(vocab_size, embedding_dim, sparse=sparse)
+    optimizer = make_optimizer(model, sparse)
 
     # Move to GPU if available
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model = model.to(device)
 
     # Start training loop
-    epochs = 5
-    
     # Track overall progress
     total_files = len(dataloader.dataset.s3_files) if hasattr(dataloader.dataset, 's3_files') else "unknown"
     processed_files = set()
-    
+
+    # Interval metrics and an opt-in profiler window over the first steps
+    metrics = TrainingMetrics(metrics_path, metrics_interval)
+    profiler = make_profiler(profile_dir)
+    if profiler is not None:
+        profiler.start()
+
     for i in tqdm(range(epochs), desc="Training epochs"):
         total_loss = 0.0
         count = 0
-        
-        for batch_idx, (center, context, negatives) in enumerate(tqdm(dataloader, desc=f"Epoch {i+1}/{epochs}", leave=False)):
-            # Display batch progress periodically
-            if batch_idx % 2000 == 0:
-                print(f"Processed {batch_idx} batches so far in this epoch")
-            
-            # Convert
-            center = center.to(device).long()
-            context = context.to(device).long()
-            negatives = negatives.to(device).long()
 
-            # Clear gradients
-            optimizer.zero_grad()
+        # New file order every epoch, picked up by the freshly started loader workers
+        dataset.set_epoch(i)
+
+        wait_start = time.perf_counter()
+        for batch_idx, (center, context, shard) in enumerate(tqdm(dataloader, desc=f"Epoch {i+1}/{epochs}", leave=False)):
+            # Time spent blocked on the loader
+            wait_seconds = time.perf_counter() - wait_start
 
-            # Forward pass
-            loss = model(center, context, negatives)
-            loss.backward()
+            # First batch of a file carries its load stats
+            if shard is not None:
+                processed_files.add(shard["key"])
+                metrics.record_file(shard)
 
-            # Set gradients
-            optimizer.step()
+            # Display batch progress periodically
+            if batch_idx % 2000 == 0:
+                print(f"Processed {batch_idx} batches so far in this epoch")
 
             # Accrue loss
-            total_loss += loss.item()
+            loss, timings, masked = train_step(model, optimizer, sampler, center, context, negative_sample_size, device,
+                                               negative_pool)
+            total_loss += loss
+            metrics.record_step(center.numel(), loss, wait_seconds, timings, masked)
+            metrics.maybe_report(i)
+            if profiler is not None:
+                profiler.step()
 
             # Count batches
             count += 1
-        
+            wait_start = time.perf_counter()
+
+        metrics.maybe_report(i, force=True)
+
         # Print statistics for this epoch
         print(f"Epoch: {i+1}/{epochs}")
-        print("Average Loss:", total_loss / count)
+        print("Average Loss:", total_loss / max(1, count))
         print(f"Files processed: {len(processed_files)}/{total_files}")
         print("Elapsed:", time.time() - start)
         print("*" * 100)
@@ -174,7 +463,24 @@ def train(start_idx, end_idx):
             key='polyvec_embeddings.pt'
         )
 
+    if profiler is not None:
+        profiler.stop()
+
 
 if __name__ == '__main__':
     torch.multiprocessing.set_start_method('spawn')
-    train(int(sys.argv[1]), int(sys.argv[2]))
+    parser = argparse.ArgumentParser(description="Train SGNS embeddings from the pair shards in S3")
+    parser.add_argument("start_idx", type=int)
+    parser.add_argument("end_idx", type=int)
+    parser.add_argument("--sparse", action="store_true", help="Sparse embedding gradients with SparseAdam")
+    parser.add_argument("--processes", type=int, default=1, help="Hogwild training processes (implies --sparse)")
+    parser.add_argument("--metrics-log", default=None, help="Append per-interval JSON metrics to this file")
+    parser.add_argument("--metrics-interval", type=float, default=30.0, help="Seconds between metrics reports")
+    parser.add_argument("--profile-dir", default=None, help="Write a torch.profiler trace of the first steps here")
+    parser.add_argument("--batch-size", type=int, default=128, help="Pairs per optimization step")
+    parser.add_argument("--negative-pool", type=int, default=0,
+                        help="Negatives shared by every pair of a batch, scored with one matmul (0: 15 per pair)")
+    args = parser.parse_args()
+    train(args.start_idx, args.end_idx, sparse=args.sparse, processes=args.processes, metrics_path=args.metrics_log,
+          metrics_interval=args.metrics_interval, profile_dir=args.profile_dir, batch_size=args.batch_size,
+          negative_pool=args.negative_pool)
@@ -0,0 +1,312 @@
+import argparse
+import base64
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import time
+import uuid
+
+import faiss
+import numpy as np
+import torch
+
+# Define base path
+BASE_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'polyvec')))
+
+from inverted_index import InvertedIndex, TokenStore
+from vector_store import VectorStore
+from replication import remove_feed, write_snapshot_state, write_model_state, matrix_fingerprint
+from data.bpe import load_merges, encode
+from data.util import fetch_pt_file_from_s3
+
+# Embedding dimension of the served model
+DIMENSION = 300
+
+# Worker state, inherited through fork so the matrix is never pickled
+embedding_matrix = None
+merges = None
+
+# Read a corpus as batches of records with a "text" and optional "token_ids" / "id"
+def read_corpus(path, batch_size):
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet corpora requires pyarrow (pip install pyarrow)")
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+        return
+
+    batch = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+# Documents pooled per gather, bounds the (tokens x dimension) temporary
+POOL_CHUNK = 1024
+
+# Tokenize (when needed) and mean-pool one batch of records in a worker
+def embed_batch(records):
+    # Flatten every document's tokens into one array
+    token_lists = []
+    for record in records:
+        token_ids = record.get("token_ids")
+        if token_ids is None:
+            token_ids = encode(record["text"], merges)
+        token_lists.append(token_ids)
+
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    flat = np.fromiter((token for tokens in token_lists for token in tokens), dtype=np.int64, count=int(lengths.sum()))
+
+    # Clamp to the matrix like generate_embeddings does
+    flat = np.clip(flat, 0, embedding_matrix.shape[0] - 1)
+    offsets = np.cumsum(lengths) - lengths
+
+    # Pool a slice of documents at a time with one gather + reduceat
+    vectors = np.zeros((len(records), embedding_matrix.shape[1]), dtype=np.float32)
+    for start in range(0, len(records), POOL_CHUNK):
+        rows = np.arange(start, min(start + POOL_CHUNK, len(records)))
+        rows = rows[lengths[rows] > 0]
+        if rows.size == 0:
+            continue
+        gathered = embedding_matrix[flat[offsets[rows[0]]:offsets[rows[-1]] + lengths[rows[-1]]]]
+        sums = np.add.reduceat(gathered, offsets[rows] - offsets[rows[0]], axis=0)
+        vectors[rows] = sums / lengths[rows, None]
+
+    return vectors, flat.astype(np.int32), lengths
+
+# Same mapping as storage.uuid_to_int
+def uuid_to_int(uuid_str):
+    return uuid.UUID(uuid_str).int & 0x7FFFFFFF
+
+# Random positive 31-bit id that does not collide with taken ones
+def draw_id(taken, rng):
+    while True:
+        candidate = int(rng.integers(1, 0x7FFFFFFF))
+        if candidate not in taken:
+            return candidate
+
+# Incrementally built FAISS index. Factories that need training see a uniform sample of the whole corpus: vectors are
+# spilled to a file while a reservoir keeps train_size of them, then the index is trained on the reservoir and filled
+# from the file
+class IndexBuilder:
+    def __init__(self, index_factory, train_size, spill_path, seed=0):
+        self.index = faiss.index_factory(DIMENSION, index_factory)
+        if not isinstance(self.index, faiss.IndexIDMap):
+            self.index = faiss.IndexIDMap(self.index)
+        self.index_factory = index_factory
+        self.train_size = train_size
+        self.rng = np.random.default_rng(seed)
+
+        # Vectors and ids waiting for the trained index, and the training sample
+        self.spill_path = spill_path
+        self.spilled_ids = []
+        self.count = 0
+        self.sample = np.empty((0, DIMENSION), dtype=np.float32)
+
+    def add(self, vectors, ids):
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+            return
+
+        with open(self.spill_path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self.spilled_ids.append(ids)
+
+        # Reservoir sampling: the first train_size vectors fill the sample, vector i replaces a random slot with
+        # probability train_size / (i + 1)
+        positions = np.arange(self.count, self.count + len(vectors))
+        fill = positions < self.train_size
+        self.sample = np.concatenate((self.sample, vectors[fill]))
+        slots = self.rng.integers(0, positions[~fill] + 1) if (~fill).any() else np.empty(0, dtype=np.int64)
+        replace = slots < self.train_size
+        self.sample[slots[replace]] = vectors[~fill][replace]
+        self.count += len(vectors)
+
+    # Train on the sample (IVF centroids, PQ codebooks), then add every spilled vector
+    def finish(self):
+        if self.index.is_trained or self.count == 0:
+            return self.index
+        check_trainable(self.index, self.index_factory, len(self.sample))
+        print(f"Training {self.index_factory} on {len(self.sample)} of {self.count} vectors")
+        self.index.train(self.sample)
+        self.sample = None
+
+        # Add in slices so the spill file is never read into memory whole
+        vectors = np.memmap(self.spill_path, dtype=np.float32, mode='r', shape=(self.count, DIMENSION))
+        ids = np.concatenate(self.spilled_ids)
+        for start in range(0, self.count, self.train_size or self.count):
+            stop = start + (self.train_size or self.count)
+            self.index.add_with_ids(np.ascontiguousarray(vectors[start:stop]), ids[start:stop])
+        del vectors
+        os.remove(self.spill_path)
+        return self.index
+
+# Refuse to train an index on fewer vectors than it has clusters, with a size that would work instead
+def check_trainable(index, index_factory, count):
+    ivf = faiss.try_extract_index_ivf(faiss.downcast_index(index.index))
+    if ivf is not None and count < ivf.nlist:
+        # FAISS wants about 39 training vectors per centroid, and sqrt(n)-ish lists are the usual starting point
+        suggested = max(1, min(int(4 * np.sqrt(count)), count // 39))
+        raise ValueError(f"{index_factory} has {ivf.nlist} lists but only {count} vectors to train them on, use a "
+                         f"smaller nlist (e.g. IVF{suggested}) or a larger --train-size / corpus")
+
+    # Every PQ codebook has 2^nbits centroids to train
+    pq = getattr(faiss.downcast_index(ivf if ivf is not None else index.index), "pq", None)
+    if pq is not None and count < pq.ksub:
+        raise ValueError(f"{index_factory} trains {pq.ksub} centroids per sub-quantizer but only {count} vectors are "
+                         f"available, use fewer bits per code or a larger --train-size / corpus")
+
+def bulk_load(corpus, output, index_factory="IDMap,Flat", embeddings=None, workers=None, batch_size=10_000,
+              train_size=200_000, overwrite=False, seed=0, rerank=False, rerank_factor=10):
+    global embedding_matrix, merges
+    start_time = time.time()
+
+    # Refuse to clobber a live store by accident
+    if os.path.exists(os.path.join(output, "faiss.index")) and not overwrite:
+        raise FileExistsError(f"{output} already holds an index, pass --overwrite to replace it")
+
+    # Embedding matrix from a local file, or the served one from S3
+    if embeddings is not None:
+        embedding_matrix = torch.load(embeddings)
+    else:
+        embedding_matrix = fetch_pt_file_from_s3("sgns-artifacts", "polyvec_embeddings.pt")
+    if embedding_matrix is None:
+        raise RuntimeError("Unable to load the embedding matrix")
+    if isinstance(embedding_matrix, torch.Tensor):
+        embedding_matrix = embedding_matrix.detach().cpu().numpy()
+    embedding_matrix = np.ascontiguousarray(embedding_matrix, dtype=np.float32)
+    merges = load_merges()
+
+    # Stores being built (full-precision vectors go straight to a staging file when they are kept for re-ranking)
+    os.makedirs(output, exist_ok=True)
+    staging = os.path.join(output, f".bulk-load-{os.getpid()}")
+    os.makedirs(staging, exist_ok=True)
+    builder = IndexBuilder(index_factory, train_size, os.path.join(staging, "train.f32"), seed)
+    vector_store = VectorStore(os.path.join(staging, "vectors.f32"), DIMENSION) if rerank else None
+    token_blocks = []
+    metadata, content_hashes = {}, {}
+    rng = np.random.default_rng(seed)
+    skipped = 0
+
+    # Keep only new, non-empty documents of an embedded batch and add them everywhere
+    def collect(records, vectors, flat, lengths):
+        nonlocal skipped
+        keep = np.zeros(len(records), dtype=bool)
+        ids = []
+        for row, record in enumerate(records):
+            # Texts are stored base64 encoded, the way the API server sends them
+            text = base64.b64encode(record["text"].encode('utf-8')).decode('ascii')
+            digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            if lengths[row] == 0 or digest in content_hashes:
+                skipped += 1
+                continue
+
+            # Explicit UUIDs keep their storage mapping unless it collides
+            id = uuid_to_int(record["id"]) if record.get("id") else None
+            if id is None or id in metadata:
+                id = draw_id(metadata, rng)
+
+            keep[row] = True
+            ids.append(id)
+            metadata[id] = text
+            content_hashes[digest] = id
+
+        if not ids:
+            return
+        ids = np.array(ids, dtype=np.int64)
+        builder.add(vectors[keep], ids)
+        if vector_store is not None:
+            vector_store.add_many(ids, vectors[keep])
+
+        # Posting lists are built once at the end
+        token_blocks.append((ids, flat[np.repeat(keep, lengths)], lengths[keep]))
+
+    # Workers inherit the matrix and merges through fork, so nothing large is pickled to them
+    workers = workers or max(1, os.cpu_count() - 1)
+    context = multiprocessing.get_context("fork")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        # Keep a bounded number of batches in flight, collected in input order
+        in_flight = []
+        for records in read_corpus(corpus, batch_size):
+            in_flight.append((records, executor.submit(embed_batch, records)))
+            if len(in_flight) >= 2 * workers:
+                records, future = in_flight.pop(0)
+                collect(records, *future.result())
+                print(f"Embedded {len(metadata)} documents ({time.time() - start_time:.1f}s)", end="\r")
+        for records, future in in_flight:
+            collect(records, *future.result())
+
+    index = builder.finish()
+    postings = InvertedIndex()
+    token_store = TokenStore()
+    if token_blocks:
+        ids, tokens, lengths = (np.concatenate(block) for block in zip(*token_blocks))
+        postings.add_many(ids, tokens, np.cumsum(lengths) - lengths)
+        token_store.add_many(ids, tokens, np.cumsum(lengths) - lengths)
+    print(f"\nBuilt index with {index.ntotal} vectors, skipped {skipped} documents ({time.time() - start_time:.1f}s)")
+
+    # Write everything into the staging directory, then move it into place
+    faiss.write_index(index, os.path.join(staging, "faiss.index"))
+    with open(os.path.join(staging, "metadata.pkl"), 'wb') as f:
+        pickle.dump(metadata, f)
+    with open(os.path.join(staging, "postings.pkl"), 'wb') as f:
+        pickle.dump(postings.to_dict(), f)
+    with open(os.path.join(staging, "dedup.pkl"), 'wb') as f:
+        pickle.dump({"hashes": content_hashes, "aliases": {}}, f)
+    with open(os.path.join(staging, "tokens.pkl"), 'wb') as f:
+        pickle.dump(token_store.to_dict(), f)
+    model_source = os.path.abspath(embeddings) if embeddings is not None else "polyvec_embeddings.pt"
+    write_model_state(staging, model_source, matrix_fingerprint(embedding_matrix))
+
+    # How the server should treat the index, the rest of the collection settings keep their defaults
+    config = {"dimension": DIMENSION, "index_factory": index_factory, "rerank": rerank, "rerank_factor": rerank_factor}
+    with open(os.path.join(staging, "collection.json"), 'w') as f:
+        json.dump(config, f, indent=2)
+    names = ["metadata.pkl", "postings.pkl", "dedup.pkl", "tokens.pkl", "model.json", "collection.json"]
+    if vector_store is not None:
+        with open(os.path.join(staging, "vectors.pkl"), 'wb') as f:
+            pickle.dump(vector_store.to_dict(), f)
+        names += ["vectors.pkl", "vectors.f32"]
+    for name in names + ["faiss.index"]:
+        os.replace(os.path.join(staging, name), os.path.join(output, name))
+    shutil.rmtree(staging)
+
+    # The loaded store starts a new change feed, followers have to bootstrap again
+    remove_feed(output)
+    write_snapshot_state(output, 0, 0)
+
+    print(f"Done loading {len(metadata)} documents into {output} ({time.time() - start_time:.1f}s)")
+    return len(metadata)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build a PolyDB index from a corpus in one pass")
+    parser.add_argument("corpus", help="JSONL (or .parquet) file with a 'text' field and optional 'token_ids' and 'id'")
+    parser.add_argument("--output", default=BASE_DIRECTORY + "/artifacts", help="Storage directory to write")
+    parser.add_argument("--index-factory", default="IDMap,Flat", help="FAISS index factory string, e.g. IVF4096,PQ50")
+    parser.add_argument("--embeddings", default=None, help="Local embedding matrix (.pt), defaults to the one in S3")
+    parser.add_argument("--workers", type=int, default=None, help="Embedding processes")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Documents per embedding batch")
+    parser.add_argument("--train-size", type=int, default=200_000, help="Vectors sampled to train ANN structures")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing index in --output")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rerank", action="store_true",
+                        help="Keep full-precision vectors on disk and re-rank the index's candidates with them")
+    parser.add_argument("--rerank-factor", type=int, default=10, help="Index candidates fetched per requested result")
+    args = parser.parse_args()
+
+    bulk_load(args.corpus, args.output, args.index_factory, args.embeddings, args.workers, args.batch_size,
+              args.train_size, args.overwrite, args.seed, args.rerank, args.rerank_factor)
@@ -0,0 +1,481 @@
+import faiss
+import pickle
+import os
+import json
+import hashlib
+import threading
+import contextlib
+import numpy as np
+
+from storage.inverted_index import InvertedIndex, TokenStore
+from storage.vector_store import VectorStore
+from storage.replication import read_snapshot_state, write_snapshot_state, read_model_state, write_model_state, \
+    read_search_params, apply_search_params, search_parameter_index, MODEL_STATE
+
+# Files of one collection, relative to its directory
+INDEX_FILE = "faiss.index"
+METADATA_FILE = "metadata.pkl"
+POSTINGS_FILE = "postings.pkl"
+DEDUP_FILE = "dedup.pkl"
+TOKENS_FILE = "tokens.pkl"
+VECTORS_FILE = "vectors.pkl"
+VECTORS_DATA_FILE = "vectors.f32"
+CONFIG_FILE = "collection.json"
+
+# Files of a rebuild are written next to the live ones with this suffix, and the journal lists the ones to move into
+# place once all of them are complete
+STAGED_SUFFIX = ".rebuild"
+REPLACE_JOURNAL = "replace.json"
+
+# Upper bound on lexical candidates scored per hybrid query
+HYBRID_CANDIDATES = 1000
+
+# Upper bound on documents scored per keyword query (common tokens alone can match most of a collection)
+KEYWORD_CANDIDATES = 1000
+
+# Reciprocal rank fusion constant
+RRF_K = 60
+
+# Rough in-memory overhead of one document's dict entries, on top of its text and index code
+DOCUMENT_OVERHEAD = 200
+
+# Content hash of a stored text
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+# Write a pickle next to its destination and move it into place
+def atomic_pickle(obj, path):
+    with open(path + ".tmp", 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+def load_pickle(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+# Whether a directory holds a collection (stores from before collections existed have no config yet)
+def collection_exists(directory):
+    return os.path.exists(os.path.join(directory, CONFIG_FILE)) or os.path.exists(os.path.join(directory, INDEX_FILE))
+
+# Merge the settings stored with a collection into the defaults, writing them back when asked to
+def load_config(directory, defaults, write=False):
+    path = os.path.join(directory, CONFIG_FILE)
+    config = dict(defaults)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            config.update(json.load(f))
+    if write:
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(config, f, indent=2)
+        os.replace(path + ".tmp", path)
+    return config
+
+
+# Move the staged files of an interrupted swap into place, so a crash during a cutover is rolled forward
+def finish_replace(directory):
+    journal = os.path.join(directory, REPLACE_JOURNAL)
+    if not os.path.exists(journal):
+        return
+    with open(journal, 'r') as f:
+        file_names = json.load(f)["files"]
+    for file_name in file_names:
+        staged = os.path.join(directory, file_name + STAGED_SUFFIX)
+        if os.path.exists(staged):
+            os.replace(staged, os.path.join(directory, file_name))
+    os.remove(journal)
+
+
+# Lock that searches share and writes hold alone. Waiting writers go first, so a stream of searches cannot starve
+# them. The writer may take it again, and its shared sections pass straight through
+class ReadWriteLock:
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = None
+        self.depth = 0
+        self.waiting_writers = 0
+
+    def __enter__(self):
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer == me:
+                self.depth += 1
+                return self
+            self.waiting_writers += 1
+            while self.writer is not None or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer, self.depth = me, 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self.condition:
+            self.depth -= 1
+            if self.depth == 0:
+                self.writer = None
+                self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def shared(self):
+        with self.condition:
+            owned = self.writer == threading.get_ident()
+            if not owned:
+                while self.writer is not None or self.waiting_writers:
+                    self.condition.wait()
+                self.readers += 1
+        try:
+            yield self
+        finally:
+            if not owned:
+                with self.condition:
+                    self.readers -= 1
+                    if self.readers == 0:
+                        self.condition.notify_all()
+
+
+# One named collection: its own index, text store, posting lists, tokens and configuration, kept in one directory
+class Collection:
+    def __init__(self, name, directory, defaults, create=False):
+        self.name = name
+        self.directory = directory
+        self.config = load_config(directory, defaults, write=create and not collection_exists(directory))
+        finish_replace(directory)
+
+        # Searches and snapshots share it, writes hold it alone
+        self.lock = ReadWriteLock()
+
+        # Requests and rebuilds holding this collection, it is never unloaded while any are
+        self.users = 0
+
+        # Set once the collection is safe to serve (after a rebuild for a new model, if it needed one)
+        self.ready = threading.Event()
+
+        # Initialize index
+        if os.path.exists(self.path(INDEX_FILE)):
+            self.index = faiss.read_index(self.path(INDEX_FILE))
+        else:
+            self.index = self.new_index(self.config["dimension"])
+
+        # Search-time parameters picked by tune_search.py for this index (nprobe, efSearch, ...)
+        self.search_params = read_search_params(directory)
+        apply_search_params(self.index, self.search_params)
+
+        # Texts, posting lists (token id -> doc ids) and per-document token ids
+        self.metadata = load_pickle(self.path(METADATA_FILE), {})
+        postings = load_pickle(self.path(POSTINGS_FILE), {"postings": {}, "heads": {}})
+        self.postings = InvertedIndex.from_dict(postings)
+        self.token_store = TokenStore.from_dict(load_pickle(self.path(TOKENS_FILE), {"tokens": {}}))
+
+        # Posting lists written before deletes pruned them may still name deleted documents
+        if "heads" not in postings:
+            self.postings.compact(live_ids=self.metadata)
+
+        # With rerank on, the index holds compressed codes for candidate generation and the full-precision
+        # vectors stay on disk for exact re-ranking
+        self.vectors = None
+        if self.config["rerank"]:
+            state = load_pickle(self.path(VECTORS_FILE), {"dimension": self.index.d, "ids": []})
+            self.vectors = VectorStore.from_dict(self.path(VECTORS_DATA_FILE), state)
+            if len(self.vectors) < self.index.ntotal:
+                raise ValueError(f"Collection {self.name}: {self.index.ntotal - len(self.vectors)} vectors are missing "
+                                 f"from {VECTORS_DATA_FILE}, rebuild it with bulk_load --rerank")
+
+        # Content hash -> id table, id aliases and cumulative ingest counters, the table rebuilt from the texts if missing
+        dedup = load_pickle(self.path(DEDUP_FILE))
+        self.ingest_stats = {"inserts": 0, "duplicates": 0, "tokens_skipped": 0}
+        if dedup is not None:
+            self.content_hashes, self.aliases = dedup["hashes"], dedup["aliases"]
+            self.ingest_stats.update(dedup.get("ingest", {}))
+        else:
+            self.content_hashes = {content_hash(text): id for id, text in self.metadata.items()}
+            self.aliases = {}
+
+        # Change feed position of the last change applied, and the changes applied since the files were written
+        state = read_snapshot_state(directory)
+        self.sequence, self.offset = state["sequence"], state["offset"]
+        self.unpersisted = 0
+
+        # Matrix the stored vectors were pooled from, pinned until the collection is rebuilt for a new one
+        self.model_state = read_model_state(directory)
+        self.matrix, self.model_version = None, None
+
+        # Ids inserted or deleted while a rebuild is running, None when there is none
+        self.dirty = None
+
+        self.nbytes = self.memory_bytes()
+
+    def path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    # Empty index from the configured factory (trained ANN indexes come from bulk_load)
+    def new_index(self, dimension):
+        index = faiss.index_factory(dimension, self.config["index_factory"])
+        if not isinstance(index, faiss.IndexIDMap):
+            index = faiss.IndexIDMap(index)
+        if not index.is_trained:
+            raise ValueError(f"Collection {self.name}: {self.config['index_factory']} needs training, build it with bulk_load")
+        return index
+
+    # Empty index of the same kind for vectors of the given dimension
+    def empty_index_like(self, dimension):
+        if dimension == self.index.d:
+            # Trained ANN structures (IVF centroids, PQ codebooks) carry over, bulk_load retrains them from scratch
+            new_index = faiss.clone_index(self.index)
+            new_index.reset()
+            return new_index
+        if isinstance(search_parameter_index(self.index), faiss.IndexFlat):
+            return self.new_index(dimension)
+        raise ValueError(f"Cannot move a trained {self.index.d}-dimensional index to {dimension} dimensions, "
+                         f"rebuild it with bulk_load")
+
+    # Empty vector store for a rebuild, written next to the live one (None without rerank)
+    def empty_vectors_like(self, dimension):
+        if self.vectors is None:
+            return None
+        path = self.path(VECTORS_DATA_FILE) + STAGED_SUFFIX
+        if os.path.exists(path):
+            os.remove(path)
+        return VectorStore(path, dimension)
+
+    # Swap in a rebuilt index and its vector store, built from the matrix in model_state. The documents are written
+    # first, then the new index, vector row ids and model state are staged and moved into place under a journal, so
+    # a crash leaves either the old files or (once the journal is down) the new ones
+    def replace_index(self, index, vectors, model_state):
+        self.persist_documents()
+        faiss.write_index(index, self.path(INDEX_FILE) + STAGED_SUFFIX)
+        file_names = [INDEX_FILE, MODEL_STATE]
+        if vectors is not None:
+            atomic_pickle(vectors.to_dict(), self.path(VECTORS_FILE) + STAGED_SUFFIX)
+            file_names += [VECTORS_DATA_FILE, VECTORS_FILE]
+        write_model_state(self.directory, model_state["source"], model_state["fingerprint"], MODEL_STATE + STAGED_SUFFIX)
+        with open(self.path(REPLACE_JOURNAL) + ".tmp", 'w') as f:
+            json.dump({"files": file_names}, f)
+        os.replace(self.path(REPLACE_JOURNAL) + ".tmp", self.path(REPLACE_JOURNAL))
+        finish_replace(self.directory)
+
+        if vectors is not None:
+            vectors.moved(self.path(VECTORS_DATA_FILE))
+            self.vectors = vectors
+        self.index = index
+        self.model_state = dict(model_state)
+        apply_search_params(self.index, self.search_params)
+        write_snapshot_state(self.directory, self.sequence, self.offset)
+        self.nbytes = self.memory_bytes()
+        self.unpersisted = 0
+
+    # Bytes the index keeps per vector (4 per dimension for flat storage)
+    def code_bytes(self):
+        try:
+            return search_parameter_index(self.index).sa_code_size()
+        except RuntimeError:
+            return 4 * self.index.d
+
+    # Estimated resident size: index codes and ids, texts, posting lists, tokens and re-rank row ids
+    def memory_bytes(self):
+        code_size = self.code_bytes()
+        texts = sum(len(text) for text in self.metadata.values())
+        return (self.index.ntotal * (code_size + 8) + texts + len(self.metadata) * DOCUMENT_OVERHEAD
+                + self.postings.nbytes() + self.token_store.nbytes() + (self.vectors.nbytes() if self.vectors else 0))
+
+    def persist_dedup(self):
+        atomic_pickle({"hashes": self.content_hashes, "aliases": self.aliases, "ingest": self.ingest_stats},
+                      self.path(DEDUP_FILE))
+
+    # Write every file. Searches may keep running meanwhile (under the shared lock), writes may not
+    def persist(self):
+        self.persist_documents()
+
+        # Save the row ids of the full-precision vectors (the vectors were written as they arrived)
+        if self.vectors is not None:
+            atomic_pickle(self.vectors.to_dict(), self.path(VECTORS_FILE))
+
+        # Save index
+        faiss.write_index(self.index, self.path(INDEX_FILE) + ".tmp")
+        os.replace(self.path(INDEX_FILE) + ".tmp", self.path(INDEX_FILE))
+
+        # Record the feed position last, so a snapshot is never older than the state it claims
+        write_snapshot_state(self.directory, self.sequence, self.offset)
+        self.nbytes = self.memory_bytes()
+        self.unpersisted = 0
+
+    # Write the texts, posting lists, dedup table and tokens (everything that does not depend on the matrix)
+    def persist_documents(self):
+        # Save metadata
+        atomic_pickle(self.metadata, self.path(METADATA_FILE))
+
+        # Save posting lists
+        atomic_pickle(self.postings.to_dict(), self.path(POSTINGS_FILE))
+
+        # Save content hashes
+        self.persist_dedup()
+
+        # Save document tokens
+        atomic_pickle(self.token_store.to_dict(), self.path(TOKENS_FILE))
+
+    # Add a pooled vector and its text (idempotent, so replayed changes are harmless)
+    def apply_insert(self, uuid_int, text, vector, token_ids=None):
+        if uuid_int in self.metadata:
+            return
+
+        # Add to index
+        self.index.add_with_ids(vector.reshape(1, -1), np.array([uuid_int], dtype=np.int64))
+
+        # Keep the full-precision vector for re-ranking
+        if self.vectors is not None:
+            self.vectors.add(uuid_int, vector)
+
+        # Store mapping, the hash keeps pointing at an earlier live copy of the text (replayed from a feed written
+        # before inserts checked for duplicates under the lock)
+        self.metadata[uuid_int] = text
+        existing_id = self.content_hashes.get(content_hash(text))
+        if existing_id is None or existing_id not in self.metadata:
+            self.content_hashes[content_hash(text)] = uuid_int
+
+        # Index tokens for lexical candidate generation, and keep them to re-embed under a new model
+        if token_ids is not None:
+            self.postings.add(uuid_int, token_ids)
+            self.token_store.add(uuid_int, token_ids)
+
+        # A running rebuild has to pick this document up at cutover
+        if self.dirty is not None:
+            self.dirty.add(uuid_int)
+        self.unpersisted += 1
+
+    # Remove a document, and from the posting lists of its tokens
+    def apply_delete(self, uuid_int):
+        if uuid_int not in self.metadata:
+            return
+        self.index.remove_ids(np.array([uuid_int], dtype=np.int64))
+        text = self.metadata.pop(uuid_int)
+        token_ids = self.token_store.get(uuid_int)
+        if token_ids is not None:
+            self.postings.remove(uuid_int, token_ids)
+        self.token_store.remove(uuid_int)
+        if self.vectors is not None:
+            self.vectors.remove(uuid_int)
+        if self.dirty is not None:
+            self.dirty.add(uuid_int)
+        if self.content_hashes.get(content_hash(text)) == uuid_int:
+            del self.content_hashes[content_hash(text)]
+        for alias in [alias for alias, target in self.aliases.items() if target == uuid_int]:
+            del self.aliases[alias]
+        self.unpersisted += 1
+
+    # Let another id stand for a stored document (a duplicate insert)
+    def apply_alias(self, alias, uuid_int):
+        if uuid_int in self.metadata and alias != uuid_int:
+            self.aliases[alias] = uuid_int
+            self.unpersisted += 1
+
+    # Drop index entries without a text, a follower's data files may be newer than its recorded sequence
+    def realign(self):
+        documents = len(self.metadata)
+        index_ids = set(faiss.vector_to_array(self.index.id_map).tolist())
+        stale_ids = np.array([id for id in index_ids if id not in self.metadata], dtype=np.int64)
+        if stale_ids.size:
+            self.index.remove_ids(stale_ids)
+        self.metadata = {id: text for id, text in self.metadata.items() if id in index_ids}
+
+        # Same for full-precision vectors, a document missing its vector is dropped so the feed replays it whole
+        if self.vectors is not None:
+            vector_ids = self.vectors.ids[:self.vectors.count]
+            for id in vector_ids[(vector_ids >= 0) & ~np.isin(vector_ids, list(self.metadata))].tolist():
+                self.vectors.remove(id)
+            missing_ids = [id for id in self.metadata if id not in self.vectors]
+            if missing_ids:
+                self.index.remove_ids(np.array(missing_ids, dtype=np.int64))
+                for id in missing_ids:
+                    del self.metadata[id]
+
+        # And from the posting lists, replaying the feed adds back what it has
+        if len(self.metadata) < documents:
+            self.postings.compact(live_ids=self.metadata)
+
+    # Results to fetch from the index for top_k final ones, more when they are re-ranked afterwards
+    def candidate_count(self, top_k):
+        if self.vectors is None:
+            return top_k
+        return top_k * self.config["rerank_factor"]
+
+    # Order candidates by their exact distance to the query, read from the full-precision vectors on disk
+    def rerank(self, query_vector, ids, top_k):
+        if self.vectors is None or not ids:
+            return ids[:top_k]
+        distances = ((self.vectors.get(ids) - query_vector.reshape(1, -1)) ** 2).sum(axis=1)
+        return [ids[row] for row in np.argsort(distances, kind='stable')[:top_k]]
+
+    # Exact distances between the query and a fixed set of candidate ids
+    def search_candidates(self, query_vector, candidate_ids, top_k):
+        if len(candidate_ids) == 0:
+            return []
+
+        # Candidates are few enough to score exactly from the full-precision vectors (and flat PQ codes cannot be
+        # searched with an id selector)
+        if self.vectors is not None:
+            return self.rerank(query_vector, [int(id) for id in candidate_ids], top_k)
+
+        # Restrict the scan to the candidates (probing every IVF list so no candidate is missed)
+        selector = faiss.IDSelectorBatch(np.asarray(candidate_ids, dtype=np.int64))
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nlist)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        _, ids = self.index.search(query_vector, min(top_k, len(candidate_ids)), params=params)
+        return [id for id in ids[0] if id != -1]
+
+    # Approximate nearest neighbours of the query, re-ranked exactly when the collection keeps its vectors
+    def search_nearest(self, query_vector, top_k):
+        _, ids = self.index.search(query_vector, self.candidate_count(top_k))
+        return self.rerank(query_vector, [id for id in ids[0] if id != -1], top_k)
+
+    # Ranked ids for a query vector in the given mode
+    def search_ids(self, query_vector, top_k, token_ids, mode):
+        if mode == "keyword":
+            # Only documents containing every query token, ordered by vector distance
+            keyword_ids = self.postings.intersect(token_ids, KEYWORD_CANDIDATES, self.token_store.lengths)
+            ids = self.search_candidates(query_vector, keyword_ids, top_k)
+        elif mode == "hybrid":
+            # Score the lexical candidates with their vectors and fuse with the ANN results
+            ann_ids = self.search_nearest(query_vector, top_k)
+            lexical_ids = self.postings.union(token_ids, HYBRID_CANDIDATES, len(self.metadata), self.token_store.lengths)
+            lexical_ids = self.search_candidates(query_vector, lexical_ids, top_k)
+            ids = fuse_rankings([ann_ids, lexical_ids], top_k)
+        else:
+            # Search the index
+            ids = self.search_nearest(query_vector, top_k)
+        return ids
+
+    # Numeric statistics of this collection
+    def stats(self):
+        stats = {"documents": len(self.metadata), "vectors": self.index.ntotal, "aliases": len(self.aliases),
+                 "postings_bytes": self.postings.nbytes(), "token_documents": len(self.token_store),
+                 "token_bytes": self.token_store.nbytes(), "memory_bytes": self.nbytes, "code_bytes": self.code_bytes(),
+                 "collection_model_version": self.model_version if self.model_version is not None else -1}
+        stats.update(self.ingest_stats)
+
+        # Where the vectors live: compressed codes in memory, full precision on disk
+        if self.vectors is not None:
+            stats.update(rerank_factor=self.config["rerank_factor"], rerank_vectors=len(self.vectors),
+                         rerank_disk_bytes=self.vectors.disk_bytes())
+
+        # Tuned operating point, one stat per search parameter
+        if self.search_params is not None:
+            stats.update(search_k=self.search_params["k"], search_target_recall=self.search_params["target_recall"],
+                         search_recall=self.search_params["recall"], search_latency_ms=self.search_params["latency_ms"])
+            for param in filter(None, self.search_params["params"].split(",")):
+                name, value = param.split("=")
+                stats[f"search_param_{name}"] = float(value)
+        return stats
+
+
+# Merge ranked id lists with reciprocal rank fusion
+def fuse_rankings(rankings, top_k):
+    scores = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking):
+            scores[id] = scores.get(id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:top_k]
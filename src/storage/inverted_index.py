@@ -0,0 +1,381 @@
+import numpy as np
+
+# Number of pending ids a posting list may buffer before they are appended to the compressed block, and of deleted
+# ids it may hold before it is rewritten without them
+PENDING_LIMIT = 64
+
+# BM25 term frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Varint-encode non-negative integers, returning the bytes and the byte length of each value
+def encode_varints(values):
+    values = np.asarray(values, dtype=np.uint64)
+
+    # 7 bits per byte, so every value needs between 1 and 10 bytes
+    lengths = np.ones(values.size, dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= (np.uint64(1) << np.uint64(shift))
+    starts = np.cumsum(lengths) - lengths
+
+    # Emit byte k of every value that is long enough, high bit set on every byte except the last
+    out = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max(initial=0))):
+        has_byte = lengths > k
+        chunk = (values[has_byte] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[has_byte] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has_byte] + k] = (chunk | more).astype(np.uint8)
+    return out, lengths
+
+# Encode a list of document ids as a delta + varint compressed posting list
+def encode_postings(doc_ids):
+    return encode_run(doc_ids)
+
+# Encode document ids as a sorted run to append to a posting list whose last id is previous. Only the first delta can
+# be negative, it wraps around in uint64 and back in the int64 sum that decodes it
+def encode_run(doc_ids, previous=0):
+    # Sort and deduplicate so that every delta after the first is strictly positive
+    doc_ids = np.unique(np.asarray(doc_ids, dtype=np.int64))
+    if doc_ids.size == 0:
+        return b""
+
+    # Gaps between consecutive ids (the first one from previous)
+    out, _ = encode_varints(np.diff(doc_ids, prepend=previous))
+    return out.tobytes()
+
+# Decode a buffer of varints back into an array of values
+def decode_varints(data):
+    if not data:
+        return np.empty(0, dtype=np.int64)
+
+    # Every byte with the high bit clear terminates a value
+    raw = np.frombuffer(data, dtype=np.uint8)
+    payload = (raw & 0x7F).astype(np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    # Position of each byte inside its value gives the shift to apply
+    value_of_byte = np.repeat(np.arange(ends.size), ends - starts + 1)
+    shifts = 7 * (np.arange(raw.size) - starts[value_of_byte])
+
+    # Sum shifted payloads per value
+    return np.add.reduceat(payload << shifts, starts)
+
+# Decode a compressed posting list back into its document ids, sorted unless runs were appended to it
+def decode_postings(data):
+    # Undo the delta encoding
+    return np.cumsum(decode_varints(data))
+
+# Inverse document frequency of a token found in df of documents
+def idf(df, documents):
+    return np.log1p((documents - df + 0.5) / (df + 0.5))
+
+# BM25 with every matched token counted once (the postings keep no term frequencies): the IDF of the tokens a
+# document matches, damped for documents longer than the average candidate
+def bm25(weights, lengths):
+    lengths = np.asarray(lengths, dtype=np.float64)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1))
+    return weights * (BM25_K1 + 1) / (1 + norm)
+
+# The max_candidates best scoring ids (all of them if that many or fewer), ties to the lower id. lengths maps ids to
+# document lengths for the BM25 normalisation
+def top_candidates(doc_ids, weights, max_candidates, lengths=None):
+    if max_candidates is None or doc_ids.size <= max_candidates:
+        return doc_ids
+    scores = weights if lengths is None else bm25(weights, lengths(doc_ids))
+    return np.sort(doc_ids[np.argsort(-scores, kind='stable')[:max_candidates]])
+
+
+# Token id -> document ids, kept compressed in memory and on disk
+class InvertedIndex:
+    def __init__(self):
+        # Compressed posting lists, each a sorted head followed by the sorted runs appended since
+        self.postings = {}
+
+        # Recently added ids per token that have not been compressed yet
+        self.pending = {}
+
+        # Deleted ids per token that are still in its compressed list
+        self.removed = {}
+
+        # Byte length of the sorted head of lists that runs were appended to
+        self.heads = {}
+
+        # Last id encoded in each list, which the next run is delta-encoded from
+        self.tails = {}
+
+    # Register a document under every distinct token it contains
+    def add(self, doc_id, token_ids):
+        doc_id = int(doc_id)
+        for token_id in set(int(token) for token in token_ids):
+            # A document deleted and stored again may still be in the compressed list
+            removed = self.removed.get(token_id)
+            if removed and doc_id in removed:
+                removed.discard(doc_id)
+                continue
+
+            pending = self.pending.setdefault(token_id, [])
+            pending.append(doc_id)
+            if len(pending) >= PENDING_LIMIT:
+                self._append_pending(token_id)
+
+    # Unregister a deleted document from the tokens it contained
+    def remove(self, doc_id, token_ids):
+        doc_id = int(doc_id)
+        for token_id in set(int(token) for token in token_ids):
+            pending = self.pending.get(token_id)
+            if pending and doc_id in pending:
+                pending.remove(doc_id)
+                if not pending:
+                    del self.pending[token_id]
+                continue
+            if token_id not in self.postings:
+                continue
+
+            # Rewriting a long list for every delete would be slow, gather them first
+            removed = self.removed.setdefault(token_id, set())
+            removed.add(doc_id)
+            if len(removed) >= PENDING_LIMIT:
+                self._rewrite_token(token_id)
+
+    # Last id encoded in a token's list (decoded once for lists read from disk)
+    def _tail(self, token_id):
+        if token_id not in self.tails:
+            doc_ids = decode_postings(self.postings.get(token_id, b""))
+            self.tails[token_id] = int(doc_ids[-1]) if doc_ids.size else 0
+        return self.tails[token_id]
+
+    # Append a token's pending ids to its compressed list as a new run, without touching the bytes already there.
+    # The runs are merged back into one sorted list once they outgrow its head, so every id is re-encoded a bounded
+    # number of times however long the list gets
+    def _append_pending(self, token_id):
+        pending = self.pending.pop(token_id, None)
+        if not pending:
+            return
+        data = self.postings.get(token_id)
+        if not data:
+            data = bytearray(encode_run(pending))
+        else:
+            if not isinstance(data, bytearray):
+                data = bytearray(data)
+            self.heads.setdefault(token_id, len(data))
+            data += encode_run(pending, self._tail(token_id))
+        self.postings[token_id] = data
+        self.tails[token_id] = max(pending)
+
+        if token_id in self.heads and len(data) > 2 * self.heads[token_id]:
+            self._rewrite_token(token_id)
+
+    # Re-encode a token's list as one sorted run with its pending ids in and its deleted ones (and any not in
+    # live_ids) out
+    def _rewrite_token(self, token_id, live_ids=None):
+        doc_ids = self.lookup(token_id)
+        if live_ids is not None:
+            doc_ids = doc_ids[np.isin(doc_ids, live_ids)]
+        self.pending.pop(token_id, None)
+        self.removed.pop(token_id, None)
+        self.heads.pop(token_id, None)
+
+        if doc_ids.size:
+            self.postings[token_id] = encode_postings(doc_ids)
+            self.tails[token_id] = int(doc_ids[-1])
+        else:
+            self.postings.pop(token_id, None)
+            self.tails.pop(token_id, None)
+
+    # Register many documents at once from a flat token array and per-document offsets
+    def add_many(self, doc_ids, token_ids, offsets):
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        if token_ids.size == 0:
+            return
+
+        # One (token, document) key per token occurrence, documents fit in 31 bits
+        lengths = np.diff(np.append(offsets, token_ids.size))
+        keys = (token_ids << 31) | np.repeat(doc_ids, lengths)
+
+        # Fold in whatever these tokens already hold
+        existing = []
+        for token_id in np.unique(token_ids).tolist():
+            if token_id in self.postings or token_id in self.pending:
+                existing.append((token_id << 31) | self.lookup(token_id))
+                self.pending.pop(token_id, None)
+                self.removed.pop(token_id, None)
+                self.heads.pop(token_id, None)
+        keys = np.unique(np.concatenate([keys] + existing))
+
+        # Sorted keys are grouped by token, delta-encode within each group
+        tokens, starts = np.unique(keys >> 31, return_index=True)
+        doc_ids = keys & 0x7FFFFFFF
+        deltas = np.diff(doc_ids, prepend=0)
+        deltas[starts] = doc_ids[starts]
+
+        # Encode every group in one pass, then slice out each token's bytes
+        out, value_lengths = encode_varints(deltas)
+        byte_ends = np.cumsum(value_lengths)
+        byte_starts = np.append(0, byte_ends[starts[1:] - 1])
+        byte_stops = np.append(byte_starts[1:], out.size)
+        last_ids = doc_ids[np.append(starts[1:], keys.size) - 1]
+        data = out.tobytes()
+        for token_id, start, stop, last_id in zip(tokens.tolist(), byte_starts.tolist(), byte_stops.tolist(),
+                                                  last_ids.tolist()):
+            self.postings[token_id] = data[start:stop]
+            self.tails[token_id] = last_id
+
+    # Compress every pending list and drop gathered deletions, optionally pruning ids that are not in live_ids
+    def compact(self, live_ids=None):
+        if live_ids is not None:
+            live_ids = np.asarray(list(live_ids), dtype=np.int64)
+            for token_id in set(self.postings) | set(self.pending):
+                self._rewrite_token(token_id, live_ids)
+            return
+        for token_id in list(self.pending):
+            self._append_pending(token_id)
+        for token_id in list(self.removed):
+            self._rewrite_token(token_id)
+
+    # Sorted document ids for a token
+    def lookup(self, token_id):
+        doc_ids = decode_postings(self.postings.get(token_id, b""))
+        if token_id in self.heads:
+            doc_ids = np.unique(doc_ids)
+        pending = self.pending.get(token_id)
+        if pending:
+            doc_ids = np.union1d(doc_ids, np.asarray(pending, dtype=np.int64))
+        removed = self.removed.get(token_id)
+        if removed:
+            doc_ids = doc_ids[~np.isin(doc_ids, list(removed))]
+        return doc_ids
+
+    # Number of documents containing a token
+    def document_frequency(self, token_id):
+        return self.lookup(token_id).size
+
+    # Posting lists of the distinct query tokens, rarest first
+    def lookup_tokens(self, token_ids):
+        return sorted((self.lookup(token_id) for token_id in set(int(token) for token in token_ids)), key=len)
+
+    # Documents containing every query token (keyword-constrained search). Past max_candidates the shortest ones are
+    # kept, which is how BM25 orders documents that each match every token once
+    def intersect(self, token_ids, max_candidates=None, lengths=None):
+        # Start from the rarest token so the running set shrinks as fast as possible
+        postings = self.lookup_tokens(token_ids)
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+
+        doc_ids = postings[0]
+        for posting in postings[1:]:
+            if doc_ids.size == 0:
+                break
+            doc_ids = np.intersect1d(doc_ids, posting, assume_unique=True)
+        return top_candidates(doc_ids, np.ones(doc_ids.size), max_candidates, lengths)
+
+    # Documents containing any of the query tokens, the max_candidates best by BM25 (documents is the collection size
+    # the IDF is taken against). Common tokens are skipped once the rarer ones matched enough documents
+    def union(self, token_ids, max_candidates, documents=None, lengths=None):
+        postings = self.lookup_tokens(token_ids)
+        documents = max([documents or 0] + [posting.size for posting in postings])
+
+        # Rare tokens are the most selective, so add their postings first
+        doc_ids, weights = [], []
+        matched = np.empty(0, dtype=np.int64)
+        for posting in postings:
+            if matched.size >= max_candidates:
+                break
+            matched = np.union1d(matched, posting)
+            doc_ids.append(posting)
+            weights.append(np.full(posting.size, idf(posting.size, documents)))
+        if not doc_ids:
+            return matched
+
+        # Sum the IDF of the tokens every document matched
+        matched, positions = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        weights = np.bincount(positions, weights=np.concatenate(weights))
+        return top_candidates(matched, weights, max_candidates, lengths)
+
+    # Size of the compressed posting lists in bytes
+    def nbytes(self):
+        return sum(len(data) for data in self.postings.values())
+
+    # Plain compressed form for persistence, pending ids and deletions folded into copies so searches can keep
+    # reading meanwhile
+    def to_dict(self):
+        postings = {token_id: bytes(data) for token_id, data in self.postings.items()}
+        heads = dict(self.heads)
+        for token_id, pending in self.pending.items():
+            if postings.get(token_id):
+                heads.setdefault(token_id, len(postings[token_id]))
+                postings[token_id] += encode_run(pending, self._tail(token_id))
+            else:
+                postings[token_id] = encode_run(pending)
+        for token_id in self.removed:
+            postings[token_id] = encode_postings(self.lookup(token_id))
+            heads.pop(token_id, None)
+        return {"postings": postings, "heads": heads}
+
+    @classmethod
+    def from_dict(cls, state):
+        inverted_index = cls()
+        inverted_index.postings = state["postings"]
+        inverted_index.heads = dict(state.get("heads", {}))
+        return inverted_index
+
+
+# Document id -> its token ids in order, varint packed (1-3 bytes per token for a BPE vocabulary)
+class TokenStore:
+    def __init__(self):
+        self.tokens = {}
+
+    # Store a document's tokens (negative ids clamp to 0, like generate_embeddings does)
+    def add(self, doc_id, token_ids):
+        token_ids = np.maximum(np.asarray(token_ids, dtype=np.int64), 0)
+        out, _ = encode_varints(token_ids)
+        self.tokens[int(doc_id)] = out.tobytes()
+
+    # Store many documents at once from a flat token array and per-document offsets
+    def add_many(self, doc_ids, token_ids, offsets):
+        token_ids = np.maximum(np.asarray(token_ids, dtype=np.int64), 0)
+        offsets = np.asarray(offsets, dtype=np.int64)
+
+        # Encode everything in one pass, then slice out each document's bytes
+        out, value_lengths = encode_varints(token_ids)
+        byte_offsets = np.append(0, np.cumsum(value_lengths))
+        starts = byte_offsets[offsets]
+        stops = byte_offsets[np.append(offsets[1:], token_ids.size)]
+        data = out.tobytes()
+        for doc_id, start, stop in zip(np.asarray(doc_ids).tolist(), starts.tolist(), stops.tolist()):
+            self.tokens[doc_id] = data[start:stop]
+
+    def remove(self, doc_id):
+        self.tokens.pop(int(doc_id), None)
+
+    # Packed size of documents' tokens, standing in for their token counts
+    def lengths(self, doc_ids):
+        return np.array([len(self.tokens.get(doc_id, b"")) for doc_id in np.asarray(doc_ids).tolist()])
+
+    # Token ids of a document, None if it was stored without them
+    def get(self, doc_id):
+        data = self.tokens.get(int(doc_id))
+        if data is None:
+            return None
+        return decode_varints(data)
+
+    def __contains__(self, doc_id):
+        return int(doc_id) in self.tokens
+
+    def __len__(self):
+        return len(self.tokens)
+
+    # Size of the packed tokens in bytes
+    def nbytes(self):
+        return sum(len(data) for data in self.tokens.values())
+
+    # Plain form for persistence
+    def to_dict(self):
+        return {"tokens": self.tokens}
+
+    @classmethod
+    def from_dict(cls, state):
+        token_store = cls()
+        token_store.tokens = state["tokens"]
+        return token_store
@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import struct
+import threading
+import time
+import traceback
+
+import faiss
+import numpy as np
+
+# Record header: sequence number, unix timestamp, payload length
+HEADER = struct.Struct("<QdI")
+
+# Files that make up a storage snapshot
+SNAPSHOT_FILES = ("collection.json", "metadata.pkl", "postings.pkl", "dedup.pkl", "tokens.pkl", "model.json", "search_params.json",
+                  "vectors.pkl", "vectors.f32", "faiss.index")
+SNAPSHOT_STATE = "snapshot.json"
+MODEL_STATE = "model.json"
+SEARCH_PARAMS = "search_params.json"
+
+# Feed segments, named by the offset of their first byte and the sequence before it (a lone changes.log from before
+# segments is read as the first one)
+FEED_FILE = "changes.log"
+SEGMENT_NAME = re.compile(r"^changes\.(\d{20})\.(\d{20})\.log$")
+
+# Size at which the active feed segment is closed and a new one started
+SEGMENT_BYTES = int(os.getenv("POLYDB_FEED_SEGMENT_BYTES", 64 * 1024 ** 2))
+
+# Seconds a full segment is kept after its last write even when every snapshot covers it, so followers that are a
+# little behind can still read it. Followers further behind copy the leader's snapshots again
+FEED_RETENTION = float(os.getenv("POLYDB_FEED_RETENTION", 3600))
+
+# How often a follower polls the leader's feed when it is caught up, and the longest wait between retries after errors
+POLL_INTERVAL = 0.5
+MAX_RETRY_INTERVAL = 30.0
+
+
+# Read the sequence number and feed offset a snapshot directory was persisted at
+def read_snapshot_state(directory):
+    path = os.path.join(directory, SNAPSHOT_STATE)
+    if not os.path.exists(path):
+        return {"sequence": 0, "offset": 0}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# Atomically record the sequence number and feed offset of a snapshot
+def write_snapshot_state(directory, sequence, offset):
+    path = os.path.join(directory, SNAPSHOT_STATE)
+    with open(path + ".tmp", 'w') as f:
+        json.dump({"sequence": sequence, "offset": offset}, f)
+    os.replace(path + ".tmp", path)
+
+# Short content hash of an embedding matrix (shape plus a strided sample of rows)
+def matrix_fingerprint(matrix):
+    array = np.asarray(matrix, dtype=np.float32)
+    digest = hashlib.sha256(str(array.shape).encode('ascii'))
+    digest.update(np.ascontiguousarray(array[::max(1, array.shape[0] // 4096)]).tobytes())
+    return digest.hexdigest()[:16]
+
+# Read which embedding matrix the index in a directory was built with, None if unknown
+def read_model_state(directory, file_name=MODEL_STATE):
+    path = os.path.join(directory, file_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# Atomically record the source and fingerprint of the matrix the index was built with
+def write_model_state(directory, source, fingerprint, file_name=MODEL_STATE):
+    path = os.path.join(directory, file_name)
+    with open(path + ".tmp", 'w') as f:
+        json.dump({"source": source, "fingerprint": fingerprint}, f)
+    os.replace(path + ".tmp", path)
+
+# Read the tuned search-time parameters of the index in a directory, None if it was never tuned
+def read_search_params(directory):
+    path = os.path.join(directory, SEARCH_PARAMS)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# Atomically record tuned search-time parameters and the operating point they were measured at
+def write_search_params(directory, search_params):
+    path = os.path.join(directory, SEARCH_PARAMS)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(search_params, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+# Index that owns the search-time parameters (faiss.ParameterSpace does not look through IndexIDMap)
+def search_parameter_index(index):
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+# Set tuned parameters such as "nprobe=16,quantizer_efSearch=64" on an index
+def apply_search_params(index, search_params):
+    if search_params and search_params["params"]:
+        faiss.ParameterSpace().set_index_parameters(search_parameter_index(index), search_params["params"])
+
+# Segment files of a storage directory's feed as (base offset, sequence before it, path), oldest first. A segment is
+# named by the feed offset of its first byte and the sequence of the record before it, so offsets stay valid across
+# segments and the position survives even when every older segment is gone
+def feed_segments(directory):
+    segments = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        match = SEGMENT_NAME.match(name)
+        if match:
+            segments.append((int(match.group(1)), int(match.group(2)), os.path.join(directory, name)))
+        elif name == FEED_FILE:
+            segments.append((0, 0, os.path.join(directory, name)))
+    return sorted(segments)
+
+def segment_path(directory, base, sequence):
+    return os.path.join(directory, f"changes.{base:020d}.{sequence:020d}.log")
+
+# Remove every segment of a directory's feed
+def remove_feed(directory):
+    for _, _, path in feed_segments(directory):
+        os.remove(path)
+
+# The records a reader asked for were dropped from the feed, it has to start again from a snapshot
+class FeedTruncated(Exception):
+    pass
+
+# Iterate over complete records in a feed starting at a byte offset
+def read_changes(directory, offset=0):
+    segments = feed_segments(directory)
+    if not segments:
+        return
+    if offset < segments[0][0]:
+        raise FeedTruncated(f"Feed offset {offset} was truncated, the feed starts at {segments[0][0]}")
+
+    for position, (base, _, path) in enumerate(segments):
+        end = segments[position + 1][0] if position + 1 < len(segments) else None
+        if end is not None and offset >= end:
+            continue
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            raise FeedTruncated(f"Feed segment {path} was truncated while it was read")
+        with f:
+            f.seek(offset - base)
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                sequence, timestamp, length = HEADER.unpack(header)
+                payload = f.read(length)
+
+                # A partially written record is picked up on the next read
+                if len(payload) < length:
+                    return
+                offset += HEADER.size + length
+                op, change = pickle.loads(payload)
+                yield sequence, timestamp, op, change, offset
+
+        # Later segments start where this one ended, anything short of that is still being written
+        if end is None or offset < end:
+            return
+
+
+# Append-only, ordered log of storage changes, split into segments so the part every snapshot already covers can
+# be dropped
+class ChangeFeed:
+    def __init__(self, directory, sequence=0, offset=0):
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Recover the position of the last complete record of the active segment (a new feed continues from the
+        # snapshot position, so sequence numbers never go back)
+        segments = feed_segments(directory)
+        if segments:
+            base, self.sequence, path = segments[-1]
+        else:
+            base, self.sequence = offset, sequence
+            path = segment_path(directory, base, self.sequence)
+            open(path, 'ab').close()
+        self.offset = base
+        for sequence, _, _, _, offset in read_changes(directory, base):
+            self.sequence, self.offset = sequence, offset
+        self.base, self.path = base, path
+
+        # Drop a torn record left behind by a crash
+        if os.path.getsize(path) > self.offset - base:
+            with open(path, 'r+b') as f:
+                f.truncate(self.offset - base)
+
+    # Publish a change and return its sequence number and the feed offset after it
+    def append(self, op, change):
+        payload = pickle.dumps((op, change), protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            # Start a new segment once the active one is full
+            if self.offset - self.base >= SEGMENT_BYTES:
+                self.base, self.path = self.offset, segment_path(self.directory, self.offset, self.sequence)
+
+            self.sequence += 1
+            with open(self.path, 'ab') as f:
+                f.write(HEADER.pack(self.sequence, time.time(), len(payload)))
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self.offset += HEADER.size + len(payload)
+            return self.sequence, self.offset
+
+    # Sequence and offset of the last record
+    def position(self):
+        with self.lock:
+            return self.sequence, self.offset
+
+    # Position (sequence, offset) where the full segments last written more than retention seconds ago end, None if
+    # there are none
+    def expired_position(self, retention=FEED_RETENTION):
+        with self.lock:
+            active_base = self.base
+        segments = feed_segments(self.directory)
+        position = None
+        for (base, _, path), (end, sequence, _) in zip(segments, segments[1:]):
+            if base >= active_base or time.time() - os.path.getmtime(path) < retention:
+                break
+            position = (sequence, end)
+        return position
+
+    # Delete the full segments that end at or before an offset every snapshot has reached, returning the bytes freed
+    def truncate(self, offset):
+        with self.lock:
+            active_base = self.base
+        segments = feed_segments(self.directory)
+        dropped = 0
+        for (base, _, path), (end, _, _) in zip(segments, segments[1:]):
+            if base >= active_base or end > offset:
+                break
+            dropped += os.path.getsize(path)
+            os.remove(path)
+        return dropped
+
+    # Size of the feed on disk
+    def stats(self):
+        segments = feed_segments(self.directory)
+        return {"feed_segments": len(segments), "feed_bytes": sum(os.path.getsize(path) for _, _, path in segments),
+                "feed_first_offset": segments[0][0] if segments else 0}
+
+
+# Copy a consistent snapshot of the leader's storage into a local directory
+def bootstrap_from_snapshot(leader_directory, local_directory):
+    os.makedirs(local_directory, exist_ok=True)
+
+    # The leader writes the state file last, so the data files are at least as new as it says
+    state = read_snapshot_state(leader_directory)
+    for name in SNAPSHOT_FILES:
+        source = os.path.join(leader_directory, name)
+        if os.path.exists(source):
+            shutil.copyfile(source, os.path.join(local_directory, name + ".tmp"))
+            os.replace(os.path.join(local_directory, name + ".tmp"), os.path.join(local_directory, name))
+
+    write_snapshot_state(local_directory, state["sequence"], state["offset"])
+    return state
+
+
+# Tails the leader's change feed and applies every change to the local copy. resync is called when the feed was
+# truncated past this follower's position, it returns the position to continue from
+class Follower(threading.Thread):
+    def __init__(self, leader_directory, sequence, offset, apply_changes, resync):
+        super().__init__(daemon=True)
+        self.leader_directory = leader_directory
+        self.sequence = sequence
+        self.offset = offset
+        self.apply_changes = apply_changes
+        self.resync = resync
+
+        # Failed polls in total, and whether the last one failed
+        self.errors = 0
+        self.failing = False
+        self.resyncs = 0
+
+    def run(self):
+        delay = POLL_INTERVAL
+        while True:
+            try:
+                applied = self.poll()
+                self.failing, delay = False, POLL_INTERVAL
+            except FeedTruncated as e:
+                print(f"Replication fell behind the leader's feed ({e}), resyncing from its snapshots")
+                self.sequence, self.offset = self.resync()
+                self.resyncs += 1
+                continue
+            except Exception:
+                # A bad record or an I/O error must not stop replication, retry the same position with backoff
+                self.errors += 1
+                self.failing = True
+                print("Replication failed, retrying in %.1fs:\n%s" % (delay, traceback.format_exc()))
+                time.sleep(delay)
+                delay = min(2 * delay, MAX_RETRY_INTERVAL)
+                continue
+
+            # Caught up, wait for the leader to publish more
+            if not applied:
+                time.sleep(POLL_INTERVAL)
+
+    # Apply everything that is available right now, returning whether there was anything
+    def poll(self):
+        batch = []
+        offset = self.offset
+        for sequence, _, op, change, offset in read_changes(self.leader_directory, self.offset):
+            if sequence > self.sequence:
+                batch.append((sequence, op, change))
+
+        if batch:
+            self.apply_changes(batch, offset)
+            self.sequence = batch[-1][0]
+        self.offset = offset
+        return bool(batch)
+
+    # Replication lag in changes and seconds, measured from the unread part of the feed, and replication health
+    def lag(self):
+        leader_sequence, oldest_timestamp = self.sequence, None
+        offset = self.offset
+        for base, _, path in feed_segments(self.leader_directory):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                if offset > base:
+                    f.seek(offset - base)
+                while True:
+                    header = f.read(HEADER.size)
+                    if len(header) < HEADER.size:
+                        break
+                    sequence, timestamp, length = HEADER.unpack(header)
+                    if sequence > self.sequence:
+                        leader_sequence = sequence
+                        if oldest_timestamp is None:
+                            oldest_timestamp = timestamp
+                    f.seek(length, os.SEEK_CUR)
+
+        return {
+            "applied_sequence": self.sequence,
+            "leader_sequence": leader_sequence,
+            "lag_sequences": leader_sequence - self.sequence,
+            "lag_seconds": 0.0 if oldest_timestamp is None else max(0.0, time.time() - oldest_timestamp),
+            "replication_errors": self.errors,
+            "replication_failing": int(self.failing),
+            "replication_resyncs": self.resyncs,
+        }
@@ -1,10 +1,16 @@
 import faiss
-import pickle
 import os
+import re
+import base64
+import time
 import numpy as np
 import sys
 import torch
 import uuid
+import threading
+import traceback
+import contextlib
+from collections import OrderedDict
 
 # Define base path
 BASE_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -12,34 +18,470 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'polyvec')))
 sys.path.append(BASE_DIRECTORY)
 
-from polyvec.train.embeddings import generate_embeddings
+from polyvec.train import embeddings as embedding_model
+from data.bpe import load_merges, encode
+from storage.collection import Collection, collection_exists, content_hash
+from storage.replication import ChangeFeed, Follower, FeedTruncated, bootstrap_from_snapshot, read_snapshot_state, \
+    write_snapshot_state, read_changes, feed_segments, matrix_fingerprint, read_model_state, write_model_state
 
-# Paths
-INDEX_PATH = BASE_DIRECTORY + "/artifacts/faiss.index"
-METADATA_PATH = BASE_DIRECTORY + "/artifacts/metadata.pkl"
+# Storage directory, overridable so several processes can keep separate copies on one box
+ARTIFACTS_DIRECTORY = os.getenv("POLYDB_ARTIFACTS", BASE_DIRECTORY + "/artifacts")
 
-# Initialize index and metadata
-if os.path.exists(INDEX_PATH):
-    index = faiss.read_index(INDEX_PATH)
-else:
-    # IndexIDMap so that we can store UUID mappings
-    DIMENSION = 300
-    index = faiss.IndexIDMap(faiss.IndexFlatL2(DIMENSION))
-
-# Initialize metadata
-if os.path.exists(METADATA_PATH):
-    with open(METADATA_PATH, 'rb') as f:
-        metadata = pickle.load(f)
+# When set, this process is a read-only follower of the leader that owns this directory
+LEADER_DIRECTORY = os.getenv("POLYDB_LEADER_ARTIFACTS")
+IS_FOLLOWER = LEADER_DIRECTORY is not None
+
+# The default collection lives at the top of the storage directory, named ones in their own subdirectories
+DEFAULT_COLLECTION = "default"
+COLLECTIONS_DIRECTORY = "collections"
+COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Estimated bytes of loaded collections to keep in memory before unloading the least recently used
+COLLECTION_MEMORY = int(os.getenv("POLYDB_COLLECTION_MEMORY", 4 * 1024 ** 3))
+
+# Matrix the server embeds with, the one ReloadModel last swapped in
+SERVED_MODEL_STATE = "served_model.json"
+
+# Local copy of the served matrix, named by its fingerprint, so a restart can serve it while its source is unreachable
+SERVED_MATRIX = "served_model.{}.pt"
+SERVED_MATRIX_NAME = re.compile(r"^served_model\.[0-9a-f]+\.pt$")
+
+# Index results fetched per requested result in collections that re-rank from full-precision vectors
+RERANK_FACTOR = 10
+
+# Search modes
+SEARCH_MODES = ("vector", "hybrid", "keyword")
+
+# Documents re-embedded per batch while rebuilding an index for a new model
+REBUILD_BATCH = 1000
+
+# Seconds between background flushes of changed collections to disk. Every change is in the fsynced feed before it
+# is acknowledged, so a crash only loses the flush, and the feed is replayed on the next load
+PERSIST_INTERVAL = float(os.getenv("POLYDB_PERSIST_INTERVAL", 1.0))
+
+# Followers start from a copy of the leader's latest snapshot
+if IS_FOLLOWER and not os.path.exists(os.path.join(ARTIFACTS_DIRECTORY, "snapshot.json")):
+    bootstrap_from_snapshot(LEADER_DIRECTORY, ARTIFACTS_DIRECTORY)
+os.makedirs(ARTIFACTS_DIRECTORY, exist_ok=True)
+
+# Path of the local copy of a served matrix
+def served_matrix_path(fingerprint):
+    return os.path.join(ARTIFACTS_DIRECTORY, SERVED_MATRIX.format(fingerprint))
+
+# Keep a copy of the served matrix next to the collections, replacing the copy of the previous one
+def save_served_matrix(matrix, fingerprint):
+    path = served_matrix_path(fingerprint)
+    if os.path.exists(path):
+        return
+    torch.save(matrix, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    for name in os.listdir(ARTIFACTS_DIRECTORY):
+        if SERVED_MATRIX_NAME.match(name) and os.path.join(ARTIFACTS_DIRECTORY, name) != path:
+            os.remove(os.path.join(ARTIFACTS_DIRECTORY, name))
+
+# The matrix a model state names, from its source or else from the local copy (None if neither has it)
+def load_served_matrix(state):
+    matrix = embedding_model.load_embedding_matrix(state["source"])
+    if matrix is not None and matrix_fingerprint(matrix) == state["fingerprint"]:
+        return matrix
+    path = served_matrix_path(state["fingerprint"])
+    if os.path.exists(path):
+        return embedding_model.load_embedding_matrix(path)
+    return None
+
+# Serve the matrix of the last reload (or the one the default collection was built with), not whatever the
+# default source holds now
+model_state = read_model_state(ARTIFACTS_DIRECTORY, SERVED_MODEL_STATE) or read_model_state(ARTIFACTS_DIRECTORY)
+if model_state is not None and (embedding_model.embedding_matrix is None or
+                                matrix_fingerprint(embedding_model.embedding_matrix) != model_state["fingerprint"]):
+    matrix = load_served_matrix(model_state)
+    if matrix is not None:
+        embedding_model.set_embedding_matrix(matrix)
+    elif embedding_model.embedding_matrix is not None:
+        print("Warning: the stored collections were built with a different embedding matrix, call ReloadModel to re-embed them")
+
+# Nothing to embed with. A stand-in matrix would get a new fingerprint on every start and have every collection
+# rebuilt from it
+if embedding_model.embedding_matrix is None:
+    source = model_state["source"] if model_state else embedding_model.DEFAULT_SOURCE
+    raise RuntimeError(f"Unable to load embedding matrix {source}, and {ARTIFACTS_DIRECTORY} holds no copy of it")
+served_model = {"source": model_state["source"] if model_state else embedding_model.DEFAULT_SOURCE,
+                "fingerprint": matrix_fingerprint(embedding_model.embedding_matrix)}
+save_served_matrix(embedding_model.embedding_matrix, served_model["fingerprint"])
+
+# Loaded collections, least recently used first
+collections = OrderedDict()
+
+# Guards the table of loaded collections (each collection has its own lock for its data)
+collections_lock = threading.Lock()
+
+# Collections being read from disk, by name, with an event set once the load is over either way
+loading = {}
+
+# Source of replacement ids for inserts whose UUID maps to a taken one
+id_generator = np.random.default_rng()
+
+# Collection cache counters
+collection_stats = {"collections_loaded_total": 0, "collections_evicted": 0}
+
+# Model reload progress
+reload_stats = {"reloads": 0, "reloading": 0, "reload_total": 0, "reload_rebuilt": 0, "reload_documents": 0,
+                "reload_backfilled": 0, "reload_failures": 0}
+reload_lock = threading.Lock()
+reload_thread = None
+
+# Directory of a collection, in this process or the leader
+def collection_directory(name, root=ARTIFACTS_DIRECTORY):
+    if name == DEFAULT_COLLECTION:
+        return root
+    return os.path.join(root, COLLECTIONS_DIRECTORY, name)
+
+# Names of every collection on disk
+def list_collections():
+    names = [DEFAULT_COLLECTION]
+    root = os.path.join(ARTIFACTS_DIRECTORY, COLLECTIONS_DIRECTORY)
+    if os.path.isdir(root):
+        names += sorted(name for name in os.listdir(root) if collection_exists(os.path.join(root, name)))
+    return names
+
+# Whether a collection exists, without creating it
+def stored_collection(name):
+    name = name or DEFAULT_COLLECTION
+    if not COLLECTION_NAME.match(name):
+        raise ValueError(f"Invalid collection name: {name}")
+    return name == DEFAULT_COLLECTION or name in collections or collection_exists(collection_directory(name))
+
+# Settings new collections start from
+def collection_defaults():
+    return {"dimension": int(embedding_model.embedding_matrix.shape[1]), "index_factory": "IDMap,Flat",
+            "rerank": False, "rerank_factor": RERANK_FACTOR}
+
+# Copy a collection from the leader's latest snapshot
+def bootstrap_collection(name):
+    leader_directory = collection_directory(name, LEADER_DIRECTORY)
+    if not collection_exists(leader_directory):
+        raise KeyError(f"Unknown collection: {name}")
+    bootstrap_from_snapshot(leader_directory, collection_directory(name))
+
+# Read a collection from disk and catch it up with the feed (a follower copies it from the leader first)
+def load_collection(name, create):
+    directory = collection_directory(name)
+    if IS_FOLLOWER and not os.path.exists(os.path.join(directory, "snapshot.json")):
+        bootstrap_collection(name)
+    if not collection_exists(directory) and not create and name != DEFAULT_COLLECTION:
+        raise KeyError(f"Unknown collection: {name}")
+
+    # The default collection always exists, it is the storage directory itself
+    collection = Collection(name, directory, collection_defaults(), create=create or name == DEFAULT_COLLECTION)
+    try:
+        replay_changes(collection)
+    except FeedTruncated:
+        if not IS_FOLLOWER:
+            raise
+
+        # The local copy is older than anything the leader still keeps in its feed, start over from its snapshot
+        bootstrap_collection(name)
+        collection = Collection(name, directory, collection_defaults())
+        replay_changes(collection)
+    return collection
+
+# Unload least recently used collections nobody holds until the rest fits the memory budget
+def evict_collections(keep):
+    total = sum(collection.nbytes for collection in collections.values())
+    for name, collection in list(collections.items()):
+        if total <= COLLECTION_MEMORY:
+            break
+        if name == keep or collection.users > 0 or collection.unpersisted:
+            continue
+
+        # Changes are flushed before a collection can go, so unloading only drops the memory
+        del collections[name]
+        total -= collection.nbytes
+        collection_stats["collections_evicted"] += 1
+
+# Hold a collection for the duration of a request, loading it on first use. access "write" also takes its lock,
+# "read" shares it with other readers (searches), None takes no lock
+@contextlib.contextmanager
+def open_collection(name=None, create=False, access="write"):
+    name = name or DEFAULT_COLLECTION
+    if not COLLECTION_NAME.match(name):
+        raise ValueError(f"Invalid collection name: {name}")
+    if create:
+        check_writable()
+
+    collection, loaded = hold_collection(name, create)
+    try:
+        # A collection built with another matrix is brought up to date before anyone uses it
+        if loaded:
+            prepare_collection(collection)
+        collection.ready.wait()
+        if access == "write":
+            with collection.lock:
+                yield collection
+        elif access == "read":
+            with collection.lock.shared():
+                yield collection
+        else:
+            yield collection
+    finally:
+        with collections_lock:
+            collection.users -= 1
+
+# Take a hold on a collection, loading it first if needed. Loading reads its files and replays the feed, so it runs
+# outside collections_lock, and other requests for the same collection wait for that load instead of starting their own
+def hold_collection(name, create):
+    while True:
+        with collections_lock:
+            collection = collections.get(name)
+            if collection is not None:
+                collections.move_to_end(name)
+                collection.users += 1
+                return collection, False
+            pending = loading.get(name)
+            if pending is None:
+                pending = loading[name] = threading.Event()
+                break
+
+        # Look again once the other load is over, if it failed this request tries on its own
+        pending.wait()
+
+    try:
+        while True:
+            collection = load_collection(name, create)
+            with collections_lock:
+                # A follower applies batches only to the collections in the table, so take in the part of the feed
+                # it went through while this one was loading
+                try:
+                    catch_up(collection)
+                except FeedTruncated:
+                    if not IS_FOLLOWER:
+                        raise
+                    # The follower resynced past this copy, read it again from the leader's snapshot
+                    continue
+                collections[name] = collection
+                collection_stats["collections_loaded_total"] += 1
+                collection.users += 1
+                evict_collections(keep=name)
+                return collection, True
+    finally:
+        with collections_lock:
+            del loading[name]
+        pending.set()
+
+# Pin the served matrix on a freshly loaded collection, re-embedding it first if it was built with another one
+def prepare_collection(collection):
+    try:
+        state = collection.model_state
+        if state is None or state["fingerprint"] == served_model["fingerprint"]:
+            collection.matrix, collection.model_version = embedding_model.model[1], embedding_model.model[0]
+
+            # Record the matrix new collections are embedded with, so a restart after a reload can tell
+            if state is None:
+                write_model_state(collection.directory, served_model["source"], served_model["fingerprint"])
+                collection.model_state = dict(served_model)
+        else:
+            version, matrix = embedding_model.model
+            rebuild_collection(collection, served_model["source"], matrix, version, served_model["fingerprint"])
+    finally:
+        collection.ready.set()
+
+# Writes are only accepted by the leader
+def check_writable():
+    if IS_FOLLOWER:
+        raise RuntimeError("storage is a read-only follower, send writes to the leader")
+
+# Record an applied change in the feed, the flusher writes the collection to disk later
+def publish(collection, op, change):
+    change["collection"] = collection.name
+    collection.sequence, collection.offset = feed.append(op, change)
+
+# Apply one change read from a feed to a collection
+def apply_change(collection, op, change):
+    if op == "insert":
+        collection.apply_insert(change["id"], change["text"], np.frombuffer(change["vector"], dtype=np.float32),
+                                change["token_ids"])
+    elif op == "delete":
+        collection.apply_delete(change["id"])
+    elif op == "alias":
+        collection.apply_alias(change["id"], change["target"])
+
+# Catch a freshly loaded collection up with the changes its files may be missing: the leader's own feed after a
+# crash before a flush, or the leader's feed on a follower
+def replay_changes(collection):
+    # Data files are written one by one, so they may be newer than the recorded position
+    collection.realign()
+    catch_up(collection)
+
+# Apply the changes to a collection that the feed holds past its position
+def catch_up(collection):
+    directory = LEADER_DIRECTORY if IS_FOLLOWER else ARTIFACTS_DIRECTORY
+    for sequence, _, op, change, offset in read_changes(directory, collection.offset):
+        if sequence > collection.sequence and change.get("collection", DEFAULT_COLLECTION) == collection.name:
+            apply_change(collection, op, change)
+        collection.sequence, collection.offset = sequence, offset
+
+# Apply a batch of changes read from the leader's feed to the collections that are loaded
+def apply_changes(batch, offset):
+    # Hold the loaded collections so none is unloaded (and read back from disk) while this batch is applied
+    with collections_lock:
+        loaded = dict(collections)
+        for collection in loaded.values():
+            collection.users += 1
+
+    # Unloaded collections replay their own changes when they are next loaded
+    try:
+        apply_batch(batch, offset, loaded)
+    finally:
+        with collections_lock:
+            for collection in loaded.values():
+                collection.users -= 1
+
+    # Every document is re-embedded from its tokens, so the reload can follow the rest of the batch
+    reloads = [change for _, op, change in batch if op == "reload"]
+    if reloads:
+        reload = reloads[-1]
+        if reload_thread is not None:
+            reload_thread.join()
+        try:
+            start_reload(reload["source"], load_matrix(reload["source"]))
+        except RuntimeError as e:
+            print(f"Model reload from the leader failed, serving the previous model: {e}")
+
+# Apply the changes of a batch to the loaded collections they belong to, the flusher writes them to disk later
+def apply_batch(batch, offset, loaded):
+    touched = set()
+    for sequence, op, change in batch:
+        if op == "reload":
+            continue
+        collection = loaded.get(change.get("collection", DEFAULT_COLLECTION))
+        if collection is None:
+            continue
+        with collection.lock:
+            if sequence > collection.sequence:
+                apply_change(collection, op, change)
+                collection.sequence = sequence
+                touched.add(collection)
+
+    for collection in touched:
+        with collection.lock:
+            collection.sequence, collection.offset = batch[-1][0], offset
+
+# The follower fell behind the part of the leader's feed that is kept. Loaded collections cannot catch up from it
+# any more, so they are dropped and read again (from the leader's snapshots) on next use
+def resync_follower():
+    with collections_lock:
+        stale = list(collections.values())
+        collections.clear()
+
+    # Wait out a flush in progress, the next load may copy over these files
+    for collection in stale:
+        with collection.lock:
+            collection.unpersisted = 0
+
+    # Continue from the oldest record the leader still has
+    segments = feed_segments(LEADER_DIRECTORY)
+    if not segments:
+        return follower.sequence, follower.offset
+    base, sequence, _ = segments[0]
+    return sequence, base
+
+# Write the collections with changes applied since their last flush
+def flush_collections():
+    with collections_lock:
+        changed = [collection for collection in collections.values() if collection.unpersisted]
+    for collection in changed:
+        with collection.lock.shared():
+            if collection.unpersisted:
+                collection.persist()
+
+# Drop the feed segments that are past their retention and that every collection's snapshot has moved beyond
+def checkpoint_feed():
+    expired = feed.expired_position()
+    if expired is None:
+        return
+    sequence, cutoff = expired
+
+    # Collections with changes in the dropped range, by the last sequence of each
+    changed = {}
+    for record_sequence, _, _, change, offset in read_changes(ARTIFACTS_DIRECTORY, feed_segments(ARTIFACTS_DIRECTORY)[0][0]):
+        if offset > cutoff:
+            break
+        changed[change.get("collection", DEFAULT_COLLECTION)] = record_sequence
+
+    for name in list_collections():
+        with collections_lock:
+            # A load in flight may still read the range about to be dropped, try again next round
+            if name in loading:
+                return
+            collection = collections.get(name)
+            if collection is None:
+                # A collection that is not loaded holds all its changes on disk, unless a crash lost its last flush
+                directory = collection_directory(name)
+                state = read_snapshot_state(directory)
+                if state["offset"] >= cutoff:
+                    continue
+                if changed.get(name, 0) <= state["sequence"]:
+                    write_snapshot_state(directory, sequence, cutoff)
+                    continue
+
+        # Loading replays what the files are missing. A loaded collection has applied every change of its own up to
+        # the head of the feed, so once it is flushed its files stand for any position up to there
+        with open_collection(name, access="read") as collection:
+            if collection.unpersisted:
+                collection.persist()
+            if collection.offset < cutoff:
+                collection.sequence, collection.offset = sequence, cutoff
+            if read_snapshot_state(collection.directory)["offset"] < cutoff:
+                write_snapshot_state(collection.directory, collection.sequence, collection.offset)
+
+    dropped = feed.truncate(cutoff)
+    print(f"Truncated {dropped} bytes of the change feed up to offset {cutoff}")
+
+# Flush changed collections and trim the feed in the background
+def maintain_storage():
+    while True:
+        time.sleep(PERSIST_INTERVAL)
+        try:
+            flush_collections()
+            if feed is not None:
+                checkpoint_feed()
+        except Exception:
+            print(f"Storage maintenance failed, retrying:\n{traceback.format_exc()}")
+
+# Start publishing (leader) or tailing (follower) the change feed
+snapshot_state = read_snapshot_state(ARTIFACTS_DIRECTORY)
+if IS_FOLLOWER:
+    feed = None
+    follower = Follower(LEADER_DIRECTORY, snapshot_state["sequence"], snapshot_state["offset"], apply_changes,
+                        resync_follower)
 else:
-    metadata = {}
+    feed = ChangeFeed(ARTIFACTS_DIRECTORY, snapshot_state["sequence"], snapshot_state["offset"])
+    follower = None
+
+# Replication position of this process
+def replication_stats():
+    if IS_FOLLOWER:
+        return follower.lag()
+    sequence, _ = feed.position()
+    stats = {"applied_sequence": sequence, "leader_sequence": sequence, "lag_sequences": 0, "lag_seconds": 0.0,
+             "replication_errors": 0, "replication_failing": 0, "replication_resyncs": 0}
+    stats.update(feed.stats())
+    return stats
 
-def persist():
-    # Save metadata
-    with open(METADATA_PATH, 'wb') as f:
-        pickle.dump(metadata, f)
-    
-    # Save index
-    faiss.write_index(index, INDEX_PATH)
+# Numeric storage statistics of a collection (the default one if none is given) and of the process
+def storage_stats(collection=None):
+    with open_collection(collection, access="read") as stored:
+        stats = stored.stats()
+    with collections_lock:
+        stats.update(collections_loaded=len(collections), collections_memory_bytes=sum(c.nbytes for c in collections.values()),
+                     collections_memory_budget=COLLECTION_MEMORY,
+                     collections_unpersisted=sum(c.unpersisted for c in collections.values()))
+    stats.update(collection_stats)
+    stats.update(reload_stats)
+    stats["model_version"] = embedding_model.model[0]
+    stats.update(replication_stats())
+    stats["follower"] = int(IS_FOLLOWER)
+    return stats
 
 # Convert UUID string to a positive integer (compatible with FAISS)
 def uuid_to_int(uuid_str):
@@ -48,36 +490,113 @@ def uuid_to_int(uuid_str):
         uuid_obj = uuid.UUID(uuid_str)
     else:
         uuid_obj = uuid_str
-        
+
     # Take the first 31 bits (to ensure it's a positive int within C long range)
     return uuid_obj.int & 0x7FFFFFFF
 
-# Insert new embeddings
-def insert_embedding(text, embeddings, uuid_str):
+# Random positive 31-bit id that is neither a document nor an alias in the collection
+def draw_free_id(stored):
+    while True:
+        candidate = int(id_generator.integers(1, 0x7FFFFFFF))
+        if candidate not in stored.metadata and candidate not in stored.aliases:
+            return candidate
+
+# Check whether a text is already stored, returning the existing id (or None)
+def find_duplicate(text, uuid_str, token_count=0, collection=None):
+    check_writable()
+    if not stored_collection(collection):
+        return None
+
+    with open_collection(collection) as stored:
+        return alias_duplicate(stored, text, uuid_to_int(uuid_str), token_count)
+
+# Alias an id to the stored document with the same text, returning that document's id (or None if there is none).
+# Called with the collection's write lock held
+def alias_duplicate(stored, text, uuid_int, token_count=0):
+    existing_id = stored.content_hashes.get(content_hash(text))
+    if existing_id is None or existing_id not in stored.metadata:
+        return None
+
+    # Count the work that was skipped
+    stored.ingest_stats["duplicates"] += 1
+    stored.ingest_stats["tokens_skipped"] += token_count
+
+    # Point the new id at the existing document, so it can be deleted by either (followers too), unless 31 bits of
+    # another UUID already name a different document
+    if uuid_int in stored.metadata:
+        stored.unpersisted += 1
+    elif uuid_int != existing_id and stored.aliases.get(uuid_int) != existing_id:
+        stored.apply_alias(uuid_int, existing_id)
+        publish(stored, "alias", {"id": uuid_int, "target": existing_id})
+    else:
+        stored.unpersisted += 1
+    return existing_id
+
+# Insert new embeddings (model_version is the version of the matrix they were pooled from, if known). Returns the
+# stored id and whether the text turned out to be stored already (the id is then the existing document's)
+def insert_embedding(text, embeddings, uuid_str, token_ids=None, model_version=None, collection=None):
+    check_writable()
+
     # Convert to correct dimension with mean pooling
     embeddings = embeddings.mean(axis=0)
 
     # Convert PyTorch tensor to NumPy array if needed
     if isinstance(embeddings, torch.Tensor):
         embeddings = embeddings.detach().cpu().numpy()
-    
+
     # Reshape for storage
-    embeddings = embeddings.astype(np.float32).reshape(1, -1)
+    embeddings = embeddings.astype(np.float32).reshape(-1)
 
     # Store embeddings in a persistent index using FAISS
     uuid_int = uuid_to_int(uuid_str)
-    
-    # Add to index
-    index.add_with_ids(embeddings, np.array([uuid_int], dtype=np.int64))
-    
-    # Store mapping
-    metadata[uuid_int] = text
-    
-    # Persist on disk
-    persist()
-
-
-def find_similar_embeddings(query_embedding, top_k=5):
+
+    # Collections are created on their first insert
+    with open_collection(collection, create=True) as stored:
+        # Another insert of the same text may have landed since find_duplicate looked
+        existing_id = alias_duplicate(stored, text, uuid_int)
+        if existing_id is not None:
+            return existing_id, True
+
+        # Distinct UUIDs can share their 31 bits, give the text a free id rather than drop it (apply_insert keeps a
+        # taken id as is, for replayed feeds). The caller deletes by the returned id then
+        if uuid_int in stored.metadata or uuid_int in stored.aliases:
+            uuid_int = draw_free_id(stored)
+
+        # The collection holds vectors of another matrix than these were pooled from, redo them with its own
+        if model_version is not None and model_version != stored.model_version and token_ids:
+            embeddings = pool_tokens(stored.matrix.numpy(), [token_ids])[0]
+
+        # Add to index and mappings
+        stored.apply_insert(uuid_int, text, embeddings, token_ids)
+        stored.ingest_stats["inserts"] += 1
+
+        # Publish to followers, the flusher persists it on disk
+        publish(stored, "insert", {"id": uuid_int, "text": text, "vector": embeddings.tobytes(), "token_ids": token_ids})
+
+    return uuid_int, False
+
+# Delete a document by the UUID it was inserted under, or by the index id an insert returned (or an alias of either)
+def delete_embedding(uuid_str, collection=None, doc_id=None):
+    check_writable()
+    uuid_int = uuid_to_int(uuid_str) if uuid_str else doc_id
+    if not stored_collection(collection):
+        return False
+
+    with open_collection(collection) as stored:
+        uuid_int = stored.aliases.get(uuid_int, uuid_int)
+        if uuid_int not in stored.metadata:
+            return False
+
+        # Remove and publish to followers, the flusher persists it on disk
+        stored.apply_delete(uuid_int)
+        publish(stored, "delete", {"id": uuid_int})
+
+    return True
+
+def find_similar_embeddings(query_embedding, top_k=5, token_ids=None, mode="vector", model_version=None, collection=None):
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+
     # Convert PyTorch tensor to NumPy array if needed
     if isinstance(query_embedding, torch.Tensor):
         query_embedding = query_embedding.detach().cpu().numpy()
@@ -87,9 +606,170 @@ def find_similar_embeddings(query_embedding, top_k=5):
 
     # Reshape for search
     query_vector = query_embedding.astype(np.float32).reshape(1, -1)
-    
-    # Search the index
-    _, ids = index.search(query_vector, top_k)
 
-    # Return texts from mapping
-    return [metadata[id] for id in ids[0] if id != -1]
+    # Lexical modes need the query tokens
+    if mode != "vector" and not token_ids:
+        mode = "vector"
+
+    with open_collection(collection, access="read") as stored:
+        # Same as for inserts, the query has to live in the space of the collection's index
+        if model_version is not None and model_version != stored.model_version and token_ids:
+            query_vector = pool_tokens(stored.matrix.numpy(), [token_ids])
+
+        ids = stored.search_ids(query_vector, top_k, token_ids, mode)
+
+        # Return texts from mapping
+        return [stored.metadata[id] for id in ids if id in stored.metadata]
+
+
+# Mean-pooled float32 vectors of many token lists, one gather per call (empty lists pool to zeros)
+def pool_tokens(matrix, token_lists):
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    vectors = np.zeros((len(token_lists), matrix.shape[1]), dtype=np.float32)
+    rows = np.flatnonzero(lengths)
+    if rows.size == 0:
+        return vectors
+
+    # Clamp to the matrix like generate_embeddings does
+    flat = np.concatenate([np.asarray(token_lists[row], dtype=np.int64) for row in rows])
+    flat = np.clip(flat, 0, matrix.shape[0] - 1)
+    sums = np.add.reduceat(matrix[flat], np.cumsum(lengths[rows]) - lengths[rows], axis=0)
+    vectors[rows] = sums / lengths[rows, None]
+    return vectors
+
+# Stored token ids of the documents that still exist, tokenizing the text of those stored without them
+def read_tokens(collection, doc_ids, merges):
+    with collection.lock.shared():
+        documents = [(id, collection.token_store.get(id), collection.metadata[id]) for id in doc_ids if id in collection.metadata]
+
+    # Texts arrive base64 encoded from the API server, anything else is tokenized as is
+    backfilled = {}
+    for id, token_ids, text in documents:
+        if token_ids is None:
+            merges = merges if merges is not None else load_merges()
+            try:
+                raw = base64.b64decode(text, validate=True).decode('utf-8')
+            except ValueError:
+                raw = text
+            backfilled[id] = encode(raw, merges)
+
+    with collection.lock:
+        for id, token_ids in backfilled.items():
+            if id in collection.metadata and id not in collection.token_store:
+                collection.token_store.add(id, token_ids)
+    reload_stats["reload_backfilled"] += len(backfilled)
+
+    ids = [id for id, _, _ in documents]
+    token_lists = [backfilled[id] if token_ids is None else token_ids for id, token_ids, _ in documents]
+    return ids, token_lists, merges
+
+# Add re-embedded documents to a rebuilt index and, for re-ranking collections, its full-precision vector store
+def add_pooled(index, vector_store, ids, vectors):
+    if not ids:
+        return
+    index.add_with_ids(vectors, np.array(ids, dtype=np.int64))
+    if vector_store is not None:
+        vector_store.add_many(ids, vectors)
+
+# Re-embed a collection under a new matrix into a fresh index, then swap both in at once
+def rebuild_collection(collection, source, matrix, version, fingerprint):
+    start_time = time.time()
+    with collection.lock:
+        if collection.model_version == version:
+            return
+        new_index = collection.empty_index_like(matrix.shape[1])
+        new_vectors = collection.empty_vectors_like(matrix.shape[1])
+        doc_ids = list(collection.metadata)
+        collection.dirty = set()
+
+    try:
+        # Searches keep using the old index and matrix while the new index fills up in batches
+        vectors_matrix = matrix.numpy()
+        merges = None
+        for start in range(0, len(doc_ids), REBUILD_BATCH):
+            ids, token_lists, merges = read_tokens(collection, doc_ids[start:start + REBUILD_BATCH], merges)
+            add_pooled(new_index, new_vectors, ids, pool_tokens(vectors_matrix, token_lists))
+            reload_stats["reload_documents"] += len(ids)
+
+        with collection.lock:
+            # Catch up with the writes that landed during the rebuild
+            dirty = sorted(collection.dirty)
+            if dirty:
+                new_index.remove_ids(np.array(dirty, dtype=np.int64))
+                for id in dirty if new_vectors is not None else ():
+                    new_vectors.remove(id)
+                ids, token_lists, merges = read_tokens(collection, dirty, merges)
+                add_pooled(new_index, new_vectors, ids, pool_tokens(vectors_matrix, token_lists))
+
+            # Cutover, written to disk along with the swap
+            collection.replace_index(new_index, new_vectors, {"source": source, "fingerprint": fingerprint})
+            collection.matrix, collection.model_version = matrix, version
+    finally:
+        collection.dirty = None
+
+    print(f"Collection {collection.name}: swapped in model version {version}, re-embedded {len(collection.metadata)} "
+          f"documents ({time.time() - start_time:.1f}s)")
+
+# Embedding matrix of a reload source, raising if it cannot be loaded
+def load_matrix(source):
+    matrix = embedding_model.load_embedding_matrix(source)
+    if matrix is None:
+        raise RuntimeError(f"Unable to load embedding matrix {source}")
+    return matrix
+
+# Re-embed every collection under the served matrix, one at a time, each keeps serving its old one until its cutover
+def rebuild_collections():
+    version, matrix = embedding_model.model
+    names = list_collections()
+    reload_stats.update(reload_total=len(names), reload_rebuilt=0)
+    try:
+        for name in names:
+            try:
+                with open_collection(name, access=None) as collection:
+                    rebuild_collection(collection, served_model["source"], matrix, version, served_model["fingerprint"])
+                reload_stats["reload_rebuilt"] += 1
+            except Exception as e:
+                reload_stats["reload_failures"] += 1
+                print(f"Model reload of collection {name} failed, it keeps serving the previous model: {e}")
+        reload_stats["reloads"] += 1
+    finally:
+        reload_stats["reloading"] = 0
+
+# Serve a new matrix for new embeddings and start re-embedding the stored collections in the background
+def start_reload(source, matrix):
+    global reload_thread
+    with reload_lock:
+        if reload_stats["reloading"]:
+            raise RuntimeError("A model reload is already running")
+        reload_stats["reloading"] = 1
+
+        # Collections loaded from now on are re-embedded before they are served
+        served_model.update(source=source, fingerprint=matrix_fingerprint(matrix))
+        save_served_matrix(matrix, served_model["fingerprint"])
+        embedding_model.set_embedding_matrix(matrix)
+        write_model_state(ARTIFACTS_DIRECTORY, source, served_model["fingerprint"], SERVED_MODEL_STATE)
+
+        reload_thread = threading.Thread(target=rebuild_collections, daemon=True)
+        reload_thread.start()
+
+# Load a new embedding matrix and re-embed the stored documents in the background, returning the number of
+# documents in the collections that are loaded right now (cold ones are re-embedded as the rebuild reaches them)
+def reload_model(source=embedding_model.DEFAULT_SOURCE):
+    check_writable()
+
+    # Fail fast on a bad source
+    matrix = load_matrix(source)
+    start_reload(source, matrix)
+
+    # Followers rebuild from their own tokens when they reach this point of the feed
+    feed.append("reload", {"source": source})
+    with collections_lock:
+        return sum(len(collection.metadata) for collection in collections.values())
+
+# Load the default collection up front, as before collections existed (it may need a rebuild, so this comes
+# after everything loading can call)
+with open_collection(DEFAULT_COLLECTION, create=not IS_FOLLOWER, access=None):
+    pass
+if follower is not None:
+    follower.start()
+threading.Thread(target=maintain_storage, daemon=True).start()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import pickle
+import time
+
+import faiss
+import numpy as np
+
+from replication import read_search_params, write_search_params, search_parameter_index
+from vector_store import VectorStore
+
+# Define base path
+BASE_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# efSearch of the extra high-recall HNSW point, past the largest value ParameterSpace sweeps (512)
+HIGH_EF_SEARCH = 1024
+
+# Stored vectors and their ids, decoded from the index itself (exact for flat storage, for PQ / SQ codes
+# the decoded vectors, so recall then measures what the search parameters lose on top of quantization)
+def stored_vectors(index):
+    inner = search_parameter_index(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        ivf.make_direct_map()
+    vectors = inner.reconstruct_n(0, index.ntotal)
+    if isinstance(index, faiss.IndexIDMap):
+        return vectors, faiss.vector_to_array(index.id_map)
+    return vectors, np.arange(index.ntotal, dtype=np.int64)
+
+# Full-precision vector store of a collection that re-ranks, with its re-rank factor (None, 1 otherwise)
+def rerank_store(artifacts):
+    config_path = os.path.join(artifacts, "collection.json")
+    if not os.path.exists(config_path):
+        return None, 1
+    with open(config_path) as f:
+        config = json.load(f)
+    if not config.get("rerank"):
+        return None, 1
+    with open(os.path.join(artifacts, "vectors.pkl"), 'rb') as f:
+        state = pickle.load(f)
+    return VectorStore.from_dict(os.path.join(artifacts, "vectors.f32"), state), config.get("rerank_factor", 10)
+
+# Settings the ParameterSpace grid stops short of: exhaustive probing (nprobe = nlist) for IVF indexes and a
+# high efSearch for HNSW graphs, each on top of the grid's most accurate combination so the other parameters
+# stay at their highest values
+def extra_settings(parameter_space, inner):
+    last = parameter_space.combination_name(parameter_space.n_combinations() - 1)
+    base = dict(param.split("=") for param in filter(None, last.split(",")))
+    overrides = []
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        override = {"nprobe": str(ivf.nlist)}
+        if isinstance(faiss.downcast_index(ivf.quantizer), faiss.IndexHNSW):
+            override["quantizer_efSearch"] = str(max(HIGH_EF_SEARCH, ivf.nlist))
+        overrides.append(override)
+    elif isinstance(inner, faiss.IndexHNSW):
+        overrides.append({"efSearch": str(HIGH_EF_SEARCH)})
+    names = {parameter_space.combination_name(combination) for combination in range(parameter_space.n_combinations())}
+    settings = [",".join(f"{name}={value}" for name, value in dict(base, **override).items()) for override in overrides]
+    return [params for params in settings if params not in names]
+
+# Exact top-k neighbours of every query by brute force, the query's own document left out
+def ground_truth(vectors, ids, query_rows, k):
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    _, rows = flat.search(vectors[query_rows], k + 1)
+    return [[ids[row] for row in found if row != query_row][:k] for query_row, found in zip(query_rows, rows)]
+
+# Search one query at a time like the server does (re-ranking the candidates exactly when the collection keeps
+# full-precision vectors), returning recall@k and per-query latencies in ms
+def measure(index, vectors, ids, query_rows, truth, k, store=None, rerank_factor=1):
+    latencies, hits = [], 0
+    for query_row, expected in zip(query_rows, truth):
+        query = vectors[query_row:query_row + 1]
+        start = time.perf_counter()
+        _, found = index.search(query, (k + 1) * rerank_factor)
+        found = [id for id in found[0] if id != -1]
+        if store is not None and found:
+            distances = ((store.get(found) - query) ** 2).sum(axis=1)
+            found = [found[row] for row in np.argsort(distances, kind='stable')]
+        latencies.append(1000 * (time.perf_counter() - start))
+        found = [id for id in found if id != ids[query_row]][:k]
+        hits += len(set(found) & set(expected))
+    return hits / max(1, sum(len(expected) for expected in truth)), np.array(latencies)
+
+def tune(artifacts, k=10, target_recall=0.95, queries=1000, seed=0, dry_run=False):
+    index = faiss.read_index(os.path.join(artifacts, "faiss.index"))
+    if index.ntotal <= k:
+        raise ValueError(f"Index holds {index.ntotal} vectors, need more than k={k} to measure recall")
+
+    # Stored vectors double as queries, the same distribution real queries are compared against. Collections that
+    # keep full-precision vectors get exact ground truth, the others the vectors decoded from the index
+    vectors, ids = stored_vectors(index)
+    store, rerank_factor = rerank_store(artifacts)
+    if store is not None:
+        vectors = store.get(ids)
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(index.ntotal, size=min(queries, index.ntotal), replace=False)
+    truth = ground_truth(vectors, ids, query_rows, k)
+    if store is not None:
+        print(f"Re-ranking {rerank_factor}x candidates with full-precision vectors")
+    print(f"Measuring recall@{k} over {len(query_rows)} queries against {index.ntotal} vectors")
+
+    # Every combination of the index's search-time parameters (a single empty one for flat indexes), then the
+    # exhaustive / high-recall settings past the end of the grid
+    parameter_space = faiss.ParameterSpace()
+    parameter_space.initialize(search_parameter_index(index))
+    settings = [parameter_space.combination_name(combination) for combination in range(parameter_space.n_combinations())]
+    settings += extra_settings(parameter_space, search_parameter_index(index))
+    points = []
+    for params in settings:
+        if params:
+            parameter_space.set_index_parameters(search_parameter_index(index), params)
+        recall, latencies = measure(index, vectors, ids, query_rows, truth, k, store, rerank_factor)
+        points.append({"params": params, "recall": recall, "latency_ms": float(latencies.mean()),
+                       "p99_latency_ms": float(np.percentile(latencies, 99))})
+        print(f"{params or '(defaults)':>40}: recall@{k} {recall:.4f}, {points[-1]['latency_ms']:.3f} ms/query")
+
+    # Cheapest setting that meets the target, or the most accurate one if none does
+    meeting = [point for point in points if point["recall"] >= target_recall]
+    if meeting:
+        best = min(meeting, key=lambda point: point["latency_ms"])
+    else:
+        best = max(points, key=lambda point: (point["recall"], -point["latency_ms"]))
+        print(f"Warning: no setting reaches recall@{k} {target_recall}, keeping the most accurate one")
+
+    search_params = dict(best, k=k, target_recall=target_recall, queries=len(query_rows), vectors=index.ntotal,
+                         tuned_at=time.time())
+    print(f"Selected {best['params'] or '(defaults)'}: recall@{k} {best['recall']:.4f}, {best['latency_ms']:.3f} ms/query")
+    if not dry_run:
+        previous = read_search_params(artifacts)
+        if previous is not None:
+            print(f"Replacing {previous['params'] or '(defaults)'} (recall@{previous['k']} {previous['recall']:.4f})")
+        write_search_params(artifacts, search_params)
+    return search_params
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pick the cheapest search parameters that reach a target recall@k")
+    parser.add_argument("--artifacts", default=os.getenv("POLYDB_ARTIFACTS", BASE_DIRECTORY + "/artifacts"),
+                        help="Storage directory holding faiss.index, search_params.json is written next to it")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query that recall is measured over")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--queries", type=int, default=1000, help="Stored vectors sampled as queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true", help="Report the sweep without writing search_params.json")
+    args = parser.parse_args()
+
+    tune(args.artifacts, args.k, args.target_recall, args.queries, args.seed, args.dry_run)
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+
+# Rows appended since the last sort that lookups scan linearly, before the sorted id table is rebuilt
+SORT_SLACK = 1024
+
+# Full-precision vectors in an append-only file that is memory mapped for reads. Only the row ids stay resident,
+# the vectors themselves are paged in by the OS for the few candidates that get re-ranked
+class VectorStore:
+    def __init__(self, path, dimension, ids=None):
+        self.path = path
+        self.dimension = dimension
+        self.row_bytes = 4 * dimension
+
+        # Id of every row in file order, -1 once deleted. Rows past count (writes that never made it into a
+        # snapshot) are overwritten by the next append
+        self.ids = np.empty(0, dtype=np.int64) if ids is None else np.array(ids, dtype=np.int64)
+        self.count = len(self.ids)
+
+        # Live ids sorted for lookups, covering the first sorted_count rows
+        self.sorted_ids, self.sorted_rows, self.sorted_count = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+        self.mapped = None
+
+    # Append vectors at the end of the live rows
+    def add_many(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension)
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as f:
+            f.seek(self.count * self.row_bytes)
+            f.write(vectors.tobytes())
+
+        # Grow the id table geometrically
+        if self.count + len(ids) > len(self.ids):
+            grown = np.full(max(2 * len(self.ids), self.count + len(ids), 1024), -1, dtype=np.int64)
+            grown[:self.count] = self.ids[:self.count]
+            self.ids = grown
+        self.ids[self.count:self.count + len(ids)] = ids
+        self.count += len(ids)
+
+    def add(self, doc_id, vector):
+        self.add_many([doc_id], vector)
+
+    def remove(self, doc_id):
+        row = self.rows([doc_id])[0]
+        if row >= 0:
+            self.ids[row] = -1
+
+    # Row of every id, -1 for ids that are not stored
+    def rows(self, doc_ids):
+        doc_ids = np.asarray(doc_ids, dtype=np.int64).reshape(-1)
+        if self.count - self.sorted_count > max(SORT_SLACK, self.sorted_count // 16):
+            self.sort()
+
+        # Sorted part, skipping rows deleted since the sort
+        rows = np.full(len(doc_ids), -1, dtype=np.int64)
+        if self.sorted_ids.size:
+            positions = np.minimum(np.searchsorted(self.sorted_ids, doc_ids), self.sorted_ids.size - 1)
+            found = self.sorted_ids[positions] == doc_ids
+            rows[found] = self.sorted_rows[positions[found]]
+            rows[(rows >= 0) & (self.ids[np.maximum(rows, 0)] != doc_ids)] = -1
+
+        # Rows appended since the sort
+        tail = self.ids[self.sorted_count:self.count]
+        for position in np.flatnonzero(rows < 0):
+            matches = np.flatnonzero(tail == doc_ids[position])
+            if matches.size:
+                rows[position] = self.sorted_count + matches[-1]
+        return rows
+
+    def sort(self):
+        live_rows = np.flatnonzero(self.ids[:self.count] >= 0)
+        order = np.argsort(self.ids[live_rows], kind='stable')
+        self.sorted_ids, self.sorted_rows = self.ids[live_rows][order], live_rows[order]
+        self.sorted_count = self.count
+
+    # Vectors of the given ids, in order
+    def get(self, doc_ids):
+        rows = self.rows(doc_ids)
+        if (rows < 0).any():
+            raise KeyError(f"No stored vector for ids {np.asarray(doc_ids)[rows < 0].tolist()}")
+
+        # Map the file again once it has grown past the current mapping
+        if self.mapped is None or len(self.mapped) < self.count:
+            self.mapped = np.memmap(self.path, dtype=np.float32, mode='r', shape=(self.count, self.dimension))
+        return np.array(self.mapped[rows])
+
+    # Follow the file to the path it was moved to (a store built next to the live one, once swapped into place)
+    def moved(self, path):
+        self.path = path
+        self.mapped = None
+
+    def __contains__(self, doc_id):
+        return self.rows([doc_id])[0] >= 0
+
+    def __len__(self):
+        return int((self.ids[:self.count] >= 0).sum())
+
+    # Resident size of the id tables in bytes
+    def nbytes(self):
+        return self.ids.nbytes + self.sorted_ids.nbytes + self.sorted_rows.nbytes
+
+    # Size of the vector file in bytes, deleted rows included until the next rebuild
+    def disk_bytes(self):
+        return self.count * self.row_bytes
+
+    # Plain form for persistence (the vectors are already on disk)
+    def to_dict(self):
+        return {"dimension": self.dimension, "ids": self.ids[:self.count].copy()}
+
+    @classmethod
+    def from_dict(cls, path, state):
+        return cls(path, state["dimension"], state["ids"])
@@ -228,6 +228,22 @@ class PolyDBAPITest(unittest.TestCase):
             else:
                 print(f"ℹ {target_lang} content not found with {query_lang} query - this may be normal depending on the embedding model's cross-lingual capabilities")
     
+    def test_08_duplicate_insert(self):
+        """Test that re-inserting identical text does not create duplicate results"""
+        text = "Duplicate documents should only be stored once in the index"
+        for _ in range(3):
+            response = self._insert_text(text)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data["status"], "ok", f"Failed to insert text: {data.get('error', 'Unknown error')}")
+
+        # The text should appear at most once in the results
+        response = self._find_similar(text, 10)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "ok", f"Failed to search: {data.get('error', 'Unknown error')}")
+        self.assertEqual(data["similar_texts"].count(text), 1, "Duplicate text stored more than once")
+    
     def _insert_text(self, text):
         """Helper method to insert text into the database"""
         endpoint = f"{self.BASE_URL}/insert"
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import grpc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'polyvec')))
+
+from pgrpc import admission as admission_module
+from pgrpc.admission import Admission, Rejected
+
+
+# Stand-in for a gRPC servicer context
+class Context:
+    def __init__(self, remaining=None):
+        self.active = True
+        self.remaining = remaining
+        self.code = None
+        self.details = None
+
+    def is_active(self):
+        return self.active
+
+    def time_remaining(self):
+        return self.remaining
+
+    def set_code(self, code):
+        self.code = code
+
+    def set_details(self, details):
+        self.details = details
+
+
+def make_admission(capacity=1, queue=1):
+    return Admission(capacity={"read": capacity, "write": capacity}, queue_limit={"read": queue, "write": queue},
+                     method_classes={"Search": "read", "Insert": "write"})
+
+
+# Worker slots, bounded queues and deadline checks in front of the servicer methods
+class AdmissionTest(unittest.TestCase):
+    def test_full_queue_fails_fast(self):
+        admission = make_admission(capacity=1, queue=1)
+        holding, release = threading.Event(), threading.Event()
+
+        def hold():
+            with admission.admit("Search", Context()):
+                holding.set()
+                release.wait(5)
+
+        def wait():
+            with admission.admit("Search", Context()):
+                pass
+
+        threads = [threading.Thread(target=hold)]
+        threads[0].start()
+        self.assertTrue(holding.wait(5))
+        threads.append(threading.Thread(target=wait))
+        threads[1].start()
+        deadline = time.time() + 5
+        while admission.waiting["Search"] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+
+        with self.assertRaises(Rejected) as rejected:
+            with admission.admit("Search", Context()):
+                pass
+        self.assertEqual(rejected.exception.code, grpc.StatusCode.RESOURCE_EXHAUSTED)
+
+        # Writes have their own slots
+        with admission.admit("Insert", Context()):
+            pass
+
+        release.set()
+        for thread in threads:
+            thread.join()
+        stats = admission.flat_stats()
+        self.assertEqual((stats["admission_Search_admitted"], stats["admission_Search_rejected"]), (2, 1))
+        self.assertEqual(stats["admission_Search_waiting"], 0)
+
+    def test_queued_request_is_shed_at_its_deadline(self):
+        admission = make_admission()
+        with admission.admit("Search", Context()):
+            with self.assertRaises(Rejected) as rejected:
+                with admission.admit("Search", Context(remaining=0.05)):
+                    pass
+        self.assertEqual(rejected.exception.code, grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertEqual(admission.flat_stats()["admission_Search_shed"], 1)
+
+    def test_stage_check(self):
+        admission = make_admission()
+        context = Context()
+        with mock.patch.object(admission_module, "REQUEST_BUDGET", 0.05):
+            with self.assertRaises(Rejected) as rejected:
+                with admission.admit("Insert", context) as check:
+                    check()
+                    time.sleep(0.06)
+                    check()
+        self.assertEqual(rejected.exception.code, grpc.StatusCode.DEADLINE_EXCEEDED)
+
+        with self.assertRaises(Rejected) as rejected:
+            with admission.admit("Insert", context) as check:
+                context.active = False
+                check()
+        self.assertEqual(rejected.exception.code, grpc.StatusCode.CANCELLED)
+        self.assertEqual(admission.flat_stats()["admission_Insert_shed"], 2)
+
+    def test_admitted_decorator(self):
+        admission = make_admission()
+        response_type = lambda success, error_message: SimpleNamespace(success=success, error_message=error_message)
+
+        class Servicer:
+            @admission.admitted(response_type)
+            def Search(self, request, context, check):
+                check()
+                return "staged"
+
+            @admission.admitted(response_type, staged=False)
+            def Insert(self, request, context):
+                return "single"
+
+        servicer = Servicer()
+        self.assertEqual(servicer.Search(None, Context()), "staged")
+        self.assertEqual(servicer.Insert(None, Context()), "single")
+
+        # A rejection becomes an unsuccessful response carrying the status
+        context = Context(remaining=0.01)
+        with admission.admit("Search", Context()):
+            response = servicer.Search(None, context)
+        self.assertFalse(response.success)
+        self.assertEqual(context.code, grpc.StatusCode.DEADLINE_EXCEEDED)
+
+    def test_counters_are_exact_under_contention(self):
+        admission = make_admission(capacity=4, queue=64)
+
+        def run():
+            for _ in range(200):
+                with admission.admit("Search", Context()) as check:
+                    check()
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(admission.flat_stats()["admission_Search_admitted"], 1600)
+
+
+if __name__ == '__main__':
+    unittest.main()
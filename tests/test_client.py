@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+import asyncio
+import http.server
+import json
+import os
+import sys
+import threading
+import unittest
+import urllib.parse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from polydb_client import PolyDBClient, PolyDBError, AsyncPolyDBClient
+
+
+# Local stand-in for the API server that answers from a script of (status, body) per path
+class ScriptedServer(http.server.ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ScriptedHandler)
+        self.script = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ScriptedHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.answer(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+
+    # GET requests are recorded with their query string as the payload
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        self.path = path
+        self.answer(dict(urllib.parse.parse_qsl(query)))
+
+    def answer(self, payload):
+        with self.server.lock:
+            self.server.requests.append((self.path, payload))
+            answers = self.server.script[self.path]
+            answer = answers.pop(0) if len(answers) > 1 else answers[0]
+        status, body = answer(payload) if callable(answer) else answer
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+# Echo every text of a batch back as an inserted document
+def insert_results(payload):
+    return 200, {"status": "ok", "results": [{"status": "ok", "id": len(text)} for text in payload["texts"]]}
+
+
+class ClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ScriptedServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = PolyDBClient(self.server.url, pool_size=2, retries=2, backoff=0.001, batch_size=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retries_overload_and_timeouts(self):
+        self.server.script["/insert"] = [(429, ""), (503, "<html>busy</html>"), (200, {"status": "ok", "id": 7})]
+        self.assertEqual(self.client.insert("text")["id"], 7)
+        self.assertEqual(len(self.server.requests), 3)
+
+        overloaded = {"status": "error", "error": "Failed to generate embeddings: embeddings service error "
+                                                  "(ResourceExhausted): insert queue full"}
+        self.server.script["/insert"] = [(200, overloaded), (200, {"status": "error", "error": "timeout"}),
+                                         (200, {"status": "ok", "id": 8})]
+        self.assertEqual(self.client.insert("text")["id"], 8)
+
+    def test_gives_up_after_retries(self):
+        self.server.script["/insert"] = [(503, "")]
+        with self.assertRaises(PolyDBError):
+            self.client.insert("text")
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_non_json_error_raises_polydb_error(self):
+        self.server.script["/insert"] = [(500, "<html>Internal Server Error</html>")]
+        with self.assertRaisesRegex(PolyDBError, "HTTP 500"):
+            self.client.insert("text")
+        self.assertEqual(len(self.server.requests), 1)
+
+        # Other failures are not retried
+        self.server.script["/insert"] = [(200, {"status": "error", "error": "invalid collection"})]
+        with self.assertRaisesRegex(PolyDBError, "invalid collection"):
+            self.client.insert("text")
+
+    def test_bulk_calls_send_batches_of_distinct_texts(self):
+        self.server.script["/insert_batch"] = [insert_results]
+        responses = self.client.insert_many(["a", "bb", "a", "ccc", "dddd", "bb"])
+        self.assertEqual([response["id"] for response in responses], [1, 2, 1, 3, 4, 2])
+        self.assertEqual(sorted(payload["texts"] for _, payload in self.server.requests), [["a", "bb"], ["ccc", "dddd"]])
+
+    def test_batch_resends_only_turned_away_texts(self):
+        busy = {"status": "error", "error": "embeddings service error (Unavailable): connection refused"}
+        first = (200, {"status": "ok", "results": [{"status": "ok", "similar_texts": ["x"]}, busy]})
+        self.server.script["/find_similar_batch"] = [first, (200, {"status": "ok", "results": [{"status": "ok",
+                                                                                               "similar_texts": ["y"]}]})]
+        self.assertEqual(self.client.find_similar_batch(["q1", "q2"], top_k=3), [["x"], ["y"]])
+        self.assertEqual([payload["texts"] for _, payload in self.server.requests], [["q1", "q2"], ["q2"]])
+        self.assertEqual(self.server.requests[1][1]["top_k"], 3)
+
+    def test_collection_and_mode_are_sent(self):
+        self.server.script["/insert"] = [(200, {"status": "ok", "id": 1})]
+        self.server.script["/find_similar_batch"] = [(200, {"status": "ok", "results": [{"status": "ok"}]})]
+        self.client.insert("text", collection="notes")
+        self.client.insert("text")
+        self.client.find_similar_many(["q"], top_k=2, mode="keyword", collection="notes")
+        self.assertEqual(self.server.requests[0][1], {"text": "text", "collection": "notes"})
+        self.assertEqual(self.server.requests[1][1], {"text": "text"})
+        self.assertEqual(self.server.requests[2][1], {"texts": ["q"], "top_k": 2, "mode": "keyword", "collection": "notes"})
+
+    def test_delete_and_stats(self):
+        self.server.script["/delete"] = [(200, {"status": "ok", "deleted": True})]
+        self.server.script["/stats"] = [(200, {"status": "ok", "stats": {"documents": 3}})]
+        self.assertTrue(self.client.delete(5, collection="notes"))
+        self.assertEqual(self.client.stats(collection="notes"), {"documents": 3})
+        self.assertEqual(self.server.requests, [("/delete", {"id": 5, "collection": "notes"}),
+                                                ("/stats", {"collection": "notes"})])
+
+    def test_empty_texts_are_rejected_before_sending(self):
+        with self.assertRaisesRegex(ValueError, r"texts\[1\]"):
+            self.client.insert_many(["a", "", "b"])
+        with self.assertRaises(ValueError):
+            self.client.insert(None)
+        self.assertEqual(self.server.requests, [])
+
+
+class AsyncClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ScriptedServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run_client(self, call):
+        async def run():
+            async with AsyncPolyDBClient(self.server.url, pool_size=2, retries=2, backoff=0.001, batch_size=2) as client:
+                return await call(client)
+        return asyncio.run(run())
+
+    def test_retries_and_batches(self):
+        self.server.script["/insert_batch"] = [(429, ""), insert_results]
+        responses = self.run_client(lambda client: client.insert_many(["a", "bb", "ccc", "a"]))
+        self.assertEqual([response["id"] for response in responses], [1, 2, 3, 1])
+
+    def test_non_json_error_raises_polydb_error(self):
+        self.server.script["/insert"] = [(500, "<html>Internal Server Error</html>")]
+        with self.assertRaisesRegex(PolyDBError, "HTTP 500"):
+            self.run_client(lambda client: client.insert("text"))
+
+    def test_collection_delete_and_stats(self):
+        self.server.script["/find_similar"] = [(200, {"status": "ok", "similar_texts": ["x"]})]
+        self.server.script["/delete"] = [(200, {"status": "ok", "deleted": False})]
+        self.server.script["/stats"] = [(200, {"status": "ok", "stats": {"documents": 0}})]
+
+        async def calls(client):
+            return (await client.find_similar("q", mode="hybrid", collection="notes"),
+                    await client.delete(5), await client.stats())
+        self.assertEqual(self.run_client(calls), (["x"], False, {"documents": 0}))
+        self.assertEqual(self.server.requests, [("/find_similar", {"text": "q", "top_k": 5, "mode": "hybrid",
+                                                                   "collection": "notes"}),
+                                                ("/delete", {"id": 5}), ("/stats", {})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from storage import inverted_index
+from storage.inverted_index import InvertedIndex, TokenStore, encode_postings, decode_postings, encode_run, \
+    encode_varints, decode_varints
+
+
+# Posting list compression and the keyword lookups built on it
+class PostingsTest(unittest.TestCase):
+    def test_varints_round_trip(self):
+        values = [0, 1, 127, 128, 16383, 16384, 2 ** 31 - 1, 2 ** 63 - 1]
+        out, lengths = encode_varints(values)
+        self.assertEqual(lengths.tolist(), [1, 1, 1, 2, 2, 3, 5, 9])
+        self.assertEqual(decode_varints(out.tobytes()).astype(np.uint64).tolist(), values)
+
+    def test_postings_are_sorted_and_unique(self):
+        data = encode_postings([42, 7, 7, 1000000, 3])
+        self.assertEqual(decode_postings(data).tolist(), [3, 7, 42, 1000000])
+        self.assertEqual(encode_postings([]), b"")
+        self.assertEqual(decode_postings(b"").tolist(), [])
+
+    def test_runs_append_below_the_tail(self):
+        data = encode_postings([5, 900]) + encode_run([3, 2 ** 31 - 1], previous=900)
+        self.assertEqual(decode_postings(data).tolist(), [5, 900, 3, 2 ** 31 - 1])
+
+
+class InvertedIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.add(1, [10, 20, 20])
+        self.index.add(2, [20, 30])
+        self.index.add(3, [10, 20, 30])
+
+    def test_lookup_merges_pending_and_compressed(self):
+        self.assertEqual(self.index.lookup(20).tolist(), [1, 2, 3])
+        self.index.compact()
+        self.assertEqual(self.index.pending, {})
+        self.index.add(0, [20])
+        self.assertEqual(self.index.lookup(20).tolist(), [0, 1, 2, 3])
+        self.assertEqual(self.index.lookup(99).tolist(), [])
+
+    def test_pending_lists_compact_at_limit(self):
+        index = InvertedIndex()
+        for doc_id in range(inverted_index.PENDING_LIMIT):
+            index.add(doc_id, [5])
+        self.assertNotIn(5, index.pending)
+        self.assertEqual(index.lookup(5).tolist(), list(range(inverted_index.PENDING_LIMIT)))
+
+    def test_pending_runs_append_to_compressed_bytes(self):
+        limit = inverted_index.PENDING_LIMIT
+        index = InvertedIndex()
+        index.add_many(np.arange(1000, 1000 + 4 * limit), np.full(4 * limit, 5), np.arange(4 * limit))
+        head = bytes(index.postings[5])
+
+        # The next run goes after the existing bytes, lower ids included
+        for doc_id in range(limit):
+            index.add(doc_id, [5])
+        self.assertEqual(bytes(index.postings[5][:len(head)]), head)
+        self.assertEqual(index.lookup(5).tolist(), list(range(limit)) + list(range(1000, 1000 + 4 * limit)))
+
+        # Runs outgrowing the head are merged back into one sorted list
+        for doc_id in range(2000, 2000 + 3 * limit):
+            index.add(doc_id, [5])
+        self.assertNotIn(5, index.heads)
+        self.assertEqual(decode_postings(index.postings[5]).tolist(), index.lookup(5).tolist())
+        self.assertEqual(index.lookup(5).size, 8 * limit)
+
+    def test_remove_prunes_deleted_documents(self):
+        self.index.compact()
+        self.index.add(4, [10])
+        self.index.remove(4, [10])
+        self.index.remove(1, [10, 20])
+        self.assertEqual(self.index.lookup(10).tolist(), [3])
+        self.assertEqual(self.index.lookup(20).tolist(), [2, 3])
+        self.assertEqual(self.index.intersect([10, 20]).tolist(), [3])
+        restored = InvertedIndex.from_dict(self.index.to_dict())
+        self.assertEqual(decode_postings(restored.postings[20]).tolist(), [2, 3])
+
+        # Stored again before the deletion was folded in
+        self.index.add(1, [20])
+        self.assertEqual(self.index.lookup(20).tolist(), [1, 2, 3])
+        self.index.compact()
+        self.assertEqual(self.index.removed, {})
+        self.assertEqual(decode_postings(self.index.postings[10]).tolist(), [3])
+        self.assertEqual(decode_postings(self.index.postings[20]).tolist(), [1, 2, 3])
+
+    def test_candidates_are_ranked_by_relevance(self):
+        index = InvertedIndex()
+        for doc_id in range(1, 11):
+            index.add(doc_id, [1])
+        index.add(9, [2])
+        index.add(10, [2, 3])
+
+        # Documents matching the rare tokens come first, whatever their ids
+        self.assertEqual(index.union([1, 2, 3], max_candidates=1).tolist(), [10])
+        self.assertEqual(index.union([1, 2, 3], max_candidates=2).tolist(), [9, 10])
+
+        # Every match has every token, the shortest documents are kept
+        lengths = {doc_id: 10 for doc_id in range(1, 11)}
+        lengths[7] = 2
+        self.assertEqual(index.intersect([1], max_candidates=1, lengths=lambda ids: [lengths[id] for id in ids]).tolist(),
+                         [7])
+
+    def test_intersect_and_union(self):
+        self.assertEqual(self.index.intersect([10, 30]).tolist(), [3])
+        self.assertEqual(self.index.intersect([20]).tolist(), [1, 2, 3])
+        self.assertEqual(self.index.intersect([10, 99]).tolist(), [])
+        self.assertEqual(self.index.intersect([]).tolist(), [])
+        self.assertEqual(self.index.intersect([20], max_candidates=2).tolist(), [1, 2])
+
+        # The rarest tokens come first and the result stays under the cap
+        self.assertEqual(self.index.union([10, 30], max_candidates=10).tolist(), [1, 2, 3])
+        self.assertEqual(self.index.union([10, 20], max_candidates=2).tolist(), [1, 3])
+
+    def test_compact_prunes_deleted_documents(self):
+        self.index.compact(live_ids={1, 2})
+        self.assertEqual(self.index.lookup(10).tolist(), [1])
+        self.assertEqual(self.index.lookup(30).tolist(), [2])
+
+    def test_add_many_matches_add(self):
+        doc_ids = [4, 5, 6]
+        token_lists = [[10, 40], [40, 40, 50], [10]]
+        offsets = np.cumsum([0] + [len(tokens) for tokens in token_lists[:-1]])
+        bulk = InvertedIndex()
+        bulk.add(1, [10])
+        bulk.add_many(doc_ids, np.concatenate(token_lists), offsets)
+
+        single = InvertedIndex()
+        single.add(1, [10])
+        for doc_id, tokens in zip(doc_ids, token_lists):
+            single.add(doc_id, tokens)
+        for token_id in (10, 40, 50):
+            self.assertEqual(bulk.lookup(token_id).tolist(), single.lookup(token_id).tolist())
+
+    def test_to_dict_leaves_pending_in_place(self):
+        state = self.index.to_dict()
+        self.assertTrue(self.index.pending)
+        restored = InvertedIndex.from_dict(state)
+        for token_id in (10, 20, 30):
+            self.assertEqual(restored.lookup(token_id).tolist(), self.index.lookup(token_id).tolist())
+
+
+class TokenStoreTest(unittest.TestCase):
+    def test_add_many_matches_add(self):
+        store = TokenStore()
+        store.add_many([7, 8], np.array([300, -1, 5, 70000]), np.array([0, 2]))
+        self.assertEqual(store.get(7).tolist(), [300, 0])
+        self.assertEqual(store.get(8).tolist(), [5, 70000])
+        self.assertIsNone(store.get(9))
+        store.remove(7)
+        self.assertNotIn(7, store)
+        self.assertEqual(len(store), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from storage import replication
+from storage.replication import ChangeFeed, Follower, FeedTruncated, feed_segments, read_changes
+
+
+# Change feed segments, truncation and the follower's error handling
+class ChangeFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = self.temp.name
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_append_and_read(self):
+        feed = ChangeFeed(self.directory)
+        positions = [feed.append("insert", {"id": id}) for id in range(3)]
+        self.assertEqual([sequence for sequence, _ in positions], [1, 2, 3])
+
+        records = list(read_changes(self.directory))
+        self.assertEqual([change["id"] for _, _, _, change, _ in records], [0, 1, 2])
+        self.assertEqual([offset for _, _, _, _, offset in records], [offset for _, offset in positions])
+
+        # Reading from a record's end offset starts right after it
+        self.assertEqual([change["id"] for _, _, _, change, _ in read_changes(self.directory, positions[0][1])], [1, 2])
+
+    def test_recovers_position_and_drops_torn_record(self):
+        feed = ChangeFeed(self.directory)
+        feed.append("insert", {"id": 1})
+        position = feed.append("insert", {"id": 2})
+        with open(feed.path, 'ab') as f:
+            f.write(b"\x07partial")
+
+        reopened = ChangeFeed(self.directory)
+        self.assertEqual(reopened.position(), position)
+        self.assertEqual(reopened.append("delete", {"id": 1})[0], 3)
+        self.assertEqual(len(list(read_changes(self.directory))), 3)
+
+    def test_new_feed_continues_from_snapshot(self):
+        feed = ChangeFeed(self.directory, sequence=41, offset=5000)
+        self.assertEqual(feed.append("insert", {"id": 1})[0], 42)
+        self.assertEqual([sequence for sequence, _, _, _, _ in read_changes(self.directory, 5000)], [42])
+
+    def test_rotation_and_truncation(self):
+        with mock.patch.object(replication, "SEGMENT_BYTES", 200):
+            feed = ChangeFeed(self.directory)
+            positions = [feed.append("insert", {"id": id, "text": "x" * 100}) for id in range(6)]
+        segments = feed_segments(self.directory)
+        self.assertGreater(len(segments), 2)
+
+        # Offsets stay valid across segments
+        self.assertEqual([change["id"] for _, _, _, change, _ in read_changes(self.directory)], list(range(6)))
+
+        # Nothing is old enough yet
+        self.assertIsNone(feed.expired_position(retention=3600))
+        sequence, cutoff = feed.expired_position(retention=0)
+        self.assertEqual((sequence, cutoff), (segments[-1][1], segments[-1][0]))
+
+        # The active segment is always kept, and reading before the first kept one fails loudly
+        self.assertGreater(feed.truncate(cutoff), 0)
+        self.assertEqual(len(feed_segments(self.directory)), 1)
+        with self.assertRaises(FeedTruncated):
+            list(read_changes(self.directory, 0))
+        self.assertEqual([s for s, _, _, _, _ in read_changes(self.directory, cutoff)],
+                         [s for s, _ in positions if s > sequence])
+
+        # The position survives when only the active segment is left
+        self.assertEqual(ChangeFeed(self.directory).position(), positions[-1])
+
+    def test_legacy_feed_file(self):
+        feed = ChangeFeed(self.directory)
+        feed.append("insert", {"id": 1})
+        os.rename(feed.path, os.path.join(self.directory, replication.FEED_FILE))
+        self.assertEqual(ChangeFeed(self.directory).append("insert", {"id": 2})[0], 2)
+
+
+class FollowerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = self.temp.name
+        self.feed = ChangeFeed(self.directory)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_poll_applies_in_order_and_reports_lag(self):
+        batches = []
+        follower = Follower(self.directory, 0, 0, lambda batch, offset: batches.append(batch), None)
+        for id in range(3):
+            self.feed.append("insert", {"id": id})
+        self.assertEqual(follower.lag()["lag_sequences"], 3)
+
+        self.assertTrue(follower.poll())
+        self.assertEqual([sequence for sequence, _, _ in batches[0]], [1, 2, 3])
+        self.assertFalse(follower.poll())
+        lag = follower.lag()
+        self.assertEqual((lag["applied_sequence"], lag["lag_sequences"], lag["replication_failing"]), (3, 0, 0))
+
+    def test_run_retries_after_errors(self):
+        applied = threading.Event()
+        failures = []
+
+        def apply_changes(batch, offset):
+            if len(failures) < 2:
+                failures.append(batch)
+                raise OSError("disk hiccup")
+            applied.set()
+
+        self.feed.append("insert", {"id": 1})
+        follower = Follower(self.directory, 0, 0, apply_changes, None)
+        with mock.patch.object(replication, "POLL_INTERVAL", 0.01), mock.patch.object(replication.time, "sleep"):
+            follower.start()
+            self.assertTrue(applied.wait(5))
+
+        # The failed batch was retried from the same position, and the follower recovered
+        self.assertEqual(follower.errors, 2)
+        self.assertEqual(follower.sequence, 1)
+        deadline = time.time() + 5
+        while follower.failing and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(follower.failing)
+
+    def test_run_resyncs_after_truncation(self):
+        with mock.patch.object(replication, "SEGMENT_BYTES", 100):
+            for id in range(4):
+                self.feed.append("insert", {"id": id, "text": "x" * 100})
+        sequence, cutoff = self.feed.expired_position(retention=0)
+        self.feed.truncate(cutoff)
+
+        applied = []
+        done = threading.Event()
+
+        def apply_changes(batch, offset):
+            applied.extend(sequence for sequence, _, _ in batch)
+            done.set()
+
+        follower = Follower(self.directory, 0, 0, apply_changes, lambda: (sequence, cutoff))
+        follower.start()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(follower.resyncs, 1)
+        self.assertEqual(applied, [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
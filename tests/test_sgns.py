@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'polyvec', 'train')))
+
+from train import SGNSModel
+from data.sampler import UnigramSampler
+
+
+# The SGNS objective with per-pair negatives and with one pool shared by the batch
+class SGNSModelTest(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = SGNSModel(50, 8)
+        self.center = torch.tensor([1, 2, 3, 4])
+        self.context = torch.tensor([5, 6, 7, 8])
+
+    def test_shared_pool_matches_per_pair_negatives(self):
+        # Every row drawing the whole pool as its negatives is the same objective, on the same scale
+        pool = torch.tensor([10, 11, 12, 13, 14, 15])
+        shared = self.model(self.center, self.context, pool)
+        tiled = pool.expand(len(self.center), -1)
+        per_pair = self.model(self.center, self.context, tiled, torch.ones(tiled.shape))
+        torch.testing.assert_close(shared, per_pair)
+
+        # And so are the gradients
+        shared_grads = torch.autograd.grad(shared, list(self.model.parameters()))
+        per_pair_grads = torch.autograd.grad(self.model(self.center, self.context, tiled, torch.ones(tiled.shape)),
+                                             list(self.model.parameters()))
+        for shared_grad, per_pair_grad in zip(shared_grads, per_pair_grads):
+            torch.testing.assert_close(shared_grad, per_pair_grad)
+
+    def test_shared_pool_masks_accidental_hits(self):
+        # Token 2 is row 1's center and token 7 row 2's context, neither is a negative for that row
+        pool = torch.tensor([2, 7, 20, 21])
+        tiled = pool.expand(len(self.center), -1)
+        valid = (tiled != self.center.unsqueeze(1)) & (tiled != self.context.unsqueeze(1))
+        self.assertEqual(int((~valid).sum()), 2)
+        torch.testing.assert_close(self.model(self.center, self.context, pool),
+                                   self.model(self.center, self.context, tiled, valid.float()))
+
+        # Masking is not the same as scoring the hits
+        unmasked = self.model(self.center, self.context, tiled, torch.ones(tiled.shape))
+        self.assertFalse(torch.allclose(self.model(self.center, self.context, pool), unmasked))
+
+    def test_row_without_valid_negatives(self):
+        # A row whose every draw was masked keeps only its positive term
+        negatives = torch.tensor([[30, 31], [32, 33], [34, 35], [36, 37]])
+        valid = torch.ones(negatives.shape)
+        valid[0] = 0
+        loss = self.model(self.center, self.context, negatives, valid)
+        self.assertTrue(torch.isfinite(loss))
+        grads = torch.autograd.grad(loss, self.model.output_embedding.weight)[0]
+        self.assertEqual(float(grads[[30, 31]].abs().sum()), 0.0)
+
+    def test_sampler_flags_hits_that_survive_redraws(self):
+        # Only token 3 can be drawn, so a row excluding it can never get a clean draw
+        sampler = UnigramSampler([0, 0, 0, 1, 0])
+        negatives, valid = sampler.sample_excluding(torch.tensor([[3, 1], [0, 1]]), 4,
+                                                    generator=torch.Generator().manual_seed(0))
+        self.assertTrue((negatives == 3).all())
+        self.assertEqual(valid.tolist(), [[False] * 4, [True] * 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+import json
+from unittest import mock
+
+import numpy as np
+import torch
+
+# The storage module opens its artifacts on import, point it at a scratch directory first
+ARTIFACTS = tempfile.mkdtemp()
+os.environ["POLYDB_ARTIFACTS"] = ARTIFACTS
+os.environ.setdefault("POLYDB_PERSIST_INTERVAL", "3600")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from storage.replication import write_model_state, matrix_fingerprint
+
+# It also loads the matrix it served last, have that be a local file
+MATRIX = torch.rand((10000, 300))
+torch.save(MATRIX, os.path.join(ARTIFACTS, "matrix.pt"))
+write_model_state(ARTIFACTS, os.path.join(ARTIFACTS, "matrix.pt"), matrix_fingerprint(MATRIX), "served_model.json")
+
+import storage.storage as storage
+from storage.collection import CONFIG_FILE, REPLACE_JOURNAL
+
+
+def insert(text, collection):
+    token_ids = [len(text), len(collection)]
+    embeddings, version = storage.embedding_model.generate_versioned_embeddings(token_ids)
+    stored_id, _ = storage.insert_embedding(text, embeddings, str(uuid.uuid4()), token_ids=token_ids,
+                                            model_version=version, collection=collection)
+    return stored_id
+
+
+def tearDownModule():
+    shutil.rmtree(ARTIFACTS, ignore_errors=True)
+
+
+# Loading collections on demand and unloading the least recently used ones
+class CollectionCacheTest(unittest.TestCase):
+    def setUp(self):
+        for name in ("lru-a", "lru-b", "lru-c"):
+            insert(f"text of {name}", name)
+        storage.flush_collections()
+
+    def test_evicts_least_recently_used(self):
+        budget = sum(storage.collections[name].nbytes for name in ("default", "lru-b", "lru-c"))
+        with mock.patch.object(storage, "COLLECTION_MEMORY", budget):
+            with storage.open_collection("lru-a", access="read") as collection:
+                documents = len(collection.metadata)
+            with storage.open_collection("lru-b", access="read"):
+                pass
+            with storage.open_collection("lru-c", access="read"):
+                pass
+            storage.evict_collections(keep="lru-c")
+        self.assertNotIn("default", storage.collections)
+        self.assertNotIn("lru-a", storage.collections)
+        self.assertIn("lru-c", storage.collections)
+
+        # An evicted collection reads back from disk on next use
+        with storage.open_collection("lru-a", access="read") as collection:
+            self.assertEqual(len(collection.metadata), documents)
+
+    def test_keeps_held_and_unpersisted_collections(self):
+        insert("not flushed yet", "lru-b")
+        with mock.patch.object(storage, "COLLECTION_MEMORY", 0):
+            with storage.open_collection("lru-a", access=None):
+                storage.evict_collections(keep="lru-c")
+                self.assertIn("lru-a", storage.collections)
+            self.assertIn("lru-b", storage.collections)
+        storage.flush_collections()
+
+    def test_concurrent_opens_load_once(self):
+        with storage.collections_lock:
+            storage.collections.pop("lru-a", None)
+        loads = []
+        load_collection = storage.load_collection
+
+        def slow_load(name, create):
+            loads.append(name)
+            time.sleep(0.2)
+            return load_collection(name, create)
+
+        with storage.open_collection("lru-b", access="read"):
+            pass
+        documents = []
+
+        def count():
+            with storage.open_collection("lru-a", access="read") as collection:
+                documents.append(len(collection.metadata))
+
+        with mock.patch.object(storage, "load_collection", slow_load):
+            threads = [threading.Thread(target=count) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+
+            # Other collections stay available while this one loads
+            time.sleep(0.05)
+            with storage.open_collection("lru-b", access="read"):
+                self.assertEqual(list(storage.loading), ["lru-a"])
+            for thread in threads:
+                thread.join()
+        self.assertEqual(loads, ["lru-a"])
+        self.assertEqual(len(set(documents)), 1)
+        self.assertEqual(storage.loading, {})
+
+    def test_failed_load_reaches_every_waiter(self):
+        errors = []
+
+        def open_missing():
+            try:
+                with storage.open_collection("missing", access="read"):
+                    pass
+            except KeyError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=open_missing) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+        self.assertNotIn("missing", storage.collections)
+        self.assertEqual(storage.loading, {})
+
+
+# Which matrix a restart serves
+class ServedMatrixTest(unittest.TestCase):
+    def test_unreachable_source_falls_back_to_local_copy(self):
+        load_embedding_matrix = storage.embedding_model.load_embedding_matrix
+        fingerprint = storage.served_model["fingerprint"]
+        with mock.patch.object(storage.embedding_model, "load_embedding_matrix",
+                               side_effect=lambda source: None if source == "gone.pt" else load_embedding_matrix(source)):
+            matrix = storage.load_served_matrix({"source": "gone.pt", "fingerprint": fingerprint})
+            self.assertEqual(storage.matrix_fingerprint(matrix), fingerprint)
+            self.assertIsNone(storage.load_served_matrix({"source": "gone.pt", "fingerprint": "0" * 16}))
+
+    def test_copy_of_previous_matrix_is_replaced(self):
+        matrix = torch.rand((10, 300))
+        fingerprint = storage.matrix_fingerprint(matrix)
+        storage.save_served_matrix(matrix, fingerprint)
+        self.assertTrue(os.path.exists(storage.served_matrix_path(fingerprint)))
+        self.assertFalse(os.path.exists(storage.served_matrix_path(storage.served_model["fingerprint"])))
+        storage.save_served_matrix(storage.embedding_model.embedding_matrix, storage.served_model["fingerprint"])
+        self.assertFalse(os.path.exists(storage.served_matrix_path(fingerprint)))
+
+
+# Swapping a rebuilt index in, and rolling an interrupted swap forward
+class ReplaceIndexTest(unittest.TestCase):
+    def setUp(self):
+        directory = storage.collection_directory("swap")
+        os.makedirs(directory, exist_ok=True)
+        config = dict(storage.collection_defaults(), rerank=True)
+        with open(os.path.join(directory, CONFIG_FILE), 'w') as f:
+            json.dump(config, f)
+        self.ids = [insert(f"swap {n}", "swap") for n in range(5)]
+        storage.flush_collections()
+
+    # Same documents under zero vectors, in a staged index and vector store
+    def zero_index(self, collection):
+        index = collection.empty_index_like(collection.index.d)
+        vectors = collection.empty_vectors_like(collection.index.d)
+        zeros = np.zeros((len(self.ids), collection.index.d), dtype=np.float32)
+        storage.add_pooled(index, vectors, self.ids, zeros)
+        return index, vectors
+
+    def reopen(self):
+        with storage.collections_lock:
+            storage.collections.pop("swap", None)
+        return storage.open_collection("swap", access="read")
+
+    def test_interrupted_swap_rolls_forward(self):
+        with storage.open_collection("swap") as collection:
+            index, vectors = self.zero_index(collection)
+            with mock.patch("storage.collection.finish_replace", side_effect=OSError("crash")):
+                with self.assertRaises(OSError):
+                    collection.replace_index(index, vectors, storage.served_model)
+        self.assertTrue(os.path.exists(collection.path(REPLACE_JOURNAL)))
+
+        with self.reopen() as collection:
+            self.assertFalse(os.path.exists(collection.path(REPLACE_JOURNAL)))
+            self.assertEqual(collection.index.ntotal, len(self.ids))
+            self.assertFalse(collection.vectors.get(self.ids).any())
+
+    def test_swap_without_journal_keeps_old_files(self):
+        with storage.open_collection("swap") as collection:
+            before = collection.vectors.get(self.ids)
+            self.zero_index(collection)
+        with self.reopen() as collection:
+            np.testing.assert_array_equal(collection.vectors.get(self.ids), before)
+
+
+# Duplicate texts stored once, however the inserts interleave
+class DuplicateInsertTest(unittest.TestCase):
+    def test_concurrent_inserts_store_text_once(self):
+        token_ids = [3, 4, 5]
+        embeddings, version = storage.embedding_model.generate_versioned_embeddings(token_ids)
+        uuids = [str(uuid.uuid4()) for _ in range(4)]
+        results = [None] * len(uuids)
+
+        # Every insert gets past find_duplicate before any of them stores
+        def run(n):
+            results[n] = storage.insert_embedding("same text", embeddings, uuids[n], token_ids=token_ids,
+                                                  model_version=version, collection="dups")
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(len(uuids))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stored_ids = {stored_id for stored_id, _ in results}
+        self.assertEqual(len(stored_ids), 1)
+        self.assertEqual(sorted(duplicate for _, duplicate in results), [False, True, True, True])
+        with storage.open_collection("dups", access="read") as collection:
+            self.assertEqual(list(collection.metadata), list(stored_ids))
+
+        # Any of the ids deletes the one document
+        storage.delete_embedding(uuids[-1], collection="dups")
+        with storage.open_collection("dups", access="read") as collection:
+            self.assertEqual(collection.metadata, {})
+
+
+    def test_colliding_uuid_gets_free_id(self):
+        token_ids = [6, 7]
+        embeddings, version = storage.embedding_model.generate_versioned_embeddings(token_ids)
+        first = str(uuid.uuid4())
+        # Same low 31 bits, different UUID
+        second = str(uuid.UUID(int=uuid.UUID(first).int ^ (1 << 100)))
+        first_id, _ = storage.insert_embedding("first text", embeddings, first, token_ids=token_ids,
+                                               model_version=version, collection="collisions")
+        second_id, duplicate = storage.insert_embedding("second text", embeddings, second, token_ids=token_ids,
+                                                        model_version=version, collection="collisions")
+        self.assertFalse(duplicate)
+        self.assertNotEqual(first_id, second_id)
+        with storage.open_collection("collisions", access="read") as collection:
+            self.assertEqual(collection.metadata[first_id], "first text")
+            self.assertEqual(collection.metadata[second_id], "second text")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from storage import vector_store
+from storage.vector_store import VectorStore
+
+
+# Memory-mapped full-precision vectors and their row id table
+class VectorStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "vectors.f32")
+        self.vectors = np.arange(40, dtype=np.float32).reshape(10, 4)
+        self.store = VectorStore(self.path, 4)
+        self.store.add_many(np.arange(100, 110), self.vectors)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_get_in_request_order(self):
+        np.testing.assert_array_equal(self.store.get([105, 100, 109]), self.vectors[[5, 0, 9]])
+        with self.assertRaises(KeyError):
+            self.store.get([100, 999])
+
+    def test_remove_and_re_add(self):
+        self.store.remove(103)
+        self.assertNotIn(103, self.store)
+        self.assertEqual(len(self.store), 9)
+
+        # A re-added id takes a new row and its new vector
+        self.store.add(103, np.full(4, -1, dtype=np.float32))
+        np.testing.assert_array_equal(self.store.get([103])[0], np.full(4, -1))
+        self.assertEqual(self.store.disk_bytes(), 11 * 16)
+
+    def test_lookups_across_sorted_part_and_tail(self):
+        with mock.patch.object(vector_store, "SORT_SLACK", 4):
+            self.store.sort()
+            self.store.add_many([200, 201], self.vectors[:2])
+            np.testing.assert_array_equal(self.store.get([201, 104, 200]), self.vectors[[1, 4, 0]])
+            self.store.remove(104)
+            self.assertEqual(self.store.rows([104, 200]).tolist(), [-1, 10])
+
+    def test_round_trip_drops_unrecorded_rows(self):
+        state = self.store.to_dict()
+        self.store.add(300, self.vectors[:1])
+
+        # Rows written after the recorded state are overwritten by the next append
+        restored = VectorStore.from_dict(self.path, state)
+        self.assertNotIn(300, restored)
+        restored.add(301, self.vectors[2:3])
+        np.testing.assert_array_equal(restored.get([301, 109]), self.vectors[[2, 9]])
+
+
+if __name__ == '__main__':
+    unittest.main()